@@ -0,0 +1,133 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.catalog_indexes
+# python3.11 -m benchmarks.catalog_indexes --rows 1000000 --users 1000 --verbose
+#
+# Seeds a throw-away catalog inside one transaction, prints the query plans of the
+# listing queries with and without the catalog indexes (polls migration 0025),
+# then rolls everything back. PostgreSQL only.
+
+import argparse
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from polls.api import CATALOG_ORDERING, is_public_or_is_user_private
+from polls.models import Dataset, Model
+
+CATALOG_INDEXES = {
+    Dataset: [index.name for index in Dataset._meta.indexes],
+    Model: [index.name for index in Model._meta.indexes],
+}
+
+class Rollback(Exception):
+    pass
+
+def seed_users(n_users):
+    User.objects.bulk_create(
+        [User(username=f"benchmark-user-{i}", email=f"benchmark-user-{i}@example.com") for i in range(n_users)],
+        batch_size=1000,
+    )
+    return list(User.objects.filter(username__startswith="benchmark-user-").values_list("id", flat=True))
+
+def seed_catalog(Object, n_rows, user_ids, directory_field):
+    """
+    One INSERT ... SELECT generate_series per table; 1 in 10 rows is private.
+    """
+    table = Object._meta.db_table
+    extra_columns = ", model_type" if Object is Model else ""
+    extra_values = ", 'benchmark'" if Object is Model else ""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {table} (name, user_id, {directory_field}, is_public, description, created, updated{extra_columns})
+            SELECT
+                'benchmark ' || i,
+                (%s::bigint[])[1 + i %% %s],
+                'benchmark/' || i,
+                i %% 10 <> 0,
+                '',
+                now() - (i || ' seconds')::interval,
+                now() - (i || ' seconds')::interval
+                {extra_values}
+            FROM generate_series(1, %s) AS i
+        """, [user_ids, len(user_ids), n_rows])
+        cursor.execute(f"ANALYZE {table}")
+
+def listing_querysets(Object, user):
+    return [
+        ("anonymous page", Object.objects.filter(is_public=True).order_by(*CATALOG_ORDERING)[:10]),
+        ("anonymous count", Object.objects.filter(is_public=True).values("id")),
+        ("user and public page", Object.objects.filter(is_public_or_is_user_private(user)).order_by(*CATALOG_ORDERING)[:10]),
+        ("user private page", Object.objects.filter(is_public=False, user=user).order_by(*CATALOG_ORDERING)[:10]),
+        ("public by updated", Object.objects.filter(is_public=True).order_by("-updated", "-id")[:10]),
+    ]
+
+def explain(queryset, count=False):
+    if count:
+        query, params = queryset.query.sql_with_params()
+        sql = f"EXPLAIN (ANALYZE, BUFFERS) SELECT COUNT(*) FROM ({query}) AS listing"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+    return queryset.explain(analyze=True, buffers=True)
+
+def drop_indexes(Object):
+    with connection.cursor() as cursor:
+        for name in CATALOG_INDEXES[Object]:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+def plan_summary(plan):
+    scans = [line.strip().split("  (")[0].lstrip("-> ") for line in plan.splitlines() if "Scan" in line]
+    execution = [line for line in plan.splitlines() if line.startswith("Execution Time")]
+    return scans, execution[0] if execution else ""
+
+def compare_plans(Object, user, verbose=False):
+    print(f"\n== {Object.__name__} ==")
+    for label, queryset in listing_querysets(Object, user):
+        count = label.endswith("count")
+
+        with transaction.atomic():
+            drop_indexes(Object)
+            before = explain(queryset, count=count)
+            transaction.set_rollback(True)
+
+        after = explain(queryset, count=count)
+
+        for title, plan in (("without indexes", before), ("with indexes", after)):
+            scans, execution = plan_summary(plan)
+            print(f"{label:22} {title:16} {execution:28} {'; '.join(scans)}")
+            if verbose:
+                print(plan)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows per table")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--verbose", action="store_true", help="print the full plans")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        print("This benchmark needs PostgreSQL.")
+        return
+
+    try:
+        with transaction.atomic():
+            start = time.perf_counter()
+            user_ids = seed_users(args.users)
+            seed_catalog(Dataset, args.rows, user_ids, "dataset_directory")
+            seed_catalog(Model, args.rows, user_ids, "model_directory")
+            print(f"Seeded {args.rows} datasets and {args.rows} models in {time.perf_counter() - start:.1f}s")
+
+            user = User.objects.get(id=user_ids[0])
+            compare_plans(Dataset, user, verbose=args.verbose)
+            compare_plans(Model, user, verbose=args.verbose)
+            raise Rollback()
+    except Rollback:
+        print("\nRolled back the benchmark catalog.")
+
+if __name__ == "__main__":
+    main()
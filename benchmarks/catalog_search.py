@@ -0,0 +1,97 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.catalog_search
+# python3.11 -m benchmarks.catalog_search --rows 1000000 --repeat 50 --verbose
+#
+# Seeds a throw-away model catalog inside one transaction, times the old
+# name__icontains search against polls.search.search_catalog (migration 0026
+# indexes), then rolls everything back. PostgreSQL with pg_trgm only.
+
+import argparse
+import statistics
+import time
+
+from django.db import connection, transaction
+
+from polls.models import Model
+from polls.pagination import CATALOG_ORDERING
+from polls.search import search_catalog
+
+from benchmarks.catalog_indexes import Rollback, seed_users
+
+QUERIES = ["bert", "resnet 50", "distilbert base", "whisper", "llama", "vit-b", "rsnet", "no such model"]
+
+WORDS = ["bert", "distilbert", "roberta", "resnet", "vit", "whisper", "llama", "mistral", "t5", "gpt2",
+         "base", "large", "small", "tiny", "uncased", "cased", "finetuned", "squad", "imagenet", "50"]
+
+def seed_models(n_rows, user_ids):
+    """
+    Names and descriptions are 3 and 6 words drawn from WORDS, plus a unique suffix.
+    """
+    table = Model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {table} (name, user_id, model_directory, is_public, description, created, updated, model_type)
+            SELECT
+                w[1 + i %% 20] || '-' || w[1 + (i / 20) %% 20] || '-' || w[1 + (i / 400) %% 20] || '-' || i,
+                (%s::bigint[])[1 + i %% %s],
+                'benchmark/' || i,
+                i %% 10 <> 0,
+                w[1 + (i / 7) %% 20] || ' ' || w[1 + (i / 11) %% 20] || ' ' || w[1 + (i / 13) %% 20] || ' '
+                    || w[1 + (i / 17) %% 20] || ' ' || w[1 + (i / 19) %% 20] || ' ' || w[1 + (i / 23) %% 20],
+                now() - (i || ' seconds')::interval,
+                now() - (i || ' seconds')::interval,
+                w[1 + (i / 3) %% 20]
+            FROM generate_series(1, %s) AS i, (SELECT %s::text[] AS w) AS words
+        """, [user_ids, len(user_ids), n_rows, WORDS])
+        cursor.execute(f"ANALYZE {table}")
+
+def icontains_search(queryset, q, limit=5):
+    return queryset.filter(name__icontains=q).order_by(*CATALOG_ORDERING)[:limit]
+
+def time_query(make_queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(make_queryset())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+def compare(queryset, repeat, verbose=False):
+    print(f"{'query':18} {'icontains median/max ms':>26} {'search median/max ms':>24}")
+    for q in QUERIES:
+        before = time_query(lambda: icontains_search(queryset, q), repeat)
+        after = time_query(lambda: search_catalog(queryset, q), repeat)
+        print(f"{q:18} {before[0]:14.2f} / {before[1]:8.2f} {after[0]:12.2f} / {after[1]:8.2f}")
+        if verbose:
+            print(search_catalog(queryset, q).explain(analyze=True))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--verbose", action="store_true", help="print the search plans")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        print("This benchmark needs PostgreSQL.")
+        return
+
+    try:
+        with transaction.atomic():
+            start = time.perf_counter()
+            user_ids = seed_users(args.users)
+            seed_models(args.rows, user_ids)
+            print(f"Seeded {args.rows} models in {time.perf_counter() - start:.1f}s\n")
+
+            compare(Model.objects.filter(is_public=True), args.repeat, verbose=args.verbose)
+            raise Rollback()
+    except Rollback:
+        print("\nRolled back the benchmark catalog.")
+
+if __name__ == "__main__":
+    main()
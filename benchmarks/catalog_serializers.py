@@ -0,0 +1,78 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.catalog_serializers
+# python3.11 -m benchmarks.catalog_serializers --rows 500 --repeat 50
+#
+# Rows per second of the DRF listing serializers against the values_list() path
+# (polls.serializers.values_serializer_data), and of JSONRenderer against
+# ORJSONRenderer. Seeds inside one transaction and rolls it back.
+
+import argparse
+import time
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from polls.api import DatasetSerializer, ModelSerializer, get_list_serializer_data, get_serializer_queryset
+from polls.models import Dataset, Model
+from polls.renderers import ORJSONRenderer, orjson
+
+from benchmarks.catalog_indexes import Rollback
+
+def seed(n_rows):
+    users = User.objects.bulk_create(
+        [User(username=f"benchmark-user-{i}", email=f"benchmark-user-{i}@example.com") for i in range(n_rows)]
+    )
+    Dataset.objects.bulk_create([
+        Dataset(name=f"benchmark {i}", user=users[i], is_public=True,
+                dataset_directory=f"benchmark/dataset/{i}", description="benchmark dataset")
+        for i in range(n_rows)
+    ])
+    Model.objects.bulk_create([
+        Model(name=f"benchmark {i}", user=users[i], is_public=True, model_type="bert",
+              model_directory=f"benchmark/model/{i}", description="benchmark model")
+        for i in range(n_rows)
+    ])
+
+def rows_per_second(func, n_rows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return n_rows * repeat / (time.perf_counter() - start)
+
+def compare(Serializer, n_rows, repeat):
+    queryset = get_serializer_queryset(Serializer).filter(name__startswith="benchmark ")[:n_rows]
+    data = Serializer(queryset, many=True).data
+    payload = {"list": data}
+
+    results = [
+        ("DRF serializer", lambda: Serializer(queryset, many=True).data),
+        ("values_list", lambda: get_list_serializer_data(Serializer, queryset)),
+        ("JSONRenderer", lambda: JSONRenderer().render(payload)),
+        ("ORJSONRenderer" if orjson != None else "ORJSONRenderer (no orjson)", lambda: ORJSONRenderer().render(payload)),
+    ]
+    print(f"\n== {Serializer.Meta.model.__name__}, {n_rows} rows ==")
+    for label, func in results:
+        print(f"{label:30} {rows_per_second(func, n_rows, repeat):14,.0f} rows/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200, help="rows per listing")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            seed(args.rows)
+            compare(DatasetSerializer, args.rows, args.repeat)
+            compare(ModelSerializer, args.rows, args.repeat)
+            raise Rollback()
+    except Rollback:
+        print("\nRolled back the benchmark catalog.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.fork_strategies
+# python3.11 -m benchmarks.fork_strategies --dir /srv/ku_djangoo/asset --files 2000 --file-size 1048576
+#
+# Fork latency and disk space used by polls.fork.fork_tree with each strategy
+# (reflink, hardlink, copy), without fallback, on a seeded tree under --dir.
+# Disk space is the drop in free space of the filesystem, so it counts shared
+# blocks once; run it on an otherwise quiet filesystem. No database access.
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from polls.fork import FORK_STRATEGIES, fork_tree
+
+def free_bytes(path):
+    st = os.statvfs(path)
+    return st.f_bavail * st.f_frsize
+
+def seed_tree(root, n_files, file_size, files_per_directory=100):
+    for i in range(n_files):
+        directory = os.path.join(root, f"part_{i // files_per_directory:04d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{i:06d}.bin"), "wb") as file:
+            file.write(os.urandom(file_size))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=None, help="directory on the filesystem to test (default: system temp)")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="bytes per file")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(dir=args.dir)
+    try:
+        src = os.path.join(work, "src")
+        seed_tree(src, args.files, args.file_size)
+        os.sync()
+        print(f"{args.files} files, {args.files * args.file_size / 1024 ** 2:,.1f} MB in {work}")
+
+        for strategy in FORK_STRATEGIES:
+            dst = os.path.join(work, strategy)
+            free_before = free_bytes(work)
+            start = time.perf_counter()
+            try:
+                fork_tree(src, dst, strategy=strategy, fallback=False)
+            except OSError as e:
+                print(f"{strategy:9} unsupported here: {e}")
+                shutil.rmtree(dst, ignore_errors=True)
+                continue
+            elapsed = time.perf_counter() - start
+            os.sync()
+            used = max(free_before - free_bytes(work), 0)
+            print(f"{strategy:9} {elapsed * 1000:10,.1f} ms {used / 1024 ** 2:10,.1f} MB used")
+            shutil.rmtree(dst)
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.jwt_user
+# python3.11 -m benchmarks.jwt_user --requests 2000 --rows 1000
+#
+# Requests per second of catalog reads (/api/datasets/page/ and
+# /api/user/datasets/page/) for anonymous and authenticated requests, with the
+# user loaded from the database on every request (JWTAuthentication, no token
+# cache) and built from the token claims (JWTClaimsUserAuthentication plus the
+# validated token cache). Seeds inside one transaction and rolls it back.
+
+import argparse
+import time
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from polls import api
+from polls.authentication import JWTClaimsUserAuthentication, add_user_claims, validated_token_cache
+from polls.models import Dataset
+
+from benchmarks.catalog_indexes import Rollback
+
+ENDPOINTS = [
+    ("/api/datasets/page/", api.datasets_page_range),
+    ("/api/user/datasets/page/", api.user_and_public_datasets_pages),
+]
+
+def seed(n_rows):
+    user = User.objects.create_user("benchmark-user", "benchmark-user@example.com", "benchmark")
+    Dataset.objects.bulk_create([
+        Dataset(name=f"benchmark {i}", user=user, is_public=i % 10 != 0, dataset_directory=f"benchmark/dataset/{i}")
+        for i in range(n_rows)
+    ])
+    return user
+
+def requests_per_second(view, path, access_token, n_requests):
+    factory = APIRequestFactory()
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        request = factory.get(path, {"per_page": 10})
+        if access_token:
+            request.COOKIES['access_token'] = access_token
+        view(request)
+    return n_requests / (time.perf_counter() - start)
+
+def run(label, jwt_authentication, token_cache, access_token, n_requests):
+    original_jwtauth, original_get_validated_token = api.JWTAUTH, api.get_validated_token
+    api.JWTAUTH = jwt_authentication
+    if not token_cache:
+        api.get_validated_token = lambda authentication, raw_token: authentication.get_validated_token(raw_token)
+    validated_token_cache.clear()
+    try:
+        for path, view in ENDPOINTS:
+            for who, token in (("anonymous", None), ("authenticated", access_token)):
+                rps = requests_per_second(view, path, token, n_requests)
+                print(f"{label:8} {path:28} {who:14} {rps:10,.0f} req/s")
+    finally:
+        api.JWTAUTH, api.get_validated_token = original_jwtauth, original_get_validated_token
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and user")
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            user = seed(args.rows)
+            access_token = str(add_user_claims(RefreshToken.for_user(user), user).access_token)
+            for path, view in ENDPOINTS:
+                requests_per_second(view, path, access_token, 50) # warm up
+            run("before", JWTAuthentication(), False, access_token, args.requests)
+            run("after", JWTClaimsUserAuthentication(), True, access_token, args.requests)
+            raise Rollback()
+    except Rollback:
+        print("\nRolled back the benchmark catalog.")
+
+if __name__ == "__main__":
+    main()
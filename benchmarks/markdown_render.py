@@ -0,0 +1,66 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.markdown_render
+# python3.11 -m benchmarks.markdown_render --threads 16 --documents 400 --sections 200
+#
+# READMEs rendered per second from many threads, and how many came out wrong
+# (compared to a single-threaded render), with one shared markdown.Markdown
+# instance against the per-thread instances of polls.views.ThreadLocalMarkdown.
+# No database access.
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from polls.views import ThreadLocalMarkdown, get_markdown_fenced_code
+
+def make_readme(index, n_sections):
+    sections = []
+    for section in range(n_sections):
+        sections.append(
+            f"## Document {index} section {section}\n\n"
+            f"Text of document {index}, with *emphasis* and a [link](https://example.com/{index}/{section}).\n\n"
+            f"```python\nprint({index}, {section})\n```\n\n"
+            f"- item {index}.{section}.1\n- item {index}.{section}.2\n"
+        )
+    return f"# README {index}\n\n" + "\n".join(sections)
+
+def render_all(renderer, documents, n_threads):
+    """
+    Rendered documents and renders per second. A renderer raising counts as a wrong render.
+    """
+    def convert(text):
+        try:
+            return renderer.convert(text)
+        except Exception as e:
+            return f"error: {e}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        rendered = list(pool.map(convert, documents))
+    return rendered, len(documents) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=100, help="sections per README")
+    args = parser.parse_args()
+
+    documents = [make_readme(i, args.sections) for i in range(args.documents)]
+    reference = get_markdown_fenced_code()
+    expected = []
+    for text in documents:
+        expected.append(reference.convert(text))
+        reference.reset()
+
+    for label, renderer in (("shared", get_markdown_fenced_code()), ("per-thread", ThreadLocalMarkdown())):
+        rendered, per_second = render_all(renderer, documents, args.threads)
+        wrong = sum(1 for got, want in zip(rendered, expected) if got != want)
+        print(f"{label:10} {args.threads:3} threads {per_second:10,.1f} READMEs/s {wrong:5} wrong of {len(documents)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ku_djangoo.settings')
+import django
+django.setup()
+
+# python3.11 -m benchmarks.minio_sync
+# python3.11 -m benchmarks.minio_sync --files 2000 --latency-ms 20 --workers 16
+# python3.11 -m benchmarks.minio_sync --endpoint 127.0.0.1:9000 --bucket bench
+#
+# Files per second mirrored to MinIO by the serial walk of upload_all_datasets_to_minio
+# (save_file_as_object per file) against MinioService.sync_directory, then of a second
+# sync_directory run where every object is unchanged and skipped.
+# Without --endpoint the objects go to an in-process fake that sleeps --latency-ms per
+# request (one per part for multipart uploads), like a remote S3 round trip.
+# No database access.
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from ku_djangoo.minio_utils import MinioService, create_minio_client, iter_sync_files, get_part_count, compute_etag
+from ku_djangoo.settings import MINIO_ACCESS_KEY, MINIO_SECRET_KEY
+
+class LatencyMinioClient:
+    def __init__(self, latency):
+        self.latency = latency
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def fput_object(self, bucket, object_name, path, part_size=0, **kwargs):
+        size = os.path.getsize(path)
+        time.sleep(self.latency * get_part_count(size, part_size or size or 1))
+        etag = compute_etag(path, part_size or max(size, 1))
+        with self.lock:
+            self.objects[object_name] = (size, etag)
+
+    def list_objects(self, bucket, prefix=None, recursive=False):
+        time.sleep(self.latency)
+        with self.lock:
+            objects = list(self.objects.items())
+        return [
+            argparse.Namespace(object_name=name, size=size, etag=etag, is_dir=False)
+            for name, (size, etag) in objects if name.startswith(prefix or "")
+        ]
+
+def seed_tree(root, n_files, file_size, files_per_directory=100):
+    for i in range(n_files):
+        directory = os.path.join(root, f"part_{i // files_per_directory:04d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{i:06d}.bin"), "wb") as file:
+            file.write(os.urandom(file_size))
+
+def timed(label, n_files, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:28} {elapsed:8.2f} s {n_files / elapsed:10,.1f} files/s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="bytes per file")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=10, help="per request, fake client only")
+    parser.add_argument("--endpoint", default=None, help="MinIO host:port (default: in-process fake)")
+    parser.add_argument("--bucket", default="benchmark")
+    args = parser.parse_args()
+
+    def make_service():
+        if args.endpoint:
+            client = create_minio_client(args.endpoint, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
+            if not client.bucket_exists(args.bucket):
+                client.make_bucket(args.bucket)
+            return MinioService(client)
+        return MinioService(LatencyMinioClient(args.latency_ms / 1000))
+
+    work = tempfile.mkdtemp()
+    try:
+        seed_tree(work, args.files, args.file_size)
+        print(f"{args.files} files, {args.files * args.file_size / 1024 ** 2:,.1f} MB, {args.workers} workers")
+
+        serial = make_service()
+        serial.bucket = args.bucket
+        def upload_serially():
+            for source_file, object_name in iter_sync_files(work, "benchmark/serial"):
+                serial.save_file_as_object(object_name, source_file)
+        timed("serial save_file_as_object", args.files, upload_serially)
+
+        service = make_service()
+        sync = lambda: service.sync_directory(work, "benchmark/sync", bucket=args.bucket, max_workers=args.workers)
+        report = timed("sync_directory", args.files, sync)
+        print(f"{'':28} uploaded {report['uploaded']}, failed {len(report['failed'])}")
+        report = timed("sync_directory, unchanged", args.files, sync)
+        print(f"{'':28} skipped {report['skipped']}")
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ from channels.generic.websocket import (
 from collections.abc import Callable
 from polls.models import DatasetActionSet, DatasetAction, Dataset, Task, DatasetTaskAction
 from polls.api import identify_user_from_jwt_access_token, identify_user_from_jwt_access_token_and_refresh_token
+from polls.extraction import get_upload_progress_group
+from polls.tasks import get_task_progress_group
 
 HTTP_BASE_URL = "https://"
 LOCALHOST = "localhost"
@@ -145,7 +147,55 @@ async def progress_consumer_connect(self):
 
 async def progress_consumer_disconnect(self, close_code):
     # await self.close() 
-    pass
+    for group in (getattr(self, 'upload_group', None), getattr(self, 'task_group', None)):
+        if group and self.channel_layer:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+async def progress_consumer_subscribe_upload(self, message):
+    """
+    {"type": "subscribe_upload", "payload": {"upload_id": ...}}: relay the extraction
+    progress of the upload posted with the same upload_id.
+    """
+    upload_id = message.get('payload', {}).get('upload_id')
+    if not upload_id or not self.channel_layer:
+        await self.send_progress({'finished': True, 'success': False, 'error': 'upload_id or channel layer missing'})
+        return
+    self.upload_group = get_upload_progress_group(upload_id)
+    await self.channel_layer.group_add(self.upload_group, self.channel_name)
+
+async def progress_consumer_upload_progress(self, event):
+    await self.send_progress(event['progress'])
+
+@database_sync_to_async
+def get_user_task_from_db(task_id, access_token):
+    user = identify_user_from_jwt_access_token(access_token)
+    if not user:
+        return None
+    return Task.objects.filter(id=task_id, user=user).first()
+
+async def progress_consumer_subscribe_task(self, message):
+    """
+    {"type": "subscribe_task", "payload": {"task_id": ..., "access_token": ...}}: relay
+    the progress of a queued task of the user (the task_id of a 202 response).
+    """
+    payload = message.get('payload', {})
+    task_id = payload.get('task_id')
+    try:
+        task = await get_user_task_from_db(int(task_id), payload.get('access_token'))
+    except (TypeError, ValueError):
+        task = None
+    if task == None or not self.channel_layer:
+        await self.send_progress({'finished': True, 'success': False, 'error': 'task not found or channel layer missing'})
+        return
+    self.task_group = get_task_progress_group(task.id)
+    await self.channel_layer.group_add(self.task_group, self.channel_name)
+    if task.status in (Task.STATUS.SUCCEEDED, Task.STATUS.FAILED):
+        await self.send_progress({'task_id': task.id, 'status': task.status, 'finished': True, 'success': task.status == Task.STATUS.SUCCEEDED, 'result': task.result})
+    elif task.progress:
+        await self.send_progress({'task_id': task.id, 'status': task.status, **task.progress})
+
+async def progress_consumer_task_progress(self, event):
+    await self.send_progress(event['progress'])
 
 @database_sync_to_async
 def get_dataset_action_sets_from_db():
@@ -193,7 +243,11 @@ async def progress_consumer_recieve(self, text_data, result_url=''):
     result_url = result_url or self.result_url    
     message = tryExceptJsonLoads(text_data)
 
-    if message.get('type') == 'start_task':
+    if message.get('type') == 'subscribe_upload' and hasattr(self, 'upload_progress'):
+        await progress_consumer_subscribe_upload(self, message)
+    elif message.get('type') == 'subscribe_task' and hasattr(self, 'task_progress'):
+        await progress_consumer_subscribe_task(self, message)
+    elif message.get('type') == 'start_task':
         total_steps = message.get('payload', {}).get('total_steps', 10)
         await self.start_task(total_steps, result_url, text_data=text_data)
     else:
@@ -328,6 +382,8 @@ class ProgressConsumer(AsyncWebsocketConsumer):
     receive = progress_consumer_recieve
     connect = progress_consumer_connect
     disconnect = progress_consumer_disconnect    
+    upload_progress = progress_consumer_upload_progress
+    task_progress = progress_consumer_task_progress
 
 class ProgressConsumerActionA(AsyncWebsocketConsumer):
     result_url = f"{STATIC_IMAGE_BASE_URL}/2018-07-5-Suboptimal-bar-chart-variable-1024x590-e1541666684430.jpg"
@@ -1,22 +1,41 @@
 import os
 import io
+import time
+import random
+import hashlib
 import zipfile
+from collections import deque
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from minio import Minio
 from minio.error import S3Error, MinioException
 from polls.views import ROOT_MODEL_DIR
+from polls.zipstream import ZipEntry, ZIP_STREAM_CHUNK_SIZE
 
 from ku_djangoo.settings import (
     MINIO_ACCESS_KEY,
     MINIO_SECRET_KEY,
     MINIO_API_ADDR,
     MINIO_BUCKET1_ADDR,
+    MINIO_SYNC_WORKERS,
+    MINIO_SYNC_PART_SIZE,
+    MINIO_SYNC_MAX_RETRIES,
+    MINIO_ZIP_PREFETCH,
 )
 
 MINUTE_AS_SECONDS = 60
 HOUR_AS_SECONDS = 3600
 DAY_AS_SECONDS = 86400
 
+MIN_PART_SIZE = 5 * 1024 * 1024 # S3 minimum for every part but the last
+ETAG_CHUNK_SIZE = 1024 * 1024
+SYNC_RETRY_BACKOFF_SECONDS = 0.5
+# Errors a retry cannot fix; anything else (timeouts, 5xx, SlowDown, resets) is retried.
+NON_RETRYABLE_S3_ERRORS = {
+    "AccessDenied", "InvalidAccessKeyId", "SignatureDoesNotMatch",
+    "NoSuchBucket", "InvalidBucketName", "EntityTooLarge",
+}
+
 def create_minio_client(
         endpoint=MINIO_API_ADDR, 
         access_key=MINIO_ACCESS_KEY, 
@@ -34,6 +53,75 @@ def isnone_or_empty(a):
         return True
     return False
 
+class MinioObjectReader:
+    """Binary file-like over a get_object response whose first bytes (head) were
+    already read by a prefetch. Closing it returns the connection to the pool.
+    """
+    def __init__(self, response, head=b''):
+        self.response = response
+        self.head = head
+
+    def read(self, size=-1):
+        if self.head:
+            data = self.head if size < 0 else self.head[:size]
+            self.head = self.head[len(data):]
+            return data
+        return self.response.read(None if size < 0 else size)
+
+    def close(self):
+        self.response.close()
+        self.response.release_conn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def get_part_count(size, part_size):
+    """Number of parts fput_object splits size bytes into with part_size (1: a single PUT)."""
+    return max(1, -(-size // part_size))
+
+def compute_etag(path, part_size):
+    """ETag MinIO/S3 gives path uploaded by fput_object with part_size: the MD5 of a
+    single PUT, or the MD5 of the part MD5s followed by -<part count> for a multipart upload.
+    """
+    part_count = get_part_count(os.path.getsize(path), part_size)
+    digests = []
+    with open(path, 'rb') as file:
+        for _ in range(part_count):
+            digest = hashlib.md5(usedforsecurity=False)
+            remaining = part_size
+            while remaining > 0 and (chunk := file.read(min(ETAG_CHUNK_SIZE, remaining))):
+                digest.update(chunk)
+                remaining -= len(chunk)
+            digests.append(digest)
+    if part_count == 1:
+        return digests[0].hexdigest()
+    combined = hashlib.md5(b''.join(digest.digest() for digest in digests), usedforsecurity=False)
+    return f"{combined.hexdigest()}-{part_count}"
+
+def is_object_unchanged(path, size, remote, part_size, compare='etag'):
+    """True when remote, the (size, etag) of the object, already holds the file at path.
+    compare='size' trusts matching sizes and reads nothing.
+    """
+    if remote is None or remote[0] != size:
+        return False
+    if compare == 'size':
+        return True
+    return compute_etag(path, part_size) == remote[1]
+
+def iter_sync_files(local_dir, prefix=''):
+    """(local path, object name) of every regular file under local_dir."""
+    prefix = prefix.strip('/')
+    for root, _, files in os.walk(local_dir):
+        for file in files:
+            local_file_path = os.path.join(root, file)
+            if not os.path.isfile(local_file_path):
+                continue
+            object_name = os.path.relpath(local_file_path, local_dir).replace(os.sep, '/')
+            yield local_file_path, f"{prefix}/{object_name}" if prefix else object_name
+
 class MinioService:
     bucket = MINIO_BUCKET1_ADDR
 
@@ -81,6 +169,83 @@ class MinioService:
             print(f'Error uploading {source_file} to MinIO: {e}')
             return "Error. Could not save file in the server"
 
+    def list_object_etags(self, prefix='', bucket=''):
+        """{object name: (size, etag)} of the objects under prefix, from one recursive listing."""
+        bucket = bucket or self.bucket
+        objects = self.minio_client.list_objects(bucket, prefix=prefix or None, recursive=True)
+        return {
+            obj.object_name: (obj.size, (obj.etag or '').strip('"'))
+            for obj in objects if not obj.is_dir
+        }
+
+    def upload_file_with_retry(self, object_name, source_file, bucket='', part_size=MINIO_SYNC_PART_SIZE,
+                               max_retries=MINIO_SYNC_MAX_RETRIES, backoff=SYNC_RETRY_BACKOFF_SECONDS):
+        """fput_object with part_size parts, retried with exponential backoff and jitter
+        unless the error is one of NON_RETRYABLE_S3_ERRORS.
+        """
+        bucket = bucket or self.bucket
+        for attempt in range(max_retries + 1):
+            try:
+                return self.minio_client.fput_object(bucket, object_name, source_file, part_size=part_size)
+            except S3Error as e:
+                if e.code in NON_RETRYABLE_S3_ERRORS or attempt == max_retries:
+                    raise
+                error = e
+            except (MinioException, OSError) as e:
+                if attempt == max_retries:
+                    raise
+                error = e
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f'Retrying upload of {object_name} in {delay:.1f}s: {error}')
+            time.sleep(delay)
+
+    def sync_directory(self, local_dir, prefix='', bucket='', max_workers=MINIO_SYNC_WORKERS,
+                       part_size=MINIO_SYNC_PART_SIZE, max_retries=MINIO_SYNC_MAX_RETRIES,
+                       compare='etag', backoff=SYNC_RETRY_BACKOFF_SECONDS):
+        """Mirror local_dir to prefix in the bucket, max_workers files at a time.
+        Objects with the same size and ETag (or only size, with compare='size') are skipped,
+        so an interrupted sync resumes where it stopped. Nothing is deleted remotely.
+
+        Returns {'uploaded', 'skipped', 'bytes', 'failed': [(object name, error)]}, or None
+        without a client.
+        """
+        bucket = bucket or self.bucket
+        if self.minio_client_is_none():
+            return None
+        part_size = max(part_size, MIN_PART_SIZE)
+        report = {'uploaded': 0, 'skipped': 0, 'bytes': 0, 'failed': []}
+        remote = self.list_object_etags(prefix, bucket)
+
+        def sync_file(source_file, object_name):
+            size = os.path.getsize(source_file)
+            if is_object_unchanged(source_file, size, remote.get(object_name), part_size, compare):
+                return False, 0
+            self.upload_file_with_retry(object_name, source_file, bucket, part_size, max_retries, backoff)
+            return True, size
+
+        def collect(done):
+            for future in done:
+                object_name = pending.pop(future)
+                try:
+                    uploaded, size = future.result()
+                except Exception as e:
+                    print(f'Error uploading {object_name} to MinIO: {e}')
+                    report['failed'].append((object_name, str(e)))
+                    continue
+                report['uploaded' if uploaded else 'skipped'] += 1
+                report['bytes'] += size
+
+        pending = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for source_file, object_name in iter_sync_files(local_dir, prefix):
+                # Bounded: a 100k-file tree does not become 100k queued futures.
+                if len(pending) >= max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[pool.submit(sync_file, source_file, object_name)] = object_name
+            collect(wait(pending).done)
+        return report
+
     def test_connect_minio_bucket(self):
         source_file = "static/image/2018-07-5-Suboptimal-bar-chart-variable-1024x590-e1541666684430.jpg"
         object_name = "my-test-file.jpg"
@@ -136,6 +301,90 @@ class MinioService:
             print(f"An unexpected error occurred: {e}")
             return None
 
+    def stat_object(self, object_name, bucket=''):
+        """Returns the object's metadata (size, etag, last_modified) or None."""
+        bucket = bucket or self.bucket
+
+        if self.minio_client_is_none():
+            return None
+        if isnone_or_empty(bucket) or isnone_or_empty(object_name):
+            return None
+
+        try:
+            return self.minio_client.stat_object(bucket, object_name)
+        except S3Error as e:
+            print(f"Error reading object stat: {e}")
+            return None
+
+    def iter_object_range(self, object_name, offset=0, length=0, bucket='', chunk_size=1024 * 1024):
+        """Yields length bytes of the object from offset (length 0: to the end), chunk by chunk.
+        Only the requested range is fetched from MinIO.
+        """
+        bucket = bucket or self.bucket
+
+        data = self.minio_client.get_object(bucket, object_name, offset=offset, length=length)
+        try:
+            yield from data.stream(chunk_size)
+        finally:
+            data.close()
+            data.release_conn()
+
+    def open_object(self, object_name, bucket='', head_size=ZIP_STREAM_CHUNK_SIZE):
+        """MinioObjectReader of the object with its first head_size bytes already read,
+        so a small object is fully fetched by the time it is opened.
+        """
+        bucket = bucket or self.bucket
+        response = self.minio_client.get_object(bucket, object_name)
+        try:
+            return MinioObjectReader(response, response.read(head_size))
+        except BaseException:
+            response.close()
+            response.release_conn()
+            raise
+
+    def iter_zip_entries(self, prefix, bucket='', prefetch=MINIO_ZIP_PREFETCH, head_size=ZIP_STREAM_CHUNK_SIZE):
+        """ZipEntry (polls/zipstream.py) for every object under the prefix directory, for
+        zipstream.iter_zip(). While one object is written, the next prefetch objects are
+        requested in worker threads, which hides the round trip of each get_object;
+        memory stays around (prefetch + 1) * head_size. Objects that cannot be read are
+        skipped.
+        """
+        bucket = bucket or self.bucket
+        prefix = prefix.rstrip('/') + '/'
+        objects = (
+            obj for obj in self.minio_client.list_objects(bucket, prefix=prefix, recursive=True)
+            if not obj.is_dir
+        )
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        try:
+            while True:
+                while len(pending) <= prefetch:
+                    obj = next(objects, None)
+                    if obj is None:
+                        break
+                    pending.append((obj, pool.submit(self.open_object, obj.object_name, bucket, head_size)))
+                if not pending:
+                    break
+                obj, future = pending.popleft()
+                try:
+                    reader = future.result()
+                except Exception as e:
+                    print(f"Error zipping file {obj.object_name}: {e}")
+                    continue
+                yield ZipEntry(
+                    arcname=obj.object_name[len(prefix):],
+                    size=obj.size,
+                    mtime=obj.last_modified.timestamp() if obj.last_modified else 0,
+                    open=lambda reader=reader: reader,
+                )
+        finally:
+            # Closed early (client gone): release the connections of the prefetched objects.
+            pool.shutdown(wait=True, cancel_futures=True)
+            for _, future in pending:
+                if not future.cancelled() and future.exception() is None:
+                    future.result().close()
+
     def get_zipped_file(self, prefix, bucket=''):
         bucket = bucket or self.bucket
 
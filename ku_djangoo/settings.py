@@ -43,6 +43,16 @@ MINIO_API_ADDRESSES = getenv("MINIO_API_ADDRESSES").split(',')
 
 MINIO_API_ADDR = getenv("MINIO_API_ADDR")
 
+# Bulk sync to MinIO (MinioService.sync_directory): files uploaded at once, multipart
+# part size (fewer, larger parts than the 5 MiB minimum) and retries per file.
+MINIO_SYNC_WORKERS = int(getenv("MINIO_SYNC_WORKERS", 8))
+MINIO_SYNC_PART_SIZE = int(getenv("MINIO_SYNC_PART_SIZE", 16 * 1024 * 1024))
+MINIO_SYNC_MAX_RETRIES = int(getenv("MINIO_SYNC_MAX_RETRIES", 4))
+
+# Zipped MinIO downloads (MinioService.iter_zip_entries): objects requested ahead of the
+# one being written, each holding up to 1 MB and one pooled connection (10 per client).
+MINIO_ZIP_PREFETCH = int(getenv("MINIO_ZIP_PREFETCH", 4))
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = getenv('DEBUG', 'False') == True
 
@@ -133,6 +143,10 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Build the request user from the access token claims (polls.authentication.JWTClaimsUserAuthentication)
+# instead of loading the user row on every request.
+JWT_CLAIMS_USER = getenv('JWT_CLAIMS_USER', 'True') == 'True'
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
@@ -167,6 +181,52 @@ WSGI_APPLICATION = 'ku_djangoo.wsgi.application'
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 26214400000 # 25 GB
 
+# Uploaded files above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temporary file on disk
+# (TemporaryUploadedFile), so a 25 GB upload never sits in memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440 # 2.5 MB
+FILE_UPLOAD_TEMP_DIR = getenv('FILE_UPLOAD_TEMP_DIR') or None
+
+# Zip uploads (polls/extraction.py): extracted by ZIP_EXTRACT_WORKERS threads and rejected
+# past these uncompressed size, member count and per-member compression ratio limits.
+ZIP_EXTRACT_WORKERS = int(getenv('ZIP_EXTRACT_WORKERS', 4))
+ZIP_MAX_TOTAL_SIZE = int(getenv('ZIP_MAX_TOTAL_SIZE', 100 * 1024 ** 3)) # 100 GB
+ZIP_MAX_MEMBERS = int(getenv('ZIP_MAX_MEMBERS', 1_000_000))
+ZIP_MAX_RATIO = int(getenv('ZIP_MAX_RATIO', 200))
+
+# Forks (polls/fork.py) share file data instead of copying it: 'reflink' clones files where the
+# filesystem supports it (btrfs, XFS), else falls back to a full 'copy'. 'hardlink' (opt-in) shares
+# inodes: writers must replace files, never edit them in place, or both datasets change.
+# 'overlay' forks datasets lazily: the fork's directory only holds what changed and the rest
+# is read through from the original (models fall back to 'reflink').
+FORK_STRATEGY = getenv('FORK_STRATEGY', 'reflink')
+
+# Content-addressed blob store (polls/blob_store.py): files are stored once by SHA-256 under
+# BLOB_STORE_DIR and dataset/model files become hardlinks to them, so BLOB_STORE_DIR must be on
+# the same filesystem as the asset directories. With BLOB_STORE_ENABLED new datasets and models
+# are deduplicated when created; `python manage.py dedup_blobs` migrates existing directories.
+# Deduplicated files share one inode across users, so the blobs are made read-only: anything
+# writing into a dataset/model must replace its files (or call polls.fork.break_hardlink first)
+# instead of editing them in place. Processes running as root bypass the read-only mode.
+BLOB_STORE_ENABLED = getenv('BLOB_STORE_ENABLED', 'False') == 'True'
+BLOB_STORE_DIR = getenv('BLOB_STORE_DIR', os.path.join(BASE_DIR, 'asset', 'blobs'))
+BLOB_STORE_WORKERS = int(getenv('BLOB_STORE_WORKERS', 4))
+
+# Background tasks (polls/tasks.py): with TASK_QUEUE_ENABLED, zip uploads, forks and deletes
+# are queued as Task rows and answered with 202 + task_id; `python manage.py run_task_worker`
+# runs them. Queued uploads wait in TASK_UPLOAD_DIR, deleted directories in TASK_TRASH_DIR,
+# both best kept on the same filesystem as the asset directories (moves are renames).
+TASK_QUEUE_ENABLED = getenv('TASK_QUEUE_ENABLED', 'False') == 'True'
+TASK_UPLOAD_DIR = getenv('TASK_UPLOAD_DIR', os.path.join(BASE_DIR, 'tmp', 'task_uploads'))
+TASK_TRASH_DIR = getenv('TASK_TRASH_DIR', os.path.join(BASE_DIR, 'tmp', 'task_trash'))
+
+# Upload and task progress events go through the channel layer to ProgressConsumer.
+# Use channels_redis.core.RedisChannelLayer when running more than one process (e.g. run_task_worker).
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': getenv('CHANNEL_LAYER_BACKEND', 'channels.layers.InMemoryChannelLayer'),
+    },
+}
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -185,6 +245,46 @@ DATABASES = {
     # }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# "catalog" holds catalog COUNTs (polls/pagination.py). Local memory is per process,
+# so run several workers against a shared backend, e.g.
+# CATALOG_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CATALOG_CACHE_LOCATION=redis://127.0.0.1:6379
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': getenv('CATALOG_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': getenv('CATALOG_CACHE_LOCATION', 'catalog'),
+        'TIMEOUT': int(getenv('CATALOG_CACHE_TIMEOUT', 300)),
+    },
+}
+
+# Prebuilt download archives (polls/archive_cache.py), evicted least recently used first
+# once they take more than ARCHIVE_CACHE_MAX_BYTES. 0 turns the cache off.
+ARCHIVE_CACHE_DIR = getenv('ARCHIVE_CACHE_DIR', os.path.join(BASE_DIR, 'tmp', 'archive_cache'))
+ARCHIVE_CACHE_MAX_BYTES = int(getenv('ARCHIVE_CACHE_MAX_BYTES', 10 * 1024 ** 3)) # 10 GB
+# The fingerprint of a directory (archive key and ETag) is kept in the 'catalog' cache until
+# the directory is written through the app; writes from outside show once it times out.
+ARCHIVE_FINGERPRINT_CACHE_TIMEOUT = int(getenv('ARCHIVE_FINGERPRINT_CACHE_TIMEOUT', 60 * 60)) # seconds
+
+# Rendered READMEs of the detail pages (polls/readme_cache.py) live in the 'catalog' cache,
+# rendered on upload, fork and save and dropped on delete.
+README_CACHE_TIMEOUT = int(getenv('README_CACHE_TIMEOUT', 24 * 60 * 60)) # seconds
+
+# Threads walking a directory for its size and file-count statistics (polls/stats.py);
+# `python manage.py refresh_stats --missing` fills them in for existing rows.
+STATS_WORKERS = int(getenv('STATS_WORKERS', 8))
+
+# Blob and archive downloads: 'django' streams them with FileResponse (os.sendfile where the
+# WSGI server supports it); 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) hand
+# files under BLOB_SERVE_ROOT to the web server. See README "Serving blobs through nginx".
+BLOB_SERVE_MODE = getenv('BLOB_SERVE_MODE', 'django')
+BLOB_SERVE_ROOT = getenv('BLOB_SERVE_ROOT', str(BASE_DIR))
+BLOB_ACCEL_REDIRECT_PREFIX = getenv('BLOB_ACCEL_REDIRECT_PREFIX', '/protected/')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -66,6 +66,7 @@ urlpatterns = [
     path('api/user/datasets/page/', api.user_and_public_datasets_pages, name='user_and_public_datasets_pages'),
     path('api/test/', api.test_api, name='test_api'),    
     path('api/model/search/', api.search_model_by_name, name='search_model_by_name'),    
+    path('api/dataset/search/', api.search_dataset_by_name, name='search_dataset_by_name'),
     path('api/model/upload/', api.model_form_post),
     path('api/dataset/upload/', api.dataset_form_post),
     path('api/dataset/fork/', api.fork_dataset_api),
@@ -115,6 +116,7 @@ urlpatterns = [
     path('api/dataset/minio/test/list/', api.list_minio_bucket_object),
     path('api/dataset/minio/temp/', api.temp),
     path('api/task/', api.create_and_get_task_id),
+    path('api/task/<int:id>/', api.get_task_status),
 
     path('api/me/username/', api.get_request_username, name=''),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
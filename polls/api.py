@@ -16,9 +16,11 @@ from rest_framework import status
 from rest_framework.decorators import (
     api_view, 
     authentication_classes, 
-    permission_classes
+    permission_classes,
+    renderer_classes
 )
 from rest_framework.response import Response
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import AllowAny
@@ -29,7 +31,6 @@ from .views import (
     handle_extract_zip_file, 
     save_model_folder_info_to_database, 
     save_dataset_to_database, 
-    search_and_get_readme_markdown_by_directory,
     fork_model,
     fork_dataset
 )
@@ -49,8 +50,31 @@ from http import HTTPStatus
 from typing import Callable
 from datetime import datetime as dttime
 
-from .serializers import UserSerializer
+from .serializers import UserSerializer, MODEL_LIST_FIELDS, DATASET_LIST_FIELDS, values_serializer_data
+from .renderers import ORJSONRenderer
+from .authentication import get_validated_token, add_user_claims, JWTClaimsUserAuthentication
+from .zipstream import streaming_chunks_response, streaming_zip_response, iter_zip, get_zip_compression
+from .archive_cache import get_cached_archive, iter_caching_archive, build_cached_archive, is_cacheable_size
+from .http_range import ranged_stream_response, get_not_modified_response
+from .sendfile import serve_file
+from .readme_cache import get_readme_markdown, get_union_readme_markdown
+from .extraction import UnsafeZipError, get_upload_progress
+from .tasks import (
+    enqueue_task, is_task_queue_enabled, save_upload_for_task, move_to_trash,
+    EXTRACT_DATASET, EXTRACT_MODEL, FORK_DATASET, FORK_MODEL, DELETE_DIRECTORY,
+)
+from .file_index import (
+    get_directory_listing, get_directory_child_count, filter_listing, sort_listing,
+    TREE_MAX_LIMIT, TREE_SORT_FIELDS,
+)
+from .overlay import (
+    is_overlay, get_layers, resolve_path, is_union_directory, list_union_directory,
+    iter_union_entries, get_union_archive_key,
+)
 from .permission import IsOwnerOrReadOnly
+from .pagination import keyset_page, get_per_page, CATALOG_ORDERING, KEYSET_ORDER_FIELDS, CachedCountPaginator
+from .search import search_catalog
+from .visibility import get_visible_objects
     
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -58,11 +82,12 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from polls.views import handle_uploaded_file, iterate_folder_2levels
 from polls.models import Task
-from ku_djangoo.settings import BASE_DIR, ROOT_TEMP, ROOT_DATASET_DIR, ROOT_MODEL_DIR
+from ku_djangoo.settings import BASE_DIR, ROOT_TEMP, ROOT_DATASET_DIR, ROOT_MODEL_DIR, JWT_CLAIMS_USER
 from ku_djangoo.minio_utils import minio_service
 from ku_djangoo.utils import get_unique_model_directory, get_unique_dataset_directory
 
-JWTAUTH = JWTAuthentication()
+JWTAUTH = JWTClaimsUserAuthentication() if JWT_CLAIMS_USER else JWTAuthentication()
+REQUEST_JWT_USER_ATTRIBUTE = '_jwt_user'
 EXAMPLE_DATASET_DIRECTORY_FORMAT = "asset/dataset/<user_id>/<dataset_name>"
 EXAMPLE_DATASET_DIRECTORY = "asset/dataset/1/CS_dataset"
 DATASET_BASE_FOLDER_NAME_REGEX = "\/\d+-\d{8}_\d{6}-[^\/]+\/"
@@ -177,6 +202,11 @@ NO_PERMISSION_TO_TAKE_THE_ACTION_RESPONSE = Response({
     'message': 'No permission to take the action.'
 })
 
+UNSAFE_ZIP_FILE_RESPONSE = Response({
+    "error": "The zip file was rejected: it has paths outside its folder, symlinks, or is too large once extracted."}, 
+    status=400
+)
+
 SUCCESSFUL_ZIP_FILE_UPLOAD_RESPONSE = Response({
     'message': 'Successfully uploaded your zip file and saved them into our records.',
 })
@@ -197,6 +227,28 @@ DATASET_NOT_FOUND_INVALID_ID_OR_DELETED_RECORD_RESPONSE = Response({
     'success': False, 
     'message': 'Dataset not found - Invalid ID or deleted record.'
 })
+INVALID_CURSOR_RESPONSE = Response({
+    'success': False, 
+    'message': 'Invalid cursor, per_page or order_by.'}, 
+    status=status.HTTP_400_BAD_REQUEST
+)
+TASK_NOT_FOUND_RESPONSE = Response({
+    'success': False, 
+    'message': 'Task not found.'}, 
+    status=status.HTTP_404_NOT_FOUND
+)
+
+def task_accepted_response(task: Task):
+    """
+    202 with the id of a queued task; its progress is sent to WebSockets subscribed
+    to it on /api/dataset/image/action-progress, its outcome is at api/task/<id>/.
+    """
+    return Response({
+        'success': True, 
+        'task_id': task.id, 
+        'status': task.status}, 
+        status=status.HTTP_202_ACCEPTED
+    )
 
 def get_model_directory(model: Model) -> str:
     return model.model_directory
@@ -209,14 +261,37 @@ class ModelSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Model
-        fields = ["id", "name", "updated", "is_public", "original_model", "model_type", "username", "model_directory", "description"]
+        fields = MODEL_LIST_FIELDS
 
 class DatasetSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source='user.username')
 
     class Meta:
         model = Dataset
-        fields = ["id", "name", "updated", "created", "is_public", "original_dataset", "username", "dataset_directory", "description"]
+        fields = DATASET_LIST_FIELDS
+
+def get_serializer_queryset(Serializer=DatasetSerializer, queryset=None):
+    """
+    `queryset` (default: all objects) with the user joined in and only the columns
+    Serializer reads, so serializing N rows is one query instead of N + 1.
+    """
+    Object = Serializer.Meta.model
+    if queryset == None:
+        queryset = Object.objects.all()
+
+    concrete_fields = {field.name for field in Object._meta.concrete_fields}
+    columns = [name for name in Serializer.Meta.fields if name in concrete_fields]
+    return queryset.select_related('user').only(*columns, *KEYSET_ORDER_FIELDS, 'user__username')
+
+def get_list_serializer_data(Serializer=DatasetSerializer, queryset=None):
+    """
+    Serializer(queryset, many=True).data, built with values_list() instead of
+    model and serializer instances. Only for read-only listings.
+    """
+    return values_serializer_data(queryset, fields=Serializer.Meta.fields)
+
+# Hot listing endpoints: orjson when installed, same bytes as JSONRenderer.
+CATALOG_RENDERER_CLASSES = [ORJSONRenderer, BrowsableAPIRenderer]
 
 class UserSerializer_(serializers.ModelSerializer):
 
@@ -228,6 +303,9 @@ class ModelList(generics.ListCreateAPIView):
     queryset = Model.objects.all()
     serializer_class = ModelSerializer
 
+    def get_queryset(self):
+        return get_serializer_queryset(ModelSerializer, super().get_queryset())
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -235,6 +313,9 @@ class DatasetList(generics.ListCreateAPIView):
     queryset = Dataset.objects.all()
     serializer_class = DatasetSerializer
 
+    def get_queryset(self):
+        return get_serializer_queryset(DatasetSerializer, super().get_queryset())
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -293,7 +374,7 @@ def identify_user_from_jwt_access_token(access_token):
     if not access_token:
         return None
     try:
-        validated_token = JWTAUTH.get_validated_token(access_token)
+        validated_token = get_validated_token(JWTAUTH, access_token)
         user = JWTAUTH.get_user(validated_token)
         return user
     except (InvalidToken, TokenError):
@@ -344,11 +425,20 @@ def get_user_from_user_id(user_id):
         return None    
 
 def identify_user_from_jwt_token_from_request_cookie(request):
+    """
+    Resolved once per request: the result is kept on the underlying HttpRequest,
+    which decorators, DRF's Request and the view all share.
+    """
+    http_request = getattr(request, '_request', request)
+    if hasattr(http_request, REQUEST_JWT_USER_ATTRIBUTE):
+        return getattr(http_request, REQUEST_JWT_USER_ATTRIBUTE)
+
     user = identify_user_from_jwt_access_token_from_request_cookie(request)
         
     if user == None:
         user = get_user_from_jwt_refresh_token_from_request_cookie(request)
         
+    setattr(http_request, REQUEST_JWT_USER_ATTRIBUTE, user)
     return user
 
 def identify_user_from_jwt_access_token_and_refresh_token(access_token, refresh_token):
@@ -376,7 +466,7 @@ def verify_access_token(access_token):
     if not access_token:
         return None
     try:
-        validated_access_token = JWTAUTH.get_validated_token(access_token)
+        validated_access_token = get_validated_token(JWTAUTH, access_token)
         return validated_access_token
     except (InvalidToken, TokenError):
         return None 
@@ -447,7 +537,7 @@ class CustomLoginTokenAccessView(APIView):
         if not user:
             return INVALID_LOGIN_RESPONSE
         
-        refresh = RefreshToken.for_user(user)
+        refresh = add_user_claims(RefreshToken.for_user(user), user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
         response = JsonResponse({
@@ -612,10 +702,10 @@ def model_list_user(request, format=None):
         if user == None:
             return Response(get_model_list().data)
 
-        models = Model.objects.filter(
+        models = get_serializer_queryset(ModelSerializer, Model.objects.filter(
             (Q(is_public=False
                , user=user) 
-            | Q(is_public=True)))[:10]
+            | Q(is_public=True))))[:10]
         serializer = ModelSerializer(models, many=True)
         return Response(serializer.data)
     
@@ -630,10 +720,10 @@ def dataset_list_user(request, format=None):
         if user == None:
             return Response(get_dataset_list().data)
             
-        datasets = Dataset.objects.filter(
+        datasets = get_serializer_queryset(DatasetSerializer, Dataset.objects.filter(
             (Q(is_public=False
                , user=user) 
-            | Q(is_public=True)))[:10]
+            | Q(is_public=True))))[:10]
         serializer = DatasetSerializer(datasets, many=True)
         return Response(serializer.data)
     
@@ -665,21 +755,25 @@ def user_login_check(request, format=None):
     return ONLY_GET_REQUEST_RESPONSE
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @jwt_authentication
 def user_private_models(request, format=None):
     return user_private_datasets(request, Object=Model, Serializer=ModelSerializer, objects_filter={'is_public': False}, namespace = 'model_', format=format)
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @jwt_authentication
 def user_models(request, format=None):
     return user_private_datasets(request, Object=Model, Serializer=ModelSerializer, objects_filter={}, namespace = 'model_', format=format)
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @jwt_authentication
 def user_private_datasets_api(request, format=None):
     return user_private_datasets(request, Object=Dataset, Serializer=DatasetSerializer, objects_filter={'is_public': False}, namespace = 'dataset_', format=format)
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @jwt_authentication
 def user_datasets_api(request, format=None):
     return user_private_datasets(request, Object=Dataset, Serializer=DatasetSerializer, objects_filter={}, namespace = 'dataset_', format=format)
@@ -698,17 +792,18 @@ def user_private_datasets(
         per_page = request.GET.get("per_page", 10)
         per_page = request.GET.get(f"{namespace}per_page", per_page)
 
-        datasets = Object.objects.filter(**objects_filter, user=user)
-        serializer_data = Serializer(datasets, many=True).data
+        datasets = get_serializer_queryset(Serializer, Object.objects.filter(**objects_filter, user=user)).order_by(*CATALOG_ORDERING)
         
         page_num = request.GET.get(f"page", 1)
         page_num = request.GET.get(f"{namespace}page", page_num)
-        page = get_paginator_page(serializer_data, page_num, per_page)
+        scope = f"owner:{user.id}:" + ",".join(f"{key}={value}" for key, value in sorted(objects_filter.items()))
+        page = get_paginator_page(datasets, page_num, per_page, cache_scope=scope)
+        serializer_data = get_list_serializer_data(Serializer, page.object_list)
 
         return Response({
             'user': str(user),
             'page_number': page.number,
-            'list': page.object_list,
+            'list': serializer_data,
             'total_list_count': page.paginator.count,
             'paginator_num_pages': page.paginator.num_pages,
             'page_has_next': page.has_next(),
@@ -755,10 +850,8 @@ def get_models_api(request):
         .order_by("-created")[:5]
     )
 
-    models_serializer = ModelSerializer(models, many=True)
-
     response_data = {
-        "models": models_serializer.data
+        "models": get_list_serializer_data(ModelSerializer, models)
     }
     return JsonResponse(response_data)
 
@@ -771,10 +864,8 @@ def get_datasets_api(request):
         .order_by("-created")[:5]
     )
     
-    datasets_json = DatasetSerializer(datasets, many=True)
-
     response_data = {
-        "datasets": datasets_json.data
+        "datasets": get_list_serializer_data(DatasetSerializer, datasets)
     }
     return JsonResponse(response_data)
 
@@ -786,7 +877,7 @@ def models(request, format=None):
     List all models, or create a new model.
     """
     if request.method == 'GET':
-        models = Model.objects.all()[:10]
+        models = get_serializer_queryset(ModelSerializer)[:10]
         serializer = ModelSerializer(models, many=True)
         return Response(serializer.data)
 
@@ -802,18 +893,18 @@ def models(request, format=None):
 @permission_classes([]) 
 def dataset_list(request):
     if request.method == 'GET':
-        datasets = Dataset.objects.all()[:10]
+        datasets = get_serializer_queryset(DatasetSerializer)[:10]
         serializer = DatasetSerializer(datasets, many=True)
         return Response(serializer.data)
     return ONLY_GET_REQUEST_RESPONSE
 
 def get_model_list():
-    models = Model.objects.filter(is_public=True)[:10]
+    models = get_serializer_queryset(ModelSerializer, Model.objects.filter(is_public=True))[:10]
     serializer = ModelSerializer(models, many=True)
     return serializer
 
 def get_dataset_list():
-    datasets = Dataset.objects.filter(is_public=True)[:10]
+    datasets = get_serializer_queryset(DatasetSerializer, Dataset.objects.filter(is_public=True))[:10]
     serializer = DatasetSerializer(datasets, many=True)
     return serializer
 
@@ -895,21 +986,33 @@ def get_model_form_data(request, namespace = '', type_namespace = 'model_', zipf
 @api_view(['POST'])
 @jwt_authentication
 def model_form_post(request, format=None):
-    user = request.user   
-    
-    user, response = identify_user_from_jwt_token_from_cookie_with_response(request)
-    if response: return response
+    user = request.user
 
     model_name, model_type, is_public, description, model_zipfile = get_model_form_data(request)
     
     if model_zipfile == None or len(model_zipfile) == 0:
         return REQUIRED_ZIP_FILE_MISSING_RESPONSE
 
-    save_directory, _, _, _, _ = get_unique_model_directory(str(user.id), model_name)
+    save_directory = get_unique_model_directory(str(user.id), model_name)
+
+    if is_task_queue_enabled():
+        task = enqueue_task(EXTRACT_MODEL, {
+            'upload_path': save_upload_for_task(model_zipfile),
+            'directory': save_directory,
+            'user_id': user.id,
+            'name': model_name,
+            'model_type': model_type,
+            'is_public': is_public,
+            'description': description,
+        }, user=user, task_name=f'upload model {model_name}')
+        return task_accepted_response(task)
     
     try:
-        handle_extract_zip_file(model_zipfile, save_directory)
+        handle_extract_zip_file(model_zipfile, save_directory, progress=get_upload_progress(request.POST.get('upload_id')))
         save_model_folder_info_to_database(model_name, user, model_type, save_directory, is_public, description=description)
+    except UnsafeZipError as e:
+        print(f'Rejected zip upload: {e}')
+        return UNSAFE_ZIP_FILE_RESPONSE
     except ValueError:
         return ONLY_ZIP_FILE_TYPE_RESPONSE
 
@@ -938,21 +1041,47 @@ def dataset_form_post(request, format=None):
     if dataset_zipfile == None or len(dataset_zipfile) == 0:
         return REQUIRED_ZIP_FILE_MISSING_RESPONSE
     
-    save_directory, _, _, _, _ = get_unique_dataset_directory(str(user.id), name)
+    save_directory = get_unique_dataset_directory(str(user.id), name)
+
+    if is_task_queue_enabled():
+        task = enqueue_task(EXTRACT_DATASET, {
+            'upload_path': save_upload_for_task(dataset_zipfile),
+            'directory': save_directory,
+            'user_id': user.id,
+            'name': name,
+            'is_public': is_public,
+            'description': description,
+        }, user=user, task_name=f'upload dataset {name}')
+        return task_accepted_response(task)
     
     try:
-        handle_extract_zip_file(dataset_zipfile, save_directory)
+        handle_extract_zip_file(dataset_zipfile, save_directory, progress=get_upload_progress(request.POST.get('upload_id')))
         save_dataset_to_database(name, user, save_directory, is_public, description=description)        
+    except UnsafeZipError as e:
+        print(f'Rejected zip upload: {e}')
+        return UNSAFE_ZIP_FILE_RESPONSE
     except ValueError:
         return ONLY_ZIP_FILE_TYPE_RESPONSE
 
     return SUCCESSFUL_ZIP_FILE_UPLOAD_RESPONSE
 
-def get_paginator_page(object_list, page_num, per_page):
-    paginator = Paginator(object_list, per_page)
+def get_paginator_page(object_list, page_num, per_page, cache_scope=None):
+    """
+    object_list should be an ordered queryset, so the page is sliced in SQL (LIMIT/OFFSET).
+    With a cache_scope the COUNT comes from the catalog cache.
+    """
+    paginator = CachedCountPaginator(object_list, per_page, cache_scope=cache_scope)
     page = paginator.get_page(page_num)
     return page
 
+def get_visibility_scope(user) -> str:
+    """
+    Count cache scope of get_visible_objects(user).
+    """
+    if user == None:
+        return "public"
+    return f"user:{user.id}"
+
 def user_and_public_objects_pages(
         request, 
         object=Model, 
@@ -961,26 +1090,18 @@ def user_and_public_objects_pages(
         per_page=2, 
     ):
     user = identify_user_from_jwt_token_from_request_cookie(request)
-    objects = []
-    
-    if user == None:
-        objects = object.objects.filter(is_public=True)
-
-    if user != None:
-        objects = object.objects.filter(is_public_or_is_user_private(user))
-
-    serializer = objectSerializer(objects, many=True)
-    serializer_data = serializer.data
+    objects = get_serializer_queryset(objectSerializer, get_visible_objects(user, Object=object)).order_by(*CATALOG_ORDERING)
 
     per_page = request.GET.get("per_page", per_page)
     per_page = request.GET.get(f"{namespace}per_page", per_page)
     page_num = request.GET.get(f"{namespace}page")
-    page = get_paginator_page(serializer_data, page_num, per_page)
+    page = get_paginator_page(objects, page_num, per_page, cache_scope=get_visibility_scope(user))
+    serializer_data = get_list_serializer_data(objectSerializer, page.object_list)
 
     return Response({
         'user': str(user),
         'page_number': page.number,
-        'list': page.object_list,
+        'list': serializer_data,
         'total_list_count': page.paginator.count,
         'paginator_num_pages': page.paginator.num_pages,
         'page_has_next': page.has_next(),
@@ -1034,28 +1155,54 @@ def test_page_range(request):
         'page_has_previous': current_page.has_previous(),
     })
 
-def datasets_page_range_function(request, Object=Dataset, Serializer=DatasetSerializer):
+def is_cursor_pagination_request(request):
+    return request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET
+
+def datasets_cursor_page_function(request, Object=Dataset, Serializer=DatasetSerializer):
+    """
+    Keyset pagination, for catalogs too large for page numbers.
+    Query parameters: cursor, per_page, order_by ('created' or 'updated').
+    """
     user = identify_user_from_jwt_token_from_request_cookie(request)
-    queryset = []
+    queryset = get_serializer_queryset(Serializer, get_visible_objects(user, Object=Object))
+    order_by = request.GET.get('order_by', 'created')
 
-    if user == None:
-        queryset = Object.objects.filter(is_public=True)
-    
-    if user != None:        
-        queryset = Object.objects.filter(is_public_or_is_user_private(user))
-        
-    serializer = Serializer(queryset, many=True)
-    serializer_data = serializer.data
+    try:
+        per_page = get_per_page(request.GET.get('per_page'))
+        objects, next_cursor, prev_cursor = keyset_page(
+            queryset, order_field=order_by, cursor=request.GET.get('cursor'), per_page=per_page
+        )
+    except ValueError:
+        return INVALID_CURSOR_RESPONSE
+
+    serializer_data = Serializer(objects, many=True).data
+
+    return JsonResponse({
+        "list": serializer_data,
+        "order_by": order_by,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        'page_has_next': next_cursor != None,
+        'page_has_previous': prev_cursor != None,
+    })
+
+def datasets_page_range_function(request, Object=Dataset, Serializer=DatasetSerializer):
+    if is_cursor_pagination_request(request):
+        return datasets_cursor_page_function(request, Object=Object, Serializer=Serializer)
+
+    user = identify_user_from_jwt_token_from_request_cookie(request)
+    queryset = get_serializer_queryset(Serializer, get_visible_objects(user, Object=Object)).order_by(*CATALOG_ORDERING)
     
     page = request.GET.get('page', 1)
     per_page = request.GET.get('per_page', 1)
-    paginator = Paginator(serializer_data, per_page)
+    paginator = CachedCountPaginator(queryset, per_page, cache_scope=get_visibility_scope(user))
     current_page = paginator.get_page(page)
+    serializer_data = get_list_serializer_data(Serializer, current_page.object_list)
 
     page_range = get_page_range(current_page.number, paginator.num_pages)
     
     return JsonResponse({
-        "list": current_page.object_list,
+        "list": serializer_data,
         "current_page": current_page.number,
         'page_has_next': current_page.has_next(),
         'page_has_previous': current_page.has_previous(),
@@ -1076,48 +1223,58 @@ def models_page_range(request):
     return datasets_page_range_function(request, Object=Model, Serializer=ModelSerializer)
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @empty_default_authentication_classes_and_permission_classes
 def user_and_public_models_pages(request):
     return user_and_public_objects_pages(request, object=Model, objectSerializer=ModelSerializer, namespace='model_')
 
 @api_view(['GET'])
+@renderer_classes(CATALOG_RENDERER_CLASSES)
 @empty_default_authentication_classes_and_permission_classes
 def user_and_public_datasets_pages(request):
     return user_and_public_objects_pages(request, object=Dataset, objectSerializer=DatasetSerializer, namespace='dataset_')
 
-@api_view(['GET', 'POST'])
-@empty_default_authentication_classes_and_permission_classes
-def search_model_by_name(request):
+def search_objects_by_name(
+        request, 
+        Object=Model, 
+        objectSerializer=ModelSerializer, 
+        namespace='model_', 
+        LIMIT=5,
+    ):
     user = identify_user_from_jwt_token_from_request_cookie(request)
-   
-    models = []
+    visible_objects = get_serializer_queryset(objectSerializer, get_visible_objects(user, Object=Object))
+
+    objects = []
     q = request.GET.get("query")
-    LIMIT = 5
 
     if request.method == "POST":
         q = request.POST.get("query", q)
     
     if q:
-        models = Model.objects.filter(
-            Q(name__icontains=q)
-            & is_public_or_is_user_private(user)
-        )[:LIMIT]
+        objects = list(search_catalog(visible_objects, q, limit=LIMIT))
 
-    if not models:
-        models = Model.objects.all()[:LIMIT]
-
-    objectSerializer = ModelSerializer
-    objects = models
+    if not objects:
+        objects = visible_objects.order_by(*CATALOG_ORDERING)[:LIMIT]
 
     serializer = objectSerializer(objects, many=True)
     serializer_data = serializer.data
     
     data = {
-        "search_model_query_value": q, 
+        f"search_{namespace}query_value": q, 
         "list": serializer_data
     }
     return Response(data)
 
+@api_view(['GET', 'POST'])
+@empty_default_authentication_classes_and_permission_classes
+def search_model_by_name(request):
+    return search_objects_by_name(request, Object=Model, objectSerializer=ModelSerializer, namespace='model_')
+
+@api_view(['GET', 'POST'])
+@empty_default_authentication_classes_and_permission_classes
+def search_dataset_by_name(request):
+    return search_objects_by_name(request, Object=Dataset, objectSerializer=DatasetSerializer, namespace='dataset_')
+
 HTTP_METHOD_NAMES = [
     "get",
     "post",
@@ -1137,7 +1294,7 @@ class DatasetDetail(APIView):
         user = identify_user_from_jwt_token_from_request_cookie(request)
         try:
             dataset = Dataset.objects.get(id=id)            
-            if dataset and (not dataset.is_public) and dataset.user != user:
+            if obj_and_is_not_public_and_not_owner(dataset, user):
                 print('no access permission response')
                 return NO_ACCESS_PERMISSION_RESPONSE
         except Dataset.DoesNotExist:
@@ -1145,7 +1302,7 @@ class DatasetDetail(APIView):
 
         serializer = DatasetSerializer(dataset)
         serializer_data = serializer.data
-        readme_markdown = search_and_get_readme_markdown_by_directory(dataset.dataset_directory)
+        readme_markdown = get_union_readme_markdown(get_layers(dataset))
         serializer_data['markdown'] =  readme_markdown
         return Response(serializer_data)
     
@@ -1156,12 +1313,14 @@ class DatasetDetail(APIView):
 
         try:
             dataset = Dataset.objects.get(id=id, user=user)            
-            success = remove_directory(dataset.dataset_directory)
-            if success:
-                dataset.delete()
-                return Response({'success': True, 'message': 'Delete Success.'})
-            if not success:
+            if is_task_queue_enabled():
+                return delete_object_in_background(dataset, dataset.dataset_directory, user)
+            if not os.path.isdir(dataset.dataset_directory):
                 return Response({'success': False, 'message': 'Dataset directory not found.'})
+            # Deleted first: lazy forks reading through this directory copy what they need on pre_delete.
+            dataset.delete()
+            remove_directory(dataset.dataset_directory)
+            return Response({'success': True, 'message': 'Delete Success.'})
         except Dataset.DoesNotExist:
             return Response({'success': False, 'message': 'Dataset not found.'})
 
@@ -1174,14 +1333,14 @@ class ModelDetail(APIView):
 
         try:
             model = Model.objects.get(id=id)
-            if model and not model.is_public and model.user != user:
+            if obj_and_is_not_public_and_not_owner(model, user):
                 return NO_ACCESS_PERMISSION_RESPONSE
         except Model.DoesNotExist:
             return NOT_FOUND_INVALID_ID_OR_DELETED_RECORD_RESPONSE
         
         serializer = ModelSerializer(model)
         serializer_data = serializer.data
-        readme_markdown = search_and_get_readme_markdown_by_directory(model.model_directory)
+        readme_markdown = get_readme_markdown(model.model_directory)
         serializer_data['markdown'] =  readme_markdown
         return Response(serializer_data)
     
@@ -1192,6 +1351,8 @@ class ModelDetail(APIView):
 
         try:
             model = Model.objects.get(id=id, user=user)            
+            if is_task_queue_enabled():
+                return delete_object_in_background(model, model.model_directory, user)
             success = remove_directory(model.model_directory)
             if success:
                 model.delete()
@@ -1201,41 +1362,73 @@ class ModelDetail(APIView):
         except Model.DoesNotExist:
             return Response({'success': False, 'message': 'Model not found.'})
 
+def delete_object_in_background(obj, directory: str, user):
+    """
+    Delete the row now and leave removing its directory, moved out of the way first,
+    to a task.
+    """
+    if not os.path.isdir(directory):
+        return Response({'success': False, 'message': 'Directory not found.'})
+    obj.delete()
+    trash_path = move_to_trash(directory)
+    task = enqueue_task(DELETE_DIRECTORY, {'directory': trash_path}, user=user, task_name=f'delete {directory}')
+    return task_accepted_response(task)
+
 def remove_directory(dir):
     if os.path.exists(dir) and os.path.isdir(dir):
         shutil.rmtree(dir)
         return True
     return False
 
-def is_public_or_is_user_private(user):
-    return (
-        Q(is_public=True)
-        | Q(is_public=False, user=user)
-    )
+NO_FILES_TO_ZIP_RESPONSE = HttpResponse("No files scanned/found to zip", status=400)
 
-BASE_TMP_DIR = os.path.join(BASE_DIR, 'tmp')
+def make_zip_filename(path: str) -> str:
+    return f'{path_normpath_basename(path)}.zip'
 
-def make_zip_path(path: str) -> str:
-    zip_filename = f'{path_normpath_basename(path)}.zip'
-    zip_path = os.path.join(BASE_TMP_DIR, zip_filename)
-    return zip_filename, zip_path
+def download_zip(request, folder_path: str, zip_filename: str, layers: list = None):
+    """
+    Serve folder_path as a ZIP from the archive cache (serve_file: sendfile or
+    web server offload). On a miss the archive is streamed while it is built
+    and saved to the cache once complete. With layers (a lazy fork, see
+    polls/overlay.py) the archive holds the union of the layers.
+
+    The archive key is the ETag, so If-None-Match gets a 304 without building
+    anything. A Range request on a miss builds the archive first, then resumes from
+    the cache; when the archive cannot fit the cache the Range is ignored and the
+    whole archive is streamed (200) instead of being built for nothing.
+    """
+    layers = layers or [folder_path]
+    if not any(os.path.isdir(layer) and any(os.scandir(layer)) for layer in layers):
+        return NO_FILES_TO_ZIP_RESPONSE
+
+    compression = get_zip_compression(request)
+    key = get_union_archive_key(layers, compression)
+    etag = f'"{key}"'
+    archive_path = get_cached_archive(key)
+
+    if archive_path == None:
+        response = get_not_modified_response(request, etag)
+        if response != None:
+            return response
 
-def download_zip(folder_path: str):    
-    _, zip_path = make_zip_path(folder_path)
+    if archive_path == None:
+        entries = list(iter_union_entries(layers))
+        size = sum(entry.size for entry in entries)
 
-    if not any(os.scandir(folder_path)):
-        return "No files scanned/found to zip"
-    
-    with zipfile.ZipFile(zip_path, 'w') as zip_file:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zip_file.write(file_path, os.path.relpath(file_path, folder_path))
+    if archive_path == None and 'HTTP_RANGE' in request.META and is_cacheable_size(size):
+        chunks = iter_zip(entries, compression=compression)
+        archive_path = build_cached_archive(chunks, folder_path, key, size)
 
-    return zip_path    
+    if archive_path != None:
+        return serve_file(request, archive_path, 'application/zip', filename=zip_filename, as_attachment=True, etag=etag)
+
+    chunks = iter_zip(entries, compression=compression)
+    response = streaming_chunks_response(request, iter_caching_archive(chunks, folder_path, key, size), zip_filename)
+    response['ETag'] = etag
+    return response
 
 def is_not_public_and_not_owner(obj, user):
-    return not obj.is_public and obj.user != user
+    return not obj.is_public and obj.user_id != getattr(user, 'id', None)
 
 def obj_and_is_not_public_and_not_owner(obj, user):
     return obj and is_not_public_and_not_owner(obj, user)
@@ -1249,9 +1442,6 @@ def check_obj_exist_and_user_has_access_permission(obj, user):
     
     return None
 
-def remove_temp_path(path: str):
-    os.remove(path)
-
 def download_obj_zip(request, id, Obj, get_obj_directory: Callable):
     user = identify_user_from_jwt_token_from_request_cookie(request)
     try:
@@ -1259,23 +1449,11 @@ def download_obj_zip(request, id, Obj, get_obj_directory: Callable):
     except Obj.DoesNotExist:
         return NOT_FOUND_INVALID_ID_OR_DELETED_RECORD_RESPONSE
     
-    if not obj.is_public and obj.user != user:
+    if is_not_public_and_not_owner(obj, user):
         return NO_ACCESS_PERMISSION_RESPONSE
 
     folder_path = get_obj_directory(obj)
-    
-    zip_path = download_zip(folder_path)
-    
-    if zip_path == "No files scanned/found to zip":
-        return HttpResponse(zip_path, status=400)
-    
-    with open(zip_path, 'rb') as zip_file:        
-        zip_filename = f'{obj.name}.zip'
-        response = HttpResponse(zip_file.read(), content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-        remove_temp_path(zip_path)
-        return response 
-
+    return download_zip(request, folder_path, f'{obj.name}.zip', layers=get_layers(obj))
 
 
 @api_view(['GET'])
@@ -1292,20 +1470,7 @@ def download_model_zip(request, id):
 @empty_default_authentication_classes_and_permission_classes
 def test_download_dataset_zip(request):    
     folder_path = "static/dataset/CS_dataset"
-    
-    zip_filename, _ = make_zip_path(folder_path)
-
-    zip_path = download_zip(folder_path)
-
-    if zip_path == "No files scanned/found to zip":
-        return HttpResponse(zip_path, status=400)
-    
-    with open(zip_path, 'rb') as zip_file:        
-        response = HttpResponse(zip_file.read(), content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-        return response 
-    
-    return 
+    return download_zip(request, folder_path, make_zip_filename(folder_path))
 
 def path_basename(path: str) -> str:
     """
@@ -1339,13 +1504,10 @@ def download_zip_stream(request, id):
     except Dataset.DoesNotExist:
         return DATASET_NOT_FOUND_INVALID_ID_OR_DELETED_RECORD_RESPONSE
     
-    if not dataset.is_public and dataset.user != user:
+    if is_not_public_and_not_owner(dataset, user):
         return NO_ACCESS_PERMISSION_RESPONSE
 
-    zip_path = download_zip(dataset.dataset_directory)
-    response = FileResponse(open(zip_path, 'rb'), content_type='application/zip')
-    response['Content-Disposition'] = 'attachment; filename="files.zip"'
-    return response
+    return download_zip(request, dataset.dataset_directory, "files.zip", layers=get_layers(dataset))
 
 @api_view(['GET'])
 @empty_default_authentication_classes_and_permission_classes
@@ -1424,17 +1586,24 @@ def get_dataset_image(request, user_id, dataset_name, image_path, Object=Dataset
         print(' dataset not found')
         return HttpResponse(None, content_type=content_type)
     
-    if dataset and not dataset.is_public and dataset.user != user:
-        print(f' dataset: no access permission {dataset.is_public} {dataset.user} {user}')
+    if obj_and_is_not_public_and_not_owner(dataset, user):
+        print(f' dataset: no access permission {dataset.is_public} {dataset.user_id} {getattr(user, "id", None)}')
         return HttpResponse(None, content_type=content_type)
     
-    if os.path.exists(file_path_) and os.path.isdir(file_path_):        
+    layers = get_layers(dataset)
+    if is_union_directory(layers, image_path):
         return get_dataset_file_tree(request, user_id, dataset_name, image_path)
 
+    file_path = resolve_path(layers, image_path)
+    if file_path == None:
+        return HttpResponse(None, content_type=content_type, status=404)
+
     if ((dataset and dataset.is_public) 
         or 
         (dataset and not dataset.is_public and dataset.user == user)
         ):
+        if file_read_type == 'rb' and not ("readme" in file_path.lower() or file_path.endswith(".md")):
+            return serve_file(request, file_path, content_type)
         with open(file_path, file_read_type) as file:
             data = file.read()
             if "readme" in file_path.lower() or file_path.endswith(".md"):
@@ -1449,35 +1618,78 @@ def get_model_image(request, user_id, model_name, image_path):
     print(' - get_model_image ')
     return get_dataset_image(request, user_id, model_name, image_path, Object=Model, lookup_key='model_directory', get_unique_directory=get_unique_model_directory)
 
+TREE_OBJECT_FIELDS = {
+    Dataset: ('id', 'is_public', 'user_id', 'dataset_directory', 'is_overlay', 'original_dataset_id'),
+    Model: ('id', 'is_public', 'user_id', 'model_directory'),
+}
+
 def get_dataset_file_tree(request, user_id, dataset_name, path, Object=Dataset, root_dir=ROOT_DATASET_DIR, lookup_key='dataset_directory'):
+    """
+    One level of the directory tree, read from the file index (polls/file_index.py)
+    instead of stat()ing every entry, optionally one page at a time.
+
+    ?offset=&limit= page it (without limit the whole level is listed), ?sort=name|size|mtime
+    (-size for descending) orders it, ?glob=*.png and ?ext=png,jpg filter it.
+    A lazy fork lists the union of its layers (polls/overlay.py).
+    """
     print(' - get_dataset_file_tree ')
     dataset_base_directory = get_unique_dataset_directory(str(user_id), dataset_name, root_dir=root_dir)
     dataset_directory = os.path.join(dataset_base_directory, path)
     user = identify_user_from_jwt_token_from_request_cookie(request)
-    if not os.path.exists(dataset_directory) or not os.path.isdir(dataset_directory):
-        return JsonResponse({"error": "Invalid directory path"}, status=400)
-    
-    dataset = Object.objects.get(**{lookup_key: dataset_base_directory})
+
+    dataset = Object.objects.filter(**{lookup_key: dataset_base_directory}).only(*TREE_OBJECT_FIELDS[Object]).first()
 
     if not dataset:
         return NOT_FOUND_INVALID_QUERY_OR_DELETED_RECORD_RESPONSE
     
-    if dataset and not dataset.is_public and dataset.user != user:
+    if is_not_public_and_not_owner(dataset, user):
         return NO_ACCESS_PERMISSION_RESPONSE
 
     try:
-        files_and_dirs = os.listdir(dataset_directory)
-        tree = []
-        
-        for item in files_and_dirs:
-            full_path = os.path.join(dataset_directory, item)
-            tree.append({
-                "name": item,
-                "is_dir": os.path.isdir(full_path),
-                "size": os.path.getsize(full_path) if os.path.isfile(full_path) else None,
-            })
-        
-        return JsonResponse({"path": dataset_directory, "tree": tree}, status=200)
+        offset = max(0, int(request.GET.get('offset') or 0))
+        limit = get_per_page(request.GET.get('limit'), default=None, maximum=TREE_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "offset and limit must be integers"}, status=400)
+    glob = request.GET.get('glob')
+    extensions = [extension for extension in request.GET.get('ext', '').split(',') if extension]
+    sort = request.GET.get('sort') or 'name'
+    if sort.lstrip('-') not in TREE_SORT_FIELDS:
+        return JsonResponse({"error": f"sort must be one of {', '.join(TREE_SORT_FIELDS)} (prefix - for descending)"}, status=400)
+    end = None if limit == None else offset + limit
+
+    try:
+        if is_overlay(dataset):
+            rows = list_union_directory(get_layers(dataset), path, glob=glob, extensions=extensions, sort=sort)
+            if rows == None:
+                return JsonResponse({"error": "Invalid directory path"}, status=400)
+            total = len(rows)
+            rows = rows[offset:end]
+        else:
+            entries = get_directory_listing(dataset_base_directory, path)
+            if entries == None:
+                return JsonResponse({"error": "Invalid directory path"}, status=400)
+
+            entries = sort_listing(entries, sort)
+            if glob or extensions:
+                entries = filter_listing(entries, glob=glob, extensions=extensions)
+                total = entries.count()
+            else:
+                total = get_directory_child_count(dataset_base_directory, path)
+            rows = entries.values_list('name', 'is_dir', 'size', 'child_count', 'mtime_ns')[offset:end]
+
+        tree = [
+            {"name": name, "is_dir": is_dir, "size": size, "child_count": child_count, "mtime": mtime_ns / 1e9}
+            for name, is_dir, size, child_count, mtime_ns in rows
+        ]
+        next_offset = end if end != None and end < total else None
+        return JsonResponse({
+            "path": dataset_directory,
+            "tree": tree,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+        }, status=200)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -1545,6 +1757,25 @@ def fork_object_handle(request, object_type='dataset', model_type=None):
     object_name = request.POST.get('name', '')
     is_public = request.POST.get('is_public', True)
     description = request.POST.get('description', '')
+    try:
+        is_visible = get_visible_objects(user, Model if model_type else Dataset).filter(id=object_id).exists()
+    except (ValueError, TypeError):
+        is_visible = False
+    if not is_visible:
+        return JsonResponse({
+            'success': False, 
+            'message': 'Failed to fork.'
+        })
+    if is_task_queue_enabled():
+        task = enqueue_task(FORK_MODEL if model_type else FORK_DATASET, {
+            'object_id': object_id,
+            'user_id': user.id,
+            'name': object_name,
+            'model_type': model_type,
+            'is_public': is_public,
+            'description': description,
+        }, user=user, task_name=f'fork {object_type} {object_id}')
+        return task_accepted_response(task)
     try:
         if model_type:
             model = fork_model(object_id, user, object_name, model_type, is_public, description=description)
@@ -1608,6 +1839,25 @@ def create_and_get_task_id(request):
         JsonResponse({'success': False, 'message': 'Failed to create a Task'}) 
     return JsonResponse({'success': True, 'task_id': task.id}) 
 
+@api_view(['GET'])
+@jwt_authentication
+def get_task_status(request, id):
+    task = Task.objects.filter(id=id, user=request.user).first()
+    if task == None:
+        return TASK_NOT_FOUND_RESPONSE
+    return Response({
+        'success': True,
+        'task_id': task.id,
+        'kind': task.kind,
+        'status': task.status,
+        'progress': task.progress,
+        'result': task.result,
+        'error': task.error,
+        'created': task.created,
+        'started': task.started,
+        'finished': task.finished,
+    })
+
 def store_temporary_file(file, filename='afile', base_tmp_dir="tmp/", file_extension=''):
     handle_uploaded_file(file, filename=filename, dir=base_tmp_dir, file_extension=file_extension)
     return os.path.join(base_tmp_dir, f"{filename}{file_extension}")
@@ -1650,16 +1900,29 @@ def read_dataset_from_minio(request, id):
     file_extension = get_file_extension(dataset_dir)
     content_type = FILE_TYPES_DICT.get(file_extension)
     if not content_type:
-        file_content, status_code = minio_service.get_zipped_file(dataset_dir)
-        content_type = 'application/zip'
         file_extension = '.zip'
+        entries = minio_service.iter_zip_entries(dataset_dir)
+        response = streaming_zip_response(request, entries, f'{dataset_dir}{file_extension}', compression=get_zip_compression(request))
     else:
-        file_content = minio_service.read_file_from_minio(dataset_dir)
-    
-    response = HttpResponse(file_content, content_type=content_type)
+        response = minio_object_response(request, dataset_dir, content_type)
+        if response == None:
+            return DATASET_NOT_FOUND_INVALID_ID_OR_DELETED_RECORD_RESPONSE
+
     response['Content-Disposition'] = f'attachment; filename="{dataset_dir}{file_extension}"'
     return response
 
+def minio_object_response(request, object_name, content_type):
+    """
+    Stream a MinIO object with its ETag and Last-Modified; conditional requests get a 304
+    and Range requests only fetch the asked bytes from MinIO. None if the object is missing.
+    """
+    stat = minio_service.stat_object(object_name)
+    if stat == None:
+        return None
+    read_range = lambda offset, length: minio_service.iter_object_range(object_name, offset, length)
+    last_modified = int(stat.last_modified.timestamp()) if stat.last_modified else None
+    return ranged_stream_response(request, stat.size, read_range, content_type, etag=f'"{stat.etag}"', last_modified=last_modified)
+
 @api_view(['GET'])
 @empty_default_authentication_classes_and_permission_classes
 def test_get_zip_file_from_minio(request):
@@ -1799,13 +2062,10 @@ def temp(request):
     return SUCCESS_RESPONSE
 
 def upload_all_datasets_to_minio(local_dir=ROOT_MODEL_DIR, base_root='model'):
-    """ Developer tool."""
-    for root, _, files in os.walk(local_dir):
-        for file in files:
-            local_file_path = os.path.join(root, file)
-            object_name = os.path.relpath(local_file_path, local_dir)
-            object_name = os.path.join(base_root, object_name)
-            minio_service.save_file_as_object(object_name, local_file_path)
+    """ Developer tool. Unchanged objects are skipped, so it can be rerun after an interruption."""
+    report = minio_service.sync_directory(local_dir, base_root)
+    if report == None or report['failed']:
+        return Response({"success": False, "sync": report}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     return SUCCESS_RESPONSE
 
 def delete_all_django_datasets_in_minio(local_dir=ROOT_DATASET_DIR, base_root='dataset'):
@@ -0,0 +1,192 @@
+import os
+import uuid
+import hashlib
+
+from django.conf import settings
+
+from .pagination import get_catalog_cache
+from .file_index import get_path_ancestors
+
+ARCHIVE_CACHE_DEFAULT_MAX_BYTES = 10 * 1024 ** 3 # 10 GB
+ARCHIVE_SUFFIX = ".zip"
+FINGERPRINT_CACHE_PREFIX = "archive:fingerprint"
+FINGERPRINT_CACHE_DEFAULT_TIMEOUT = 60 * 60 # seconds
+
+def get_archive_cache_dir() -> str:
+    return getattr(settings, 'ARCHIVE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'archive_cache'))
+
+def get_archive_cache_max_bytes() -> int:
+    """
+    Disk budget of the cached archives; 0 turns the cache off.
+    """
+    return getattr(settings, 'ARCHIVE_CACHE_MAX_BYTES', ARCHIVE_CACHE_DEFAULT_MAX_BYTES)
+
+def get_fingerprint_cache_timeout() -> int:
+    return getattr(settings, 'ARCHIVE_FINGERPRINT_CACHE_TIMEOUT', FINGERPRINT_CACHE_DEFAULT_TIMEOUT)
+
+def get_archives_dir() -> str:
+    return os.path.join(get_archive_cache_dir(), 'archives')
+
+def get_refs_dir() -> str:
+    return os.path.join(get_archive_cache_dir(), 'refs')
+
+def get_directory_manifest_fingerprint(folder_path: str) -> str:
+    """
+    sha256 of the sorted (relative path, size, mtime_ns) manifest of folder_path.
+    Same files, same fingerprint; any added, removed, resized or touched file changes it.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(folder_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            stat = os.stat(file_path)
+            relpath = os.path.relpath(file_path, folder_path)
+            digest.update(f"{relpath}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+def get_directory_hash(folder_path: str) -> str:
+    return hashlib.sha256(os.path.realpath(folder_path).encode('utf-8', 'surrogateescape')).hexdigest()
+
+def get_fingerprint_cache_key(folder_path: str) -> str:
+    return f"{FINGERPRINT_CACHE_PREFIX}:{get_directory_hash(folder_path)}"
+
+def get_cached_fingerprint(folder_path: str) -> str:
+    """
+    get_directory_manifest_fingerprint() of folder_path, kept in the catalog cache
+    until the directory is written (invalidate_archive_cache()), so a cache hit or a
+    304 does not stat every file. Writes that bypass the invalidation are seen once
+    ARCHIVE_FINGERPRINT_CACHE_TIMEOUT expires.
+    """
+    cache = get_catalog_cache()
+    key = get_fingerprint_cache_key(folder_path)
+    fingerprint = cache.get(key)
+    if fingerprint == None:
+        fingerprint = get_directory_manifest_fingerprint(folder_path)
+        cache.set(key, fingerprint, get_fingerprint_cache_timeout())
+    return fingerprint
+
+def get_archive_key(folder_path: str, compression: int) -> str:
+    return f"{get_cached_fingerprint(folder_path)}-{compression}"
+
+def get_archive_path(key: str) -> str:
+    return os.path.join(get_archives_dir(), f"{key}{ARCHIVE_SUFFIX}")
+
+def get_ref_path(folder_path: str) -> str:
+    return os.path.join(get_refs_dir(), get_directory_hash(folder_path))
+
+def get_cached_archive(key: str):
+    """
+    Path of the archive cached under key, or None. A hit counts as a use for LRU eviction.
+    """
+    archive_path = get_archive_path(key)
+    try:
+        os.utime(archive_path)
+    except FileNotFoundError:
+        return None
+    return archive_path
+
+def add_ref(folder_path: str, key: str):
+    os.makedirs(get_refs_dir(), exist_ok=True)
+    with open(get_ref_path(folder_path), 'a') as ref:
+        ref.write(f"{key}\n")
+
+def is_cacheable_size(size: int) -> bool:
+    """
+    Whether an archive of size bytes fits the cache (never when the cache is off).
+    """
+    max_bytes = get_archive_cache_max_bytes()
+    return max_bytes > 0 and size <= max_bytes
+
+def iter_caching_archive(chunks, folder_path: str, key: str, size: int = 0):
+    """
+    Pass the archive chunks through while writing them to the cache.
+
+    The archive is published under key (atomic rename) only once the last chunk
+    went out, so a cancelled download leaves nothing behind. size, the total size
+    of the members when known, lets an archive that cannot fit stream straight
+    through instead of being written and then discarded.
+    """
+    if not is_cacheable_size(size):
+        yield from chunks
+        return
+
+    os.makedirs(get_archives_dir(), exist_ok=True)
+    archive_path = get_archive_path(key)
+    temp_path = f"{archive_path}.{uuid.uuid4().hex}.tmp"
+    completed = False
+    try:
+        with open(temp_path, 'wb') as archive:
+            for chunk in chunks:
+                archive.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed and os.path.getsize(temp_path) <= get_archive_cache_max_bytes():
+            os.replace(temp_path, archive_path)
+            add_ref(folder_path, key)
+            evict_archives(keep=archive_path)
+        elif os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def build_cached_archive(chunks, folder_path: str, key: str, size: int = 0):
+    """
+    Write the whole archive to the cache without sending it (a resumed download
+    needs byte offsets into the finished file). Path of the archive, or None when the
+    cache is off or the archive does not fit; check is_cacheable_size(size) first.
+    """
+    for _ in iter_caching_archive(chunks, folder_path, key, size):
+        pass
+    return get_cached_archive(key)
+
+def evict_archives(keep: str = None):
+    """
+    Remove least recently used archives until the cache fits ARCHIVE_CACHE_MAX_BYTES.
+    Archives being served stay readable through their open file handles.
+    """
+    archives = []
+    with os.scandir(get_archives_dir()) as entries:
+        for entry in entries:
+            if entry.name.endswith(ARCHIVE_SUFFIX) and entry.is_file():
+                stat = entry.stat()
+                archives.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total_size <= get_archive_cache_max_bytes():
+            break
+        if path == keep:
+            continue
+        remove_file(path)
+        total_size -= size
+
+def invalidate_archive_cache(folder_path: str):
+    """
+    Drop the archives built from folder_path and its fingerprint (on upload, fork,
+    delete or any write into it).
+    """
+    get_catalog_cache().delete(get_fingerprint_cache_key(folder_path))
+    ref_path = get_ref_path(folder_path)
+    try:
+        with open(ref_path) as ref:
+            keys = set(ref.read().split())
+    except FileNotFoundError:
+        return
+
+    for key in keys:
+        remove_file(get_archive_path(key))
+    remove_file(ref_path)
+
+def invalidate_path_archive_cache(path: str):
+    """
+    invalidate_archive_cache() of every directory that is path or contains it, after
+    path was written.
+    """
+    for directory in {os.path.realpath(ancestor) for ancestor in get_path_ancestors(path)}:
+        invalidate_archive_cache(directory)
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
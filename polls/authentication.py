@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+
+ACCESS_TOKEN_CACHE_SIZE = 4096
+ACCESS_TOKEN_CACHE_TTL = 60 # seconds
+
+class ValidatedTokenCache:
+    """
+    In-process LRU of access token string -> validated token (and so its user id),
+    so a token's signature and claims are checked once per TTL instead of on every request.
+
+    An entry lives at most `ttl` seconds and never past the token's `exp` claim.
+    """
+
+    def __init__(self, maxsize: int = ACCESS_TOKEN_CACHE_SIZE, ttl: float = ACCESS_TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token: str):
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry == None:
+                return None
+            validated_token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[raw_token]
+                return None
+            self._entries.move_to_end(raw_token)
+            return validated_token
+
+    def set(self, raw_token: str, validated_token):
+        expires_at = min(time.time() + self.ttl, validated_token.get("exp", 0))
+        with self._lock:
+            self._entries[raw_token] = (validated_token, expires_at)
+            self._entries.move_to_end(raw_token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+validated_token_cache = ValidatedTokenCache()
+
+def get_validated_token(jwt_authentication, raw_token: str):
+    """
+    jwt_authentication.get_validated_token(raw_token), served from validated_token_cache.
+    Raises InvalidToken like the uncached call.
+    """
+    validated_token = validated_token_cache.get(raw_token)
+    if validated_token == None:
+        validated_token = jwt_authentication.get_validated_token(raw_token)
+        validated_token_cache.set(raw_token, validated_token)
+    return validated_token
+
+USERNAME_CLAIM = "username"
+
+def add_user_claims(token, user):
+    """
+    Claims get_claims_user can build the user from. Access tokens made from
+    this refresh token (refresh.access_token) copy them.
+    """
+    token[USERNAME_CLAIM] = user.get_username()
+    return token
+
+def get_claims_user(validated_token):
+    """
+    A User carrying only the token's claims (id, and username when present).
+    Other fields are deferred: reading one loads it from the database.
+    """
+    user_id_field = jwt_api_settings.USER_ID_FIELD
+    field_names = [user_id_field]
+    values = [validated_token[jwt_api_settings.USER_ID_CLAIM]]
+
+    username = validated_token.get(USERNAME_CLAIM)
+    if username != None:
+        field_names.append(User.USERNAME_FIELD)
+        values.append(username)
+
+    concrete_attnames = [field.attname for field in User._meta.concrete_fields]
+    ordered = sorted(zip(field_names, values), key=lambda item: concrete_attnames.index(item[0]))
+    return User.from_db(
+        DEFAULT_DB_ALIAS,
+        [name for name, _ in ordered],
+        [value for _, value in ordered],
+    )
+
+class JWTClaimsUserAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the signed claims instead of loading the user
+    row on every request (like simplejwt's TokenUser, but a real User instance,
+    so it works in ORM filters, foreign keys and owner checks).
+
+    Deactivating or deleting a user takes effect when their access token expires.
+    """
+
+    def get_user(self, validated_token):
+        if jwt_api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return get_claims_user(validated_token)
@@ -0,0 +1,270 @@
+import os
+import uuid
+import hashlib
+import itertools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Blob, BlobReference
+
+HASH_CHUNK_SIZE = 1024 * 1024 # 1 MB
+BLOB_STORE_BATCH_SIZE = 1000
+BLOB_STORE_DEFAULT_WORKERS = 4
+# Every link to a blob shares its inode, and so its mode: writes in place fail
+# instead of changing the file of every dataset/model linked to it.
+BLOB_FILE_MODE = 0o444
+
+def is_blob_store_enabled() -> bool:
+    return getattr(settings, 'BLOB_STORE_ENABLED', False)
+
+def get_blob_store_dir() -> str:
+    return str(getattr(settings, 'BLOB_STORE_DIR', os.path.join(settings.BASE_DIR, 'asset', 'blobs')))
+
+def get_blob_store_workers() -> int:
+    return getattr(settings, 'BLOB_STORE_WORKERS', BLOB_STORE_DEFAULT_WORKERS)
+
+def get_blob_path(digest: str) -> str:
+    return os.path.join(get_blob_store_dir(), 'sha256', digest[:2], digest[2:4], digest)
+
+def hash_file(path: str) -> tuple:
+    """
+    (SHA-256 hex digest, size) of the file at path. hashlib releases the GIL on
+    large updates, so files hash in parallel on a thread pool.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def iter_relpaths(root: str):
+    """
+    Relative paths of the regular files under root. Symlinks are not followed.
+    """
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield os.path.relpath(path, root).replace(os.sep, '/')
+
+def is_linked_to_blob(path: str, digest: str) -> bool:
+    try:
+        return os.path.samefile(path, get_blob_path(digest))
+    except OSError:
+        return False
+
+def is_blob_file(path: str, digest: str, size: int = None, created=None) -> bool:
+    """
+    Whether path is still the unmodified blob of digest: the same inode, and, when
+    given, the blob's size and no write since the blob was created. A file written in
+    place (instead of replaced, see polls.fork.unlink_shared) fails the check.
+    """
+    if not is_linked_to_blob(path, digest):
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if size != None and stat.st_size != size:
+        return False
+    return created == None or stat.st_mtime <= created.timestamp()
+
+def discard_blob_file(digest: str):
+    """
+    Take a blob that was written through one of its links out of the store: it no
+    longer holds digest, so no new file may be linked to it. Every manifest still
+    referencing it is hashed again on its next ingest.
+    """
+    print(f'Blob {digest} was modified in place, discarding it')
+    try:
+        os.remove(get_blob_path(digest))
+    except FileNotFoundError:
+        pass
+
+def link_in_place(source: str, path: str) -> bool:
+    """
+    Atomically replace path by a hardlink to source. False when they cannot share an
+    inode (another filesystem, or no hardlinks), in which case path is left alone.
+    """
+    temp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.blob")
+    try:
+        os.link(source, temp_path)
+    except OSError as e:
+        print(f'Blob store link error for {path}: {e}')
+        return False
+    os.replace(temp_path, path)
+    return True
+
+def store_blob(path: str, digest: str) -> tuple:
+    """
+    Make path and the blob of digest one inode: the first file with a digest becomes
+    the blob (made read-only, BLOB_FILE_MODE), later ones are replaced by hardlinks to
+    it. Returns (bytes newly stored, bytes freed).
+    """
+    blob_path = get_blob_path(digest)
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(path, blob_path)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            print(f'Blob store link error for {path}: {e}')
+            return 0, 0
+        else:
+            os.chmod(blob_path, BLOB_FILE_MODE)
+            return os.path.getsize(blob_path), 0
+    if os.path.samefile(blob_path, path):
+        return 0, 0
+    size = os.path.getsize(path)
+    return 0, size if link_in_place(blob_path, path) else 0
+
+def ingest_directory(root: str, max_workers: int = None) -> dict:
+    """
+    Deduplicate root (a dataset/model directory) into the blob store and record its
+    manifest. Files keep their paths, so nothing reading the directory changes; each
+    one becomes a read-only hardlink to its blob, so writers must replace files (see
+    polls.fork.unlink_shared, or break_hardlink before an edit in place). Paths of the manifest
+    still linked to their unmodified blob are skipped; files replaced or removed since
+    are released and hashed again, and a blob edited in place is discarded.
+
+    Returns {'files', 'bytes', 'stored_bytes', 'saved_bytes'} of this run.
+    """
+    report = Counter(files=0, bytes=0, stored_bytes=0, saved_bytes=0)
+    if not os.path.isdir(root):
+        return dict(report)
+
+    references = BlobReference.objects.filter(root=root).values_list('path', 'blob_id', 'blob__size', 'blob__created')
+    known = set()
+    changed = []
+    for relpath, digest, size, created in references:
+        known.add(relpath)
+        path = os.path.join(root, relpath)
+        if is_blob_file(path, digest, size, created):
+            continue
+        changed.append(relpath)
+        if is_linked_to_blob(path, digest):
+            discard_blob_file(digest)
+    for start in range(0, len(changed), BLOB_STORE_BATCH_SIZE):
+        release_manifest(root, paths=changed[start:start + BLOB_STORE_BATCH_SIZE])
+    unchanged = known - set(changed)
+    relpaths = (relpath for relpath in iter_relpaths(root) if relpath not in unchanged)
+    with ThreadPoolExecutor(max_workers=max_workers or get_blob_store_workers()) as pool:
+        while True:
+            batch = list(itertools.islice(relpaths, BLOB_STORE_BATCH_SIZE))
+            if not batch:
+                break
+            hashes = pool.map(lambda relpath: hash_file(os.path.join(root, relpath)), batch)
+            save_references(root, zip(batch, hashes), report)
+    return dict(report)
+
+def save_references(root: str, hashed: list, report: Counter):
+    """
+    Store and reference one batch of (relpath, (digest, size)). The blob rows are
+    locked, so a concurrent release_manifest() cannot collect a blob being reused.
+    """
+    hashed = list(hashed)
+    references = Counter(digest for _, (digest, _) in hashed)
+    sizes = {digest: size for _, (digest, size) in hashed}
+    with transaction.atomic():
+        Blob.objects.bulk_create(
+            [Blob(digest=digest, size=sizes[digest]) for digest in references],
+            ignore_conflicts=True,
+        )
+        list(Blob.objects.select_for_update().filter(digest__in=list(references)))
+        for relpath, (digest, size) in hashed:
+            stored_bytes, saved_bytes = store_blob(os.path.join(root, relpath), digest)
+            if stored_bytes:
+                # A new blob file (or one replacing a discarded blob): is_blob_file() compares mtimes with created.
+                Blob.objects.filter(digest=digest).update(created=timezone.now())
+            report.update(files=1, bytes=size, stored_bytes=stored_bytes, saved_bytes=saved_bytes)
+        BlobReference.objects.bulk_create([
+            BlobReference(root=root, path=relpath, blob_id=digest) for relpath, (digest, _) in hashed
+        ])
+        for digest, count in references.items():
+            Blob.objects.filter(digest=digest).update(ref_count=F('ref_count') + count)
+
+def get_manifest(root: str) -> dict:
+    """
+    {relative path: SHA-256 digest} of the files of root in the blob store.
+    """
+    return dict(BlobReference.objects.filter(root=root).order_by('path').values_list('path', 'blob_id'))
+
+def copy_manifest(src_root: str, dst_root: str) -> int:
+    """
+    Reference the blobs of src_root for its fork dst_root, without hashing anything.
+    The forked files (reflinks or copies) are linked to their blobs, so the ingest of
+    the new dataset/model finds them unchanged instead of hashing them again.
+    """
+    references = list(BlobReference.objects.filter(root=src_root).values_list('path', 'blob_id'))
+    if not references:
+        return 0
+    with transaction.atomic():
+        BlobReference.objects.bulk_create(
+            [BlobReference(root=dst_root, path=path, blob_id=digest) for path, digest in references],
+            batch_size=BLOB_STORE_BATCH_SIZE,
+        )
+        for digest, count in Counter(digest for _, digest in references).items():
+            Blob.objects.filter(digest=digest).update(ref_count=F('ref_count') + count)
+    for path, digest in references:
+        target = os.path.join(dst_root, path)
+        if os.path.isfile(target) and is_linked_to_blob(os.path.join(src_root, path), digest):
+            link_in_place(get_blob_path(digest), target)
+    return len(references)
+
+def release_manifest(root: str, paths: list = None) -> int:
+    """
+    Drop the manifest of root (deleted with its directory), or only its paths, and
+    remove the blobs nothing references any more. Returns the bytes freed in the
+    blob store.
+    """
+    references = BlobReference.objects.filter(root=root)
+    if paths != None:
+        if not paths:
+            return 0
+        references = references.filter(path__in=paths)
+
+    freed = 0
+    with transaction.atomic():
+        counts = Counter(references.values_list('blob_id', flat=True))
+        if not counts:
+            return 0
+        references.delete()
+        for digest, count in counts.items():
+            Blob.objects.filter(digest=digest).update(ref_count=F('ref_count') - count)
+        unused = Blob.objects.select_for_update().filter(digest__in=list(counts), ref_count__lte=0)
+        for digest, size in unused.values_list('digest', 'size'):
+            try:
+                os.remove(get_blob_path(digest))
+                freed += size
+            except FileNotFoundError:
+                pass
+        unused.delete()
+    return freed
+
+def get_dedup_report() -> dict:
+    """
+    {'logical_bytes', 'stored_bytes', 'saved_bytes', 'dedup_ratio', 'blobs', 'references'}
+    over every manifest.
+    """
+    totals = Blob.objects.aggregate(
+        logical_bytes=Sum(F('size') * F('ref_count')),
+        stored_bytes=Sum('size'),
+    )
+    logical_bytes = totals['logical_bytes'] or 0
+    stored_bytes = totals['stored_bytes'] or 0
+    return {
+        'logical_bytes': logical_bytes,
+        'stored_bytes': stored_bytes,
+        'saved_bytes': logical_bytes - stored_bytes,
+        'dedup_ratio': logical_bytes / stored_bytes if stored_bytes else 1.0,
+        'blobs': Blob.objects.count(),
+        'references': BlobReference.objects.count(),
+    }
@@ -0,0 +1,199 @@
+import os
+import re
+import stat
+import time
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .fork import unlink_shared
+
+ZIP_EXTRACT_CHUNK_SIZE = 1024 * 1024 # 1 MB
+ZIP_EXTRACT_DEFAULT_WORKERS = 4
+ZIP_DEFAULT_MAX_TOTAL_SIZE = 100 * 1024 ** 3 # 100 GB uncompressed
+ZIP_DEFAULT_MAX_MEMBERS = 1_000_000
+ZIP_DEFAULT_MAX_RATIO = 200
+ZIP_RATIO_MIN_SIZE = 1024 * 1024 # members under 1 MB may compress as well as they like
+PROGRESS_INTERVAL = 0.5 # seconds between progress events
+UPLOAD_PROGRESS_GROUP_PREFIX = "upload_progress_"
+
+class UnsafeZipError(ValueError):
+    pass
+
+def get_zip_limits() -> tuple:
+    return (
+        getattr(settings, 'ZIP_MAX_TOTAL_SIZE', ZIP_DEFAULT_MAX_TOTAL_SIZE),
+        getattr(settings, 'ZIP_MAX_MEMBERS', ZIP_DEFAULT_MAX_MEMBERS),
+        getattr(settings, 'ZIP_MAX_RATIO', ZIP_DEFAULT_MAX_RATIO),
+    )
+
+def get_zip_extract_workers() -> int:
+    return getattr(settings, 'ZIP_EXTRACT_WORKERS', ZIP_EXTRACT_DEFAULT_WORKERS)
+
+def is_symlink_member(info: zipfile.ZipInfo) -> bool:
+    return stat.S_ISLNK(info.external_attr >> 16)
+
+def validate_zip_members(zip_file: zipfile.ZipFile, extract_to: str) -> list:
+    """
+    (ZipInfo, target path) of every member, or UnsafeZipError when a member would
+    land outside extract_to (zip-slip), is a symlink, or the archive looks like a
+    zip bomb: too many members, too large uncompressed, or a member compressed
+    more than ZIP_MAX_RATIO times. ZipExtFile stops at the declared file_size and
+    checks the CRC, so the declared sizes hold while extracting. Of members with the
+    same target only the last one is kept, as zipfile's extractall() leaves it, so no
+    two workers write the same file.
+    """
+    max_total_size, max_members, max_ratio = get_zip_limits()
+    infos = zip_file.infolist()
+    if len(infos) > max_members:
+        raise UnsafeZipError(f"Zip file has more than {max_members} members")
+
+    root = os.path.realpath(extract_to)
+    members = {}
+    total_size = 0
+    for info in infos:
+        if is_symlink_member(info):
+            raise UnsafeZipError(f"Zip member is a symlink: {info.filename}")
+
+        target = os.path.realpath(os.path.join(root, info.filename))
+        if os.path.commonpath([root, target]) != root:
+            raise UnsafeZipError(f"Zip member leaves the extraction directory: {info.filename}")
+
+        if info.file_size > ZIP_RATIO_MIN_SIZE and info.file_size > max_ratio * max(info.compress_size, 1):
+            raise UnsafeZipError(f"Zip member compression ratio is too high: {info.filename}")
+
+        total_size += info.file_size
+        if total_size > max_total_size:
+            raise UnsafeZipError(f"Zip file is larger than {max_total_size} bytes uncompressed")
+
+        members.pop(target, None)
+        members[target] = info
+    return [(info, target) for target, info in members.items()]
+
+class ExtractionProgress:
+    """
+    Thread-safe byte/member counters calling progress(dict) at most every PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, progress, total_members: int, total_bytes: int):
+        self.progress = progress
+        self.total_members = total_members
+        self.total_bytes = total_bytes
+        self.members = 0
+        self.bytes = 0
+        self.last_sent = 0
+        self._lock = threading.Lock()
+
+    def as_dict(self, finished=False, success=True) -> dict:
+        return {
+            'current': self.members,
+            'total': self.total_members,
+            'bytes': self.bytes,
+            'total_bytes': self.total_bytes,
+            'finished': finished,
+            'success': success,
+        }
+
+    def add(self, size: int):
+        with self._lock:
+            self.members += 1
+            self.bytes += size
+            now = time.monotonic()
+            if self.progress == None or now - self.last_sent < PROGRESS_INTERVAL:
+                return
+            self.last_sent = now
+            event = self.as_dict()
+        self.progress(event)
+
+    def finish(self, success: bool):
+        if self.progress != None:
+            self.progress(self.as_dict(finished=True, success=success))
+
+def extract_member(open_zip, info: zipfile.ZipInfo, target: str) -> int:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    unlink_shared(target)
+    with open_zip().open(info) as source, open(target, 'wb') as destination:
+        shutil.copyfileobj(source, destination, ZIP_EXTRACT_CHUNK_SIZE)
+    return info.file_size
+
+def extract_zip(file, extract_to: str, progress=None, max_workers: int = None):
+    """
+    Validate and extract a zip (a path, or an uploaded file) into extract_to,
+    members in parallel on a thread pool, copying each in 1 MB chunks.
+
+    Uploads spooled to disk (TemporaryUploadedFile) are opened once per worker
+    thread, so members decompress concurrently; in-memory uploads share one ZipFile.
+    progress(dict) receives ProgressConsumer-style events. On any error the
+    partially extracted members are removed and the error is raised.
+    """
+    path = file if isinstance(file, (str, os.PathLike)) else getattr(file, 'temporary_file_path', lambda: None)()
+    local = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+
+    def open_zip():
+        zip_file = getattr(local, 'zip_file', None)
+        if zip_file == None:
+            zip_file = local.zip_file = zipfile.ZipFile(path)
+            with opened_lock:
+                opened.append(zip_file)
+        return zip_file
+
+    os.makedirs(extract_to, exist_ok=True)
+    with zipfile.ZipFile(path or file) as zip_file:
+        if path == None:
+            open_zip = lambda: zip_file
+        members = validate_zip_members(zip_file, extract_to)
+        counter = ExtractionProgress(progress, len(members), sum(info.file_size for info, _ in members))
+
+        created = []
+        try:
+            for info, target in members:
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=max_workers or get_zip_extract_workers()) as pool:
+                futures = []
+                for info, target in members:
+                    if not info.is_dir():
+                        created.append(target)
+                        futures.append(pool.submit(extract_member, open_zip, info, target))
+                for future in futures:
+                    counter.add(future.result())
+        except BaseException:
+            for target in created:
+                if os.path.exists(target):
+                    os.remove(target)
+            counter.finish(success=False)
+            raise
+        finally:
+            for opened_zip in opened:
+                opened_zip.close()
+
+    counter.finish(success=True)
+    return extract_to
+
+def get_upload_progress_group(upload_id: str) -> str:
+    return UPLOAD_PROGRESS_GROUP_PREFIX + re.sub(r'[^A-Za-z0-9_.-]', '', str(upload_id))[:64]
+
+def get_upload_progress(upload_id):
+    """
+    progress callback sending each event to the channel layer group of upload_id
+    (ProgressConsumer relays it to subscribed WebSockets), or None.
+    """
+    channel_layer = get_channel_layer()
+    if not upload_id or channel_layer == None:
+        return None
+    group = get_upload_progress_group(upload_id)
+    group_send = async_to_sync(channel_layer.group_send)
+
+    def progress(event: dict):
+        try:
+            group_send(group, {'type': 'upload.progress', 'progress': event})
+        except Exception as e:
+            print(f'Upload progress error: {e}')
+    return progress
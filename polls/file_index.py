@@ -0,0 +1,242 @@
+import os
+import re
+import itertools
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import FileTreeEntry
+
+FILE_INDEX_BATCH_SIZE = 1000
+TREE_MAX_LIMIT = 10000
+TREE_SORT_FIELDS = {
+    'name': 'name',
+    'size': 'size',
+    'mtime': 'mtime_ns',
+}
+
+def join_relpath(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+def split_relpath(relpath: str) -> tuple:
+    """
+    (parent, name) of a non-empty relative path.
+    """
+    parent, _, name = relpath.rpartition('/')
+    return parent, name
+
+def normalize_relpath(relpath: str):
+    """
+    relpath as stored in FileTreeEntry.parent ('a/b', '' for the root), or None
+    when it leaves the root directory.
+    """
+    parts = [part for part in (relpath or '').replace(os.sep, '/').split('/') if part not in ('', '.')]
+    if '..' in parts:
+        return None
+    return '/'.join(parts)
+
+def make_entry(root: str, relpath: str, is_dir: bool, stat: os.stat_result = None) -> FileTreeEntry:
+    parent, name = split_relpath(relpath) if relpath else (None, '')
+    return FileTreeEntry(
+        root=root,
+        parent=parent,
+        name=name,
+        is_dir=is_dir,
+        size=None if is_dir or stat == None else stat.st_size,
+        mtime_ns=stat.st_mtime_ns if stat != None else 0,
+    )
+
+def scan_directory(root: str, relpath: str = ''):
+    """
+    Unsaved FileTreeEntry rows for root/relpath and everything under it: one scandir
+    per directory and one stat per entry. A directory's row comes once its children
+    are counted. Symlinked directories are listed but not followed.
+    """
+    directory_path = os.path.join(root, relpath) if relpath else root
+    pending = {relpath: make_entry(root, relpath, True, os.stat(directory_path))}
+    stack = [relpath]
+    while stack:
+        path = stack.pop()
+        row = pending.pop(path)
+        try:
+            with os.scandir(os.path.join(root, path) if path else root) as iterator:
+                entries = list(iterator)
+        except OSError as e:
+            print(f'File index scan error in {root} {path}: {e}')
+            entries = []
+        row.child_count = len(entries)
+        yield row
+
+        for entry in entries:
+            child = join_relpath(path, entry.name)
+            try:
+                is_dir = entry.is_dir()
+                stat = entry.stat()
+            except OSError:
+                is_dir, stat = False, None
+            child_row = make_entry(root, child, is_dir, stat)
+            if is_dir and not entry.is_symlink():
+                pending[child] = child_row
+                stack.append(child)
+            else:
+                yield child_row
+
+def save_entries(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(itertools.islice(entries, FILE_INDEX_BATCH_SIZE))
+        if not batch:
+            break
+        FileTreeEntry.objects.bulk_create(batch)
+
+def is_indexed(root: str) -> bool:
+    return FileTreeEntry.objects.filter(root=root, parent__isnull=True).exists()
+
+def delete_file_index(root: str):
+    FileTreeEntry.objects.filter(root=root).delete()
+
+def build_file_index(root: str) -> bool:
+    """
+    (Re)index every file and directory under root. False when root is not a directory.
+    """
+    if not os.path.isdir(root):
+        return False
+    with transaction.atomic():
+        delete_file_index(root)
+        save_entries(scan_directory(root))
+    return True
+
+def update_file_index(root: str, relpath: str):
+    """
+    Re-index only root/relpath (a file or a whole subdirectory) after it was added,
+    changed or removed, and recount its parent's children. Directories created above
+    it since the last index are indexed with it.
+    """
+    relpath = normalize_relpath(relpath)
+    if not relpath:
+        return build_file_index(root)
+    if not is_indexed(root):
+        return build_file_index(root)
+
+    parent, name = split_relpath(relpath)
+    while parent and not FileTreeEntry.objects.filter(root=root, **get_directory_lookup(parent)).exists():
+        relpath = parent
+        parent, name = split_relpath(relpath)
+    path = os.path.join(root, relpath)
+    with transaction.atomic():
+        FileTreeEntry.objects.filter(root=root, parent=parent, name=name).delete()
+        FileTreeEntry.objects.filter(root=root, parent=relpath).delete()
+        FileTreeEntry.objects.filter(root=root, parent__startswith=f"{relpath}/").delete()
+
+        if os.path.isdir(path) and not os.path.islink(path):
+            save_entries(scan_directory(root, relpath))
+        elif os.path.lexists(path):
+            try:
+                is_dir, stat = os.path.isdir(path), os.stat(path)
+            except OSError:
+                is_dir, stat = False, None
+            make_entry(root, relpath, is_dir, stat).save()
+
+        parent_entry = FileTreeEntry.objects.filter(root=root, **get_directory_lookup(parent))
+        parent_entry.update(child_count=FileTreeEntry.objects.filter(root=root, parent=parent).count())
+    return True
+
+def get_path_ancestors(path: str) -> list:
+    """
+    path and every directory above it, each with and without a trailing slash, to
+    look up the dataset/model directory (or index root) a path lies in.
+    """
+    path = os.path.normpath(path)
+    ancestors = []
+    while path:
+        ancestors += [path, f"{path}/"]
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return ancestors
+
+def get_indexed_root(path: str):
+    """
+    The deepest indexed root that is path or contains it, or None.
+    """
+    roots = FileTreeEntry.objects.filter(root__in=get_path_ancestors(path), parent__isnull=True).values_list('root', flat=True)
+    return max(roots, key=lambda root: len(os.path.normpath(root)), default=None)
+
+def update_path_index(path: str) -> bool:
+    """
+    update_file_index() for a file or directory written by path, when it lies in an
+    indexed dataset/model directory. Writers into those directories call it, so tree
+    listings see the change. False when no index holds path.
+    """
+    root = get_indexed_root(path)
+    if root == None:
+        return False
+    relpath = os.path.relpath(os.path.normpath(path), os.path.normpath(root))
+    return update_file_index(root, '' if relpath == '.' else relpath)
+
+def get_directory_lookup(relpath: str) -> dict:
+    """
+    Filter kwargs of the row of the directory relpath ('' for the root).
+    """
+    if not relpath:
+        return {'parent__isnull': True}
+    parent, name = split_relpath(relpath)
+    return {'parent': parent, 'name': name, 'is_dir': True}
+
+def get_directory_listing(root: str, relpath: str = ''):
+    """
+    Queryset of the entries directly under root/relpath, ordered by name, or None
+    when relpath is not an indexed directory. Indexes root on first use.
+    """
+    relpath = normalize_relpath(relpath)
+    if relpath == None:
+        return None
+    if not is_indexed(root) and not build_file_index(root):
+        return None
+    if relpath and not FileTreeEntry.objects.filter(root=root, **get_directory_lookup(relpath)).exists():
+        return None
+    return FileTreeEntry.objects.filter(root=root, parent=relpath).order_by('name')
+
+def get_directory_child_count(root: str, relpath: str = ''):
+    relpath = normalize_relpath(relpath)
+    return FileTreeEntry.objects.filter(root=root, **get_directory_lookup(relpath)).values_list('child_count', flat=True).first()
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Anchored regex of a shell glob (* and ?), valid for Python's re (SQLite) and PostgreSQL.
+    """
+    parts = []
+    for char in pattern:
+        if char == '*':
+            parts.append('.*')
+        elif char == '?':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return f"^{''.join(parts)}$"
+
+def filter_listing(entries, glob: str = None, extensions: list = None):
+    """
+    Entries whose name matches glob and ends with one of extensions (case-insensitive, with or without the dot).
+    """
+    if glob:
+        entries = entries.filter(name__regex=glob_to_regex(glob))
+    if extensions:
+        condition = Q()
+        for extension in extensions:
+            condition |= Q(name__iendswith=f".{extension.lstrip('.')}")
+        entries = entries.filter(condition)
+    return entries
+
+def sort_listing(entries, sort: str = 'name'):
+    """
+    Entries ordered by name, size or mtime ('-size' for descending), ties by name.
+    Raises KeyError for other sort keys.
+    """
+    descending = sort.startswith('-')
+    field = TREE_SORT_FIELDS[sort.lstrip('-')]
+    ordering = [f"-{field}" if descending else field]
+    if field != 'name':
+        ordering.append('name')
+    return entries.order_by(*ordering)
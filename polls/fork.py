@@ -0,0 +1,152 @@
+import os
+import stat
+import errno
+import shutil
+import tempfile
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+FORK_STRATEGIES = (REFLINK, HARDLINK, COPY)
+# Never falls back to HARDLINK: shared inodes are only safe when asked for.
+FORK_FALLBACKS = {
+    REFLINK: (REFLINK, COPY),
+    HARDLINK: (HARDLINK, COPY),
+    COPY: (COPY,),
+}
+OVERLAY = "overlay" # dataset forks only: no files forked, see polls/overlay.py
+FICLONE = 0x40049409 # linux/fs.h: _IOW(0x94, 9, int)
+
+# Errors meaning the filesystem (or a mount boundary) cannot do a strategy at all,
+# so the rest of the tree skips it instead of failing once per file.
+UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS, errno.EPERM}
+
+def get_fork_strategy() -> str:
+    return getattr(settings, 'FORK_STRATEGY', REFLINK)
+
+def reflink_file(src: str, dst: str):
+    """
+    Clone src into dst sharing its data blocks (btrfs, XFS with reflink=1, bcachefs);
+    blocks are copied by the filesystem on first write to either file.
+    """
+    if fcntl == None:
+        raise OSError(errno.EOPNOTSUPP, "reflink needs fcntl")
+    with open(src, 'rb') as source, open(dst, 'wb') as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            destination.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+def hardlink_file(src: str, dst: str):
+    """
+    Link dst to the inode of src. Both names share one file until break_hardlink()
+    or unlink_shared() is called before writing to either of them.
+    """
+    os.link(src, dst)
+
+def copy_file(src: str, dst: str):
+    shutil.copy2(src, dst)
+
+FILE_FORKERS = {
+    REFLINK: reflink_file,
+    HARDLINK: hardlink_file,
+    COPY: copy_file,
+}
+
+def fork_file(src: str, dst: str, strategies: list) -> str:
+    """
+    Fork src to dst with the first of strategies that works, and return its name.
+    A strategy the filesystem does not support is removed from strategies.
+    """
+    for strategy in list(strategies):
+        try:
+            FILE_FORKERS[strategy](src, dst)
+            return strategy
+        except OSError as e:
+            if strategy == strategies[-1]:
+                raise
+            if e.errno in UNSUPPORTED_ERRNOS:
+                strategies.remove(strategy)
+    raise OSError(errno.EOPNOTSUPP, f"No fork strategy left for {src}")
+
+def fork_tree(src: str, dst: str, strategy: str = None, fallback: bool = True) -> Counter:
+    """
+    Recreate the directory tree src at dst (which must not exist) and fork every file
+    with strategy (FORK_STRATEGY by default), falling back to a copy where it is not
+    supported (FORK_FALLBACKS) unless fallback is False. Reflinks and hardlinks cost
+    one metadata operation per file however large it is.
+
+    Symlinks are recreated as symlinks; other special files are skipped.
+    Returns how many files each strategy forked.
+    """
+    strategy = strategy or get_fork_strategy()
+    if strategy not in FORK_STRATEGIES:
+        strategy = REFLINK # OVERLAY, when a directory has to be forked after all
+    strategies = list(FORK_FALLBACKS[strategy]) if fallback else [strategy]
+    used = Counter()
+
+    os.makedirs(dst)
+    directories = [(src, dst)]
+    stack = [(src, dst)]
+    while stack:
+        source_directory, destination_directory = stack.pop()
+        with os.scandir(source_directory) as iterator:
+            for entry in iterator:
+                target = os.path.join(destination_directory, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    os.mkdir(target)
+                    directories.append((entry.path, target))
+                    stack.append((entry.path, target))
+                elif entry.is_file():
+                    used[fork_file(entry.path, target, strategies)] += 1
+
+    for source_directory, destination_directory in directories:
+        shutil.copystat(source_directory, destination_directory)
+    return used
+
+def is_shared(path: str) -> bool:
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_nlink > 1
+
+def unlink_shared(path: str):
+    """
+    Call before overwriting path: a hardlinked (forked) file is unlinked, so the new
+    content goes to a new inode and the other datasets keep theirs.
+    """
+    if is_shared(path):
+        os.unlink(path)
+
+def break_hardlink(path: str):
+    """
+    Call before modifying path in place: a hardlinked (forked or deduplicated) file is
+    replaced by a private, writable copy of itself (copy-on-first-write).
+    """
+    if not is_shared(path):
+        return
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", dir=directory)
+    os.close(fd)
+    try:
+        shutil.copy2(path, temp_path)
+        # Blob store files are read-only (blob_store.BLOB_FILE_MODE).
+        os.chmod(temp_path, os.stat(temp_path).st_mode | stat.S_IWUSR)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
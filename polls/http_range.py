@@ -0,0 +1,222 @@
+import os
+import re
+import uuid
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .zipstream import is_asgi_request, iterate_in_thread
+
+RANGE_CHUNK_SIZE = 1024 * 1024 # 1 MB
+RANGE_MAX_COUNT = 16
+RANGE_HEADER_REGEX = re.compile(r'^\s*bytes\s*=\s*(.+)$', re.IGNORECASE)
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+def file_etag(stat: os.stat_result) -> str:
+    """
+    Strong ETag of a file on disk: changes whenever the file is replaced, resized or written.
+    """
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def parse_range_header(header: str, size: int):
+    """
+    Sorted, merged [(start, end)] (inclusive) byte ranges of a `Range: bytes=...` header.
+
+    Returns None when the header is missing or malformed (serve the whole body, as
+    RFC 9110 asks) and raises RangeNotSatisfiable when no range overlaps the body.
+    """
+    if not header:
+        return None
+    match = RANGE_HEADER_REGEX.match(header)
+    if not match:
+        return None
+
+    ranges = []
+    for spec in match.group(1).split(','):
+        first, dash, last = spec.strip().partition('-')
+        if not dash:
+            return None
+        try:
+            if first == '':
+                suffix_length = int(last)
+                if suffix_length <= 0:
+                    continue
+                start, end = max(0, size - suffix_length), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else start
+                if end < start:
+                    return None
+                end = min(end, size - 1) if last else size - 1
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    if len(ranges) > RANGE_MAX_COUNT:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def if_range_matches(request, etag: str = None, last_modified: int = None) -> bool:
+    """
+    False when an If-Range validator no longer matches: the client then gets the whole new body.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return etag != None and if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date != None and last_modified != None and date == last_modified
+
+def get_validator_headers(etag: str = None, last_modified: int = None) -> dict:
+    headers = {'Accept-Ranges': 'bytes'}
+    if etag != None:
+        headers['ETag'] = etag
+    if last_modified != None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+def get_not_modified_response(request, etag: str = None, last_modified: int = None):
+    """
+    304 (If-None-Match / If-Modified-Since) or 412 (If-Match / If-Unmodified-Since)
+    when the validators say so, else None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response != None:
+        for header, value in get_validator_headers(etag, last_modified).items():
+            response[header] = value
+    return response
+
+def range_not_satisfiable_response(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response['Content-Range'] = f'bytes */{size}'
+    return response
+
+def iter_file_range(file_path: str, start: int, length: int, chunk_size: int = RANGE_CHUNK_SIZE):
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+def partial_content_response(ranges, size: int, read_range, content_type: str) -> StreamingHttpResponse:
+    """
+    206 response for `ranges`; read_range(start, length) yields the bytes of one range.
+    Several ranges are sent as multipart/byteranges.
+    """
+    content_type = content_type or 'application/octet-stream'
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(read_range(start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        f'--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n'.encode()
+        for start, end in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode()
+
+    def iter_parts():
+        for index, (start, end) in enumerate(ranges):
+            yield (b'\r\n' if index else b'') + part_headers[index]
+            yield from read_range(start, end - start + 1)
+        yield closing
+
+    content_length = (
+        sum(len(header) for header in part_headers) + 2 * (len(ranges) - 1)
+        + sum(end - start + 1 for start, end in ranges) + len(closing)
+    )
+    response = StreamingHttpResponse(iter_parts(), status=206, content_type=f'multipart/byteranges; boundary={boundary}')
+    response['Content-Length'] = str(content_length)
+    return response
+
+def get_requested_ranges(request, size: int, etag: str = None, last_modified: int = None):
+    """
+    Ranges to serve, None for the whole body. Raises RangeNotSatisfiable.
+    """
+    if request.method not in ('GET', 'HEAD') or not if_range_matches(request, etag, last_modified):
+        return None
+    return parse_range_header(request.META.get('HTTP_RANGE'), size)
+
+def ranged_stream_response(request, size: int, read_range, content_type: str = None, etag: str = None, last_modified: int = None):
+    """
+    Conditional GET and byte ranges over any source that can read a range
+    (read_range(start, length) -> iterator of bytes), e.g. a MinIO object.
+    """
+    response = get_not_modified_response(request, etag, last_modified)
+    if response != None:
+        return response
+
+    try:
+        ranges = get_requested_ranges(request, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return range_not_satisfiable_response(size)
+
+    if ranges == None:
+        response = StreamingHttpResponse(read_range(0, size), content_type=content_type or 'application/octet-stream')
+        response['Content-Length'] = str(size)
+    else:
+        response = partial_content_response(ranges, size, read_range, content_type)
+
+    for header, value in get_validator_headers(etag, last_modified).items():
+        response[header] = value
+    return stream_async_under_asgi(request, response)
+
+def ranged_file_response(request, file_path: str, content_type: str = None, filename: str = None, as_attachment: bool = False, etag: str = None):
+    """
+    FileResponse (sendfile under WSGI servers that offer it) with a strong ETag,
+    Last-Modified, 304/412 on conditional requests and 206/416 on Range requests.
+    """
+    stat = os.stat(file_path)
+    etag = etag or file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_not_modified_response(request, etag, last_modified)
+    if response != None:
+        return response
+
+    try:
+        ranges = get_requested_ranges(request, stat.st_size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return range_not_satisfiable_response(stat.st_size)
+
+    if ranges == None:
+        response = FileResponse(open(file_path, 'rb'), as_attachment=as_attachment, filename=filename or '', content_type=content_type)
+    else:
+        read_range = lambda start, length: iter_file_range(file_path, start, length)
+        response = partial_content_response(ranges, stat.st_size, read_range, content_type)
+        if filename:
+            response['Content-Disposition'] = f'{"attachment" if as_attachment else "inline"}; filename="{filename}"'
+
+    for header, value in get_validator_headers(etag, last_modified).items():
+        response[header] = value
+    return stream_async_under_asgi(request, response)
+
+def stream_async_under_asgi(request, response):
+    """
+    Under ASGI, Django 4.2 reads a synchronous streaming body into memory before
+    sending it; hand it an async iterator instead. WSGI keeps the file wrapper (sendfile).
+    """
+    if response.streaming and not response.is_async and is_asgi_request(request):
+        response.streaming_content = iterate_in_thread(response.streaming_content)
+    return response
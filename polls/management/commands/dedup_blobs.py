@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from polls.models import Dataset, Model
+from polls.stats import DIRECTORY_FIELDS
+from polls.blob_store import ingest_directory, get_dedup_report
+
+class Command(BaseCommand):
+    help = "Move every dataset and model directory into the content-addressed blob store and report the savings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="hashing threads (default BLOB_STORE_WORKERS)")
+        parser.add_argument("--report", action="store_true", help="only print the deduplication report")
+
+    def handle(self, *args, **options):
+        if not options["report"]:
+            for Object in (Dataset, Model):
+                directories = Object.objects.values_list(DIRECTORY_FIELDS[Object], flat=True).distinct()
+                for directory in directories.iterator():
+                    result = ingest_directory(directory, max_workers=options["workers"])
+                    if result["files"]:
+                        self.stdout.write(
+                            f"{Object.__name__} {directory}: {result['files']} files, "
+                            f"{result['bytes']:,} bytes, {result['saved_bytes']:,} bytes saved"
+                        )
+
+        report = get_dedup_report()
+        self.stdout.write(
+            f"{report['blobs']} blobs for {report['references']} files: "
+            f"{report['logical_bytes']:,} bytes stored as {report['stored_bytes']:,} "
+            f"(dedup ratio {report['dedup_ratio']:.2f}, {report['saved_bytes']:,} bytes saved)"
+        )
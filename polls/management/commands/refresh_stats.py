@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from polls.models import Dataset, Model
+from polls.stats import DIRECTORY_FIELDS, refresh_stats
+
+class Command(BaseCommand):
+    help = "Recompute the size and file-count statistics of every dataset and model directory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing", action="store_true", help="only objects without statistics yet")
+
+    def handle(self, *args, **options):
+        for Object in (Dataset, Model):
+            queryset = Object.objects.only("id", DIRECTORY_FIELDS[Object])
+            if options["missing"]:
+                queryset = queryset.filter(stats_updated__isnull=True)
+
+            refreshed = 0
+            for obj in queryset.iterator():
+                if refresh_stats(obj) != None:
+                    refreshed += 1
+            self.stdout.write(f"{Object.__name__}: refreshed {refreshed} of {queryset.count()}")
@@ -0,0 +1,36 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from polls.tasks import TASK_POLL_INTERVAL, run_task_worker
+
+class Command(BaseCommand):
+    help = "Run queued tasks (zip extraction, forks, deletes) on a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="worker threads, each claiming one task at a time")
+        parser.add_argument("--poll-interval", type=float, default=TASK_POLL_INTERVAL, help="seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="run the queued tasks and exit")
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        max_tasks = float("inf") if options["once"] else None
+        counts = []
+
+        def work():
+            counts.append(run_task_worker(stop_event, max_tasks=max_tasks, poll_interval=options["poll_interval"]))
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(max(options["workers"], 1))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Task worker running with {len(threads)} threads")
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running tasks")
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(f"Ran {sum(counts)} tasks")
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0024_alter_datasetactionset_action_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['is_public', '-created', '-id'], name='dataset_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['user', 'is_public', '-created', '-id'], name='dataset_user_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['-created', '-id'], name='dataset_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-updated', '-id'], name='dataset_public_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model',
+            index=models.Index(fields=['is_public', '-created', '-id'], name='model_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model',
+            index=models.Index(fields=['user', 'is_public', '-created', '-id'], name='model_user_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model',
+            index=models.Index(fields=['-created', '-id'], name='model_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-updated', '-id'], name='model_public_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:33
+
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    """
+    GIN, tsvector and gin_trgm_ops only exist on PostgreSQL; other backends
+    keep the index in the model state and use polls.search's icontains fallback.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0025_dataset_dataset_pub_created_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresAddIndex(
+            model_name='dataset',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'description', config='simple'), name='dataset_search_vector_idx'),
+        ),
+        PostgresAddIndex(
+            model_name='dataset',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='dataset_name_trgm_idx'),
+        ),
+        PostgresAddIndex(
+            model_name='model',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'description', 'model_type', config='simple'), name='model_search_vector_idx'),
+        ),
+        PostgresAddIndex(
+            model_name='model',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='model_name_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0026_catalog_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileTreeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('root', models.CharField(max_length=2048)),
+                ('parent', models.CharField(max_length=2048, null=True)),
+                ('name', models.CharField(blank=True, max_length=1024)),
+                ('is_dir', models.BooleanField(default=False)),
+                ('size', models.BigIntegerField(null=True)),
+                ('child_count', models.IntegerField(null=True)),
+                ('mtime_ns', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='filetreeentry',
+            constraint=models.UniqueConstraint(fields=('root', 'parent', 'name'), name='unique_file_tree_entry'),
+        ),
+    ]
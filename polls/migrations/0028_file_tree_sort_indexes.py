@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0027_file_tree_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='filetreeentry',
+            index=models.Index(fields=['root', 'parent', 'size', 'name'], name='file_tree_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filetreeentry',
+            index=models.Index(fields=['root', 'parent', 'mtime_ns', 'name'], name='file_tree_mtime_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0030_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BlobReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('root', models.CharField(max_length=2048)),
+                ('path', models.CharField(max_length=4096)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='polls.blob')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='blobreference',
+            constraint=models.UniqueConstraint(fields=('root', 'path'), name='unique_blob_reference'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0031_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='is_overlay',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+    ]
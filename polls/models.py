@@ -3,7 +3,10 @@ import datetime
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
-from django.db.models import UniqueConstraint
+from django.db.models import Q, Index, UniqueConstraint
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.utils.translation import gettext_lazy as _
 
 # ignore Question and Choice # they are templates to help structure models
@@ -40,6 +43,12 @@ class Model(models.Model):
     created = models.DateTimeField(default=timezone.now) 
     updated = models.DateTimeField(auto_now=True) 
 
+    # Recursive totals of the directory (polls/stats.py), None until first computed.
+    total_size = models.BigIntegerField(null=True, blank=True)
+    file_count = models.IntegerField(null=True, blank=True)
+    extension_stats = models.JSONField(null=True, blank=True)
+    stats_updated = models.DateTimeField(null=True, blank=True)
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
@@ -47,6 +56,16 @@ class Model(models.Model):
         constraints = [
             UniqueConstraint(fields=['name', 'user'], name='unique_model_name_user')
         ]
+        # Listings filter on is_public_or_is_user_private(user) and order newest first.
+        indexes = [
+            Index(fields=['is_public', '-created', '-id'], name='model_pub_created_idx'),
+            Index(fields=['user', 'is_public', '-created', '-id'], name='model_user_pub_created_idx'),
+            Index(fields=['-created', '-id'], name='model_created_idx'),
+            Index(fields=['-updated', '-id'], condition=Q(is_public=True), name='model_public_updated_idx'),
+            # Search (polls/search.py): full-text vector and UPPER(name) trigrams.
+            GinIndex(SearchVector('name', 'description', 'model_type', config='simple'), name='model_search_vector_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='model_name_trgm_idx'),
+        ]
     
 class Dataset(models.Model):
     name = models.CharField(max_length=320)
@@ -54,6 +73,9 @@ class Dataset(models.Model):
     original_dataset = models.ForeignKey("self", on_delete=models.SET_NULL, blank=True, null=True)
     
     dataset_directory = models.CharField(max_length=2048, unique=True)
+    # Lazy fork (polls/overlay.py): dataset_directory only holds what changed, the
+    # rest is read through from original_dataset.
+    is_overlay = models.BooleanField(null=True, blank=True)
     is_public = models.BooleanField(default=False)
 
     description = models.CharField(max_length=320, blank=True) 
@@ -61,10 +83,73 @@ class Dataset(models.Model):
     created = models.DateTimeField(default=timezone.now) 
     updated = models.DateTimeField(auto_now=True) 
 
+    # Recursive totals of the directory (polls/stats.py), None until first computed.
+    total_size = models.BigIntegerField(null=True, blank=True)
+    file_count = models.IntegerField(null=True, blank=True)
+    extension_stats = models.JSONField(null=True, blank=True)
+    stats_updated = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         constraints = [
             UniqueConstraint(fields=['name', 'user'], name='unique_dataset_name_user')
         ]
+        indexes = [
+            Index(fields=['is_public', '-created', '-id'], name='dataset_pub_created_idx'),
+            Index(fields=['user', 'is_public', '-created', '-id'], name='dataset_user_pub_created_idx'),
+            Index(fields=['-created', '-id'], name='dataset_created_idx'),
+            Index(fields=['-updated', '-id'], condition=Q(is_public=True), name='dataset_public_updated_idx'),
+            GinIndex(SearchVector('name', 'description', config='simple'), name='dataset_search_vector_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='dataset_name_trgm_idx'),
+        ]
+
+class FileTreeEntry(models.Model):
+    """
+    One file or directory under a dataset/model directory, indexed by polls/file_index.py
+    so tree listings query rows instead of stat()ing every entry.
+    The row with parent=None and name='' is the root directory itself.
+    """
+    root = models.CharField(max_length=2048)
+    parent = models.CharField(max_length=2048, null=True)
+    name = models.CharField(max_length=1024, blank=True)
+
+    is_dir = models.BooleanField(default=False)
+    size = models.BigIntegerField(null=True)
+    child_count = models.IntegerField(null=True)
+    mtime_ns = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['root', 'parent', 'name'], name='unique_file_tree_entry')
+        ]
+        # Directory listings sorted by size or mtime (the unique constraint covers name).
+        indexes = [
+            Index(fields=['root', 'parent', 'size', 'name'], name='file_tree_size_idx'),
+            Index(fields=['root', 'parent', 'mtime_ns', 'name'], name='file_tree_mtime_idx'),
+        ]
+
+class Blob(models.Model):
+    """
+    A file stored once in the content-addressed blob store (polls/blob_store.py) by its
+    SHA-256; ref_count is the number of BlobReference rows using it.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created = models.DateTimeField(default=timezone.now)
+
+class BlobReference(models.Model):
+    """
+    Manifest entry: the file at root/path (a dataset/model directory, like
+    FileTreeEntry.root) has the content of blob.
+    """
+    root = models.CharField(max_length=2048)
+    path = models.CharField(max_length=4096)
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['root', 'path'], name='unique_blob_reference')
+        ]
 
 class ModelDataset(models.Model):
     model = models.ForeignKey(Model, on_delete=models.CASCADE) 
@@ -75,8 +160,38 @@ class ModelDataset(models.Model):
         unique_together = ('model', 'dataset',)
 
 class Task(models.Model):
+    """
+    A named task; queued tasks (polls/tasks.py) also carry a kind, a payload and
+    their status, progress, result and error while run_task_worker processes them.
+    """
+    class STATUS(models.TextChoices):
+        CREATED = "created", _("CREATED")
+        QUEUED = "queued", _("QUEUED")
+        RUNNING = "running", _("RUNNING")
+        SUCCEEDED = "succeeded", _("SUCCEEDED")
+        FAILED = "failed", _("FAILED")
+
     task_name = models.CharField(max_length=320)
 
+    kind = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(max_length=16, choices=STATUS.choices, default=STATUS.CREATED)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    payload = models.JSONField(null=True, blank=True)
+    progress = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.IntegerField(default=0)
+
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # The worker claims the oldest queued task.
+        indexes = [
+            Index(fields=['status', 'created', 'id'], name='task_status_created_idx'),
+        ]
+
 class DatasetActionSet(models.Model):
     class ACTION_SET(models.TextChoices):
         CLEANING = "cleaning", _("CLEANING")
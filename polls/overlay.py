@@ -0,0 +1,206 @@
+import os
+import hashlib
+from collections import Counter
+
+from .fork import REFLINK, COPY, fork_file
+from .file_index import normalize_relpath, get_directory_listing, filter_listing, build_file_index, get_path_ancestors, TREE_SORT_FIELDS
+from .archive_cache import get_archive_key, get_cached_fingerprint
+from .zipstream import ZipEntry, iter_directory_entries
+from .stats import DIRECTORY_FIELDS, summarize_stats
+from .models import Dataset
+
+# Copied up before a write (and when materialized): a hardlink would let writes reach
+# the lower layer.
+COPY_UP_STRATEGIES = (REFLINK, COPY)
+TREE_ROW_FIELDS = ('name', 'is_dir', 'size', 'child_count', 'mtime_ns')
+
+def is_overlay(obj) -> bool:
+    return getattr(obj, 'is_overlay', None) == True
+
+def get_layers(obj) -> list:
+    """
+    Directories to read obj from, top first: its own directory, then, for a lazy
+    fork, the directories of the datasets it was forked from.
+    """
+    layers = [getattr(obj, DIRECTORY_FIELDS[type(obj)])]
+    seen = {obj.pk}
+    while is_overlay(obj) and obj.original_dataset_id != None and obj.original_dataset_id not in seen:
+        obj = obj.original_dataset
+        seen.add(obj.pk)
+        layers.append(obj.dataset_directory)
+    return layers
+
+def resolve_path(layers: list, relpath: str):
+    """
+    Path of relpath in the topmost layer that has it, or None (missing, or leaving the root).
+    """
+    relpath = normalize_relpath(relpath)
+    if relpath == None:
+        return None
+    for layer in layers:
+        path = os.path.join(layer, relpath) if relpath else layer
+        if os.path.lexists(path):
+            return path
+    return None
+
+def is_union_directory(layers: list, relpath: str) -> bool:
+    path = resolve_path(layers, relpath)
+    return path != None and os.path.isdir(path)
+
+def sort_rows(rows: list, sort: str = 'name') -> list:
+    """
+    TREE_ROW_FIELDS rows ordered like file_index.sort_listing(). Raises KeyError for other sort keys.
+    """
+    descending = sort.startswith('-')
+    index = TREE_ROW_FIELDS.index(TREE_SORT_FIELDS[sort.lstrip('-')])
+    rows = sorted(rows, key=lambda row: row[0])
+    if index != 0:
+        return sorted(rows, key=lambda row: (row[index] == None, row[index] or 0), reverse=descending)
+    return rows[::-1] if descending else rows
+
+def list_union_directory(layers: list, relpath: str = '', glob: str = None, extensions: list = None, sort: str = 'name'):
+    """
+    TREE_ROW_FIELDS rows of the entries directly under relpath across layers, an upper
+    entry hiding a lower one of the same name, or None when no layer has that directory.
+    Each layer is read from its file index.
+    """
+    rows = {}
+    found = False
+    for layer in layers:
+        entries = get_directory_listing(layer, relpath)
+        if entries == None:
+            continue
+        found = True
+        for row in filter_listing(entries, glob=glob, extensions=extensions).values_list(*TREE_ROW_FIELDS):
+            rows.setdefault(row[0], row)
+    if not found:
+        return None
+    return sort_rows(list(rows.values()), sort)
+
+def iter_union_files(layers: list):
+    """
+    (relative path, path) of every file across layers, upper files hiding lower ones,
+    ordered by relative path.
+    """
+    files = {}
+    for layer in layers:
+        for root, dirs, filenames in os.walk(layer):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                files.setdefault(os.path.relpath(file_path, layer), file_path)
+    for relpath in sorted(files):
+        yield relpath, files[relpath]
+
+def compute_union_stats(layers: list):
+    """
+    stats.compute_directory_stats() of the union of layers, or None when no layer is a directory.
+    """
+    if not any(os.path.isdir(layer) for layer in layers):
+        return None
+    sizes, counts = Counter(), Counter()
+    for relpath, file_path in iter_union_files(layers):
+        if not os.path.isfile(file_path):
+            continue
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        extension = os.path.splitext(relpath)[1].lower()
+        sizes[extension] += size
+        counts[extension] += 1
+    return summarize_stats(sizes, counts)
+
+def iter_union_entries(layers: list):
+    """
+    ZipEntry for every file across layers (zipstream.iter_directory_entries of a single layer).
+    """
+    if len(layers) == 1:
+        yield from iter_directory_entries(layers[0])
+        return
+    for relpath, file_path in iter_union_files(layers):
+        stat = os.stat(file_path)
+        yield ZipEntry(
+            arcname=relpath,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            open=lambda file_path=file_path: open(file_path, 'rb'),
+        )
+
+def get_union_archive_key(layers: list, compression: int) -> str:
+    """
+    Archive cache key of the union of layers; like archive_cache.get_archive_key(), it
+    changes with any added, removed, resized or touched file of any layer. Built from
+    the cached fingerprint of each layer, so it does not stat every file either.
+    """
+    if len(layers) == 1:
+        return get_archive_key(layers[0], compression)
+    digest = hashlib.sha256()
+    for layer in layers:
+        digest.update(f"{get_cached_fingerprint(layer)}\n".encode())
+    return f"{digest.hexdigest()}-{compression}"
+
+def materialize_path(obj, relpath: str, copy_up: bool = True):
+    """
+    Copy relpath up from a lower layer into obj's own directory before it is written
+    to (a no-op when it is already there), and return its path there, or None when
+    relpath leaves the root. Missing files, or any file with copy_up=False (a writer
+    replacing the whole file), only get their parent directory.
+    """
+    relpath = normalize_relpath(relpath)
+    if not relpath:
+        return None
+    layers = get_layers(obj)
+    target = os.path.join(layers[0], relpath)
+    if os.path.lexists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    source = resolve_path(layers[1:], relpath)
+    if source != None and os.path.isfile(source) and copy_up:
+        fork_file(source, target, list(COPY_UP_STRATEGIES))
+    elif source != None and os.path.isdir(source):
+        os.makedirs(target, exist_ok=True)
+    return target
+
+def get_overlay_for_path(path: str) -> tuple:
+    """
+    (lazy fork, path relative to its directory) when path lies in the own directory
+    of a lazy fork, else (None, None).
+    """
+    forks = Dataset.objects.filter(is_overlay=True, dataset_directory__in=get_path_ancestors(path))
+    fork = max(forks, key=lambda fork: len(os.path.normpath(fork.dataset_directory)), default=None)
+    if fork == None:
+        return None, None
+    return fork, os.path.relpath(os.path.normpath(path), os.path.normpath(fork.dataset_directory))
+
+def prepare_write(path: str, copy_up: bool = True):
+    """
+    Call before opening path for writing. In a lazy fork the file is copied up from
+    the lower layer it is read from (materialize_path()), so the write lands where
+    reads look first and the original is left alone; elsewhere it does nothing.
+    """
+    fork, relpath = get_overlay_for_path(path)
+    if fork != None and relpath != '.':
+        materialize_path(fork, relpath, copy_up=copy_up)
+
+def materialize_overlay(obj) -> int:
+    """
+    Fork every file obj still reads from lower layers into its own directory and turn
+    it into a regular dataset, before one of those layers is deleted. Returns the
+    number of files forked.
+    """
+    if not is_overlay(obj):
+        return 0
+    layers = get_layers(obj)
+    strategies = list(COPY_UP_STRATEGIES)
+    forked = 0
+    for relpath, file_path in iter_union_files(layers):
+        target = os.path.join(layers[0], relpath)
+        if file_path == target:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fork_file(file_path, target, strategies)
+        forked += 1
+    build_file_index(layers[0])
+    type(obj).objects.filter(pk=obj.pk).update(is_overlay=False)
+    obj.is_overlay = False
+    return forked
@@ -0,0 +1,158 @@
+import json
+import time
+import base64
+
+from django.conf import settings
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CATALOG_ORDERING = ("-created", "-id")
+
+KEYSET_ORDER_FIELDS = ("created", "updated")
+KEYSET_DEFAULT_PER_PAGE = 10
+KEYSET_MAX_PER_PAGE = 100
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+
+CATALOG_CACHE_ALIAS = "catalog"
+
+def encode_cursor(obj, order_field: str, direction: str) -> str:
+    """
+    Opaque cursor for the keyset position (obj.<order_field>, obj.id).
+    """
+    payload = {
+        "f": order_field,
+        "v": getattr(obj, order_field).isoformat(),
+        "id": obj.id,
+        "d": direction,
+    }
+    payload_json = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload_json).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_field: str) -> tuple:
+    """
+    Raises ValueError when the cursor is malformed or was made for another ordering.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        value = parse_datetime(payload["v"])
+        object_id = int(payload["id"])
+        direction = payload["d"]
+    except (TypeError, KeyError, AttributeError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if value == None or payload.get("f") != order_field or direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        raise ValueError("Invalid cursor")
+    return value, object_id, direction
+
+def get_per_page(value, default=KEYSET_DEFAULT_PER_PAGE, maximum=KEYSET_MAX_PER_PAGE) -> int:
+    if value == None or value == '':
+        return default
+    return max(1, min(int(value), maximum))
+
+def keyset_page(queryset, order_field: str = "created", cursor: str = None, per_page: int = KEYSET_DEFAULT_PER_PAGE):
+    """
+    Newest-first page of `queryset` keyed on (order_field, id).
+
+    Every page is one `WHERE order_field <= value AND (order_field < value OR (order_field
+    = value AND id < id)) ORDER BY ... LIMIT per_page + 1` query: the first condition
+    is an index range, so the (order_field, id) index seeks to the cursor and the cost
+    does not depend on how deep the page is.
+
+    Returns (objects, next_cursor, prev_cursor). A cursor is None when there is no such page.
+    """
+    if order_field not in KEYSET_ORDER_FIELDS:
+        raise ValueError(f"Cannot order by {order_field}")
+
+    direction = CURSOR_NEXT
+    if cursor:
+        value, object_id, direction = decode_cursor(cursor, order_field)
+        lookup = "lt" if direction == CURSOR_NEXT else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{order_field}__{lookup}e": value}),
+            Q(**{f"{order_field}__{lookup}": value})
+            | Q(**{order_field: value, f"id__{lookup}": object_id}),
+        )
+
+    if direction == CURSOR_NEXT:
+        objects = list(queryset.order_by(f"-{order_field}", "-id")[:per_page + 1])
+        has_next = len(objects) > per_page
+        has_previous = bool(cursor)
+        objects = objects[:per_page]
+    else:
+        objects = list(queryset.order_by(order_field, "id")[:per_page + 1])
+        has_previous = len(objects) > per_page
+        has_next = True
+        objects = objects[:per_page][::-1]
+
+    next_cursor = None
+    prev_cursor = None
+    if objects and has_next:
+        next_cursor = encode_cursor(objects[-1], order_field, CURSOR_NEXT)
+    if objects and has_previous:
+        prev_cursor = encode_cursor(objects[0], order_field, CURSOR_PREVIOUS)
+
+    return objects, next_cursor, prev_cursor
+
+def get_catalog_cache():
+    if CATALOG_CACHE_ALIAS in settings.CACHES:
+        return caches[CATALOG_CACHE_ALIAS]
+    return caches[DEFAULT_CACHE_ALIAS]
+
+def get_count_generation_key(Object) -> str:
+    return f"catalog:generation:{Object._meta.label_lower}"
+
+def get_count_generation(Object) -> int:
+    """
+    Part of every count key of Object; bumping it drops all of Object's cached counts.
+    Starts from the clock, so a generation lost to eviction cannot bring old counts back.
+    """
+    cache = get_catalog_cache()
+    key = get_count_generation_key(Object)
+    generation = cache.get(key)
+    if generation == None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+def bump_count_generation(Object):
+    cache = get_catalog_cache()
+    key = get_count_generation_key(Object)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+def get_count_cache_key(Object, scope: str) -> str:
+    return f"catalog:count:{Object._meta.label_lower}:{get_count_generation(Object)}:{scope}"
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator whose COUNT(*) is cached in the catalog cache under `cache_scope`
+    (e.g. "public", "user:<id>"). The scope must identify the queryset's filter;
+    without one it counts like Paginator.
+
+    polls.signals bumps the model's count generation on save and delete.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, cache_scope=None):
+        super().__init__(object_list, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+        self.cache_scope = cache_scope
+
+    @cached_property
+    def count(self):
+        if self.cache_scope == None:
+            return Paginator.count.func(self)
+
+        cache = get_catalog_cache()
+        key = get_count_cache_key(self.object_list.model, self.cache_scope)
+        count = cache.get(key)
+        if count == None:
+            count = Paginator.count.func(self)
+            cache.set(key, count)
+        return count
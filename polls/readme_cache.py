@@ -0,0 +1,83 @@
+import os
+import hashlib
+
+from django.conf import settings
+
+from .pagination import get_catalog_cache
+from .file_index import get_path_ancestors
+from .views import MARKDOWN_FENCED_CODE, find_readme_text_file
+
+README_CACHE_PREFIX = "readme"
+README_CACHE_DEFAULT_TIMEOUT = 24 * 60 * 60 # seconds
+NO_README_MARKDOWN = 'No Readme file found.'
+
+def get_readme_cache_timeout() -> int:
+    return getattr(settings, 'README_CACHE_TIMEOUT', README_CACHE_DEFAULT_TIMEOUT)
+
+def get_readme_cache_key(directory: str) -> str:
+    return f"{README_CACHE_PREFIX}:{hashlib.sha256(directory.encode('utf-8', 'surrogateescape')).hexdigest()}"
+
+def render_readme(directory: str, cached=None):
+    """
+    (readme path, mtime_ns, rendered markdown) of directory. The markdown of `cached`
+    is reused when it was rendered from the same README path and mtime.
+    """
+    if not os.path.isdir(directory):
+        return (None, None, NO_README_MARKDOWN)
+
+    readme = find_readme_text_file(directory)
+    if readme == None:
+        return (None, None, NO_README_MARKDOWN)
+
+    path, text = readme
+    entry_key = (str(path), path.stat().st_mtime_ns)
+    if cached != None and tuple(cached[:2]) == entry_key:
+        return cached
+    return (*entry_key, MARKDOWN_FENCED_CODE.convert(text))
+
+def warm_readme_cache(directory: str):
+    """
+    Render directory's README into the cache (on upload, fork or save).
+    """
+    cache = get_catalog_cache()
+    key = get_readme_cache_key(directory)
+    try:
+        entry = render_readme(directory, cache.get(key))
+    except OSError as e:
+        print(f'README render error for {directory}: {e}')
+        cache.delete(key)
+        return None
+    cache.set(key, entry, get_readme_cache_timeout())
+    return entry
+
+def get_readme_markdown(directory: str) -> str:
+    """
+    Rendered README of directory. A cache hit does not touch the filesystem;
+    a miss (expired, evicted or never warmed) renders it like warm_readme_cache.
+    """
+    entry = get_catalog_cache().get(get_readme_cache_key(directory))
+    if entry == None:
+        entry = warm_readme_cache(directory)
+    if entry == None:
+        return NO_README_MARKDOWN
+    return entry[2]
+
+def get_union_readme_markdown(layers: list) -> str:
+    """
+    Rendered README of the topmost of layers (polls/overlay.py) that has one.
+    """
+    for layer in layers:
+        markdown = get_readme_markdown(layer)
+        if markdown != NO_README_MARKDOWN:
+            return markdown
+    return NO_README_MARKDOWN
+
+def invalidate_readme_cache(directory: str):
+    get_catalog_cache().delete(get_readme_cache_key(directory))
+
+def invalidate_path_readme_cache(path: str):
+    """
+    Drop the cached README of every directory that is path or contains it, after
+    path was written.
+    """
+    get_catalog_cache().delete_many([get_readme_cache_key(directory) for directory in get_path_ancestors(path)])
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.db.models import Q, F
+from django.db.models.functions import Upper
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+
+from .models import Dataset, Model
+from .pagination import CATALOG_ORDERING
+
+SEARCH_CONFIG = "simple"
+SEARCH_DEFAULT_LIMIT = 5
+SEARCH_MAX_QUERY_LENGTH = 200
+
+SEARCH_FIELDS = {
+    Model: ("name", "description", "model_type"),
+    Dataset: ("name", "description"),
+}
+
+def search_vector(Object=Model) -> SearchVector:
+    """
+    Must stay identical to the GinIndex expression in the model's Meta, or
+    PostgreSQL will not use the index.
+    """
+    return SearchVector(*SEARCH_FIELDS[Object], config=SEARCH_CONFIG)
+
+def name_trigram_expression():
+    """
+    `name__icontains` compiles to UPPER("name"::text) LIKE UPPER(...), so the
+    trigram index is built on UPPER(name) and serves both the substring and the
+    similarity lookups.
+    """
+    return Upper("name")
+
+def search_catalog(queryset, q: str, limit: int = SEARCH_DEFAULT_LIMIT):
+    """
+    Ranked search over `queryset` (already filtered for visibility).
+
+    On PostgreSQL a row matches when the full-text vector matches, the name
+    contains `q`, or the name is trigram-similar to `q` (typos); every branch is
+    answered by a GIN index. Results are ordered by text rank plus name
+    similarity. Other databases fall back to `name__icontains`.
+    """
+    q = (q or "").strip()[:SEARCH_MAX_QUERY_LENGTH]
+    if not q:
+        return queryset.none()
+
+    if connection.vendor != "postgresql":
+        return queryset.filter(name__icontains=q).order_by(*CATALOG_ORDERING)[:limit]
+
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset
+        .annotate(
+            search=search_vector(queryset.model),
+            name_upper=name_trigram_expression(),
+        )
+        .filter(
+            Q(search=query)
+            | Q(name__icontains=q)
+            | Q(name_upper__trigram_similar=q.upper())
+        )
+        .annotate(
+            rank=SearchRank(F("search"), query) + TrigramSimilarity(F("name_upper"), q.upper()),
+        )
+        .order_by("-rank", *CATALOG_ORDERING)[:limit]
+    )
@@ -0,0 +1,63 @@
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .http_range import ranged_file_response
+
+BLOB_SERVE_MODE_DJANGO = 'django'
+BLOB_SERVE_MODE_X_ACCEL_REDIRECT = 'x-accel-redirect'
+BLOB_SERVE_MODE_X_SENDFILE = 'x-sendfile'
+BLOB_SERVE_MODES = (BLOB_SERVE_MODE_DJANGO, BLOB_SERVE_MODE_X_ACCEL_REDIRECT, BLOB_SERVE_MODE_X_SENDFILE)
+
+def get_blob_serve_mode() -> str:
+    mode = getattr(settings, 'BLOB_SERVE_MODE', BLOB_SERVE_MODE_DJANGO)
+    if mode not in BLOB_SERVE_MODES:
+        print(f'Unknown BLOB_SERVE_MODE {mode!r}, serving files from Django')
+        return BLOB_SERVE_MODE_DJANGO
+    return mode
+
+def get_blob_serve_root() -> str:
+    return os.path.realpath(getattr(settings, 'BLOB_SERVE_ROOT', settings.BASE_DIR))
+
+def get_offload_path(file_path: str):
+    """
+    file_path relative to BLOB_SERVE_ROOT, or None when it lies outside of it
+    (the web server only exposes that tree).
+    """
+    real_path = os.path.realpath(file_path)
+    root = get_blob_serve_root()
+    if os.path.commonpath([real_path, root]) != root:
+        return None
+    return os.path.relpath(real_path, root)
+
+def offload_response(mode: str, file_path: str, relative_path: str, content_type: str = None, filename: str = None, as_attachment: bool = False) -> HttpResponse:
+    """
+    Empty response telling the web server in front (nginx X-Accel-Redirect,
+    Apache/lighttpd X-Sendfile) to send the file itself, ranges and validators included.
+    """
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    if mode == BLOB_SERVE_MODE_X_ACCEL_REDIRECT:
+        prefix = getattr(settings, 'BLOB_ACCEL_REDIRECT_PREFIX', '/protected/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path.replace(os.sep, '/'))
+    else:
+        response['X-Sendfile'] = os.path.realpath(file_path)
+    if filename or as_attachment:
+        filename = filename or os.path.basename(file_path)
+        response['Content-Disposition'] = f'{"attachment" if as_attachment else "inline"}; filename="{filename}"'
+    return response
+
+def serve_file(request, file_path: str, content_type: str = None, filename: str = None, as_attachment: bool = False, etag: str = None):
+    """
+    Send a file without reading it into memory: handed to the web server when
+    BLOB_SERVE_MODE offloads and the file is under BLOB_SERVE_ROOT, else a
+    FileResponse (os.sendfile through the WSGI server's file wrapper) with Range support.
+    """
+    mode = get_blob_serve_mode()
+    if mode != BLOB_SERVE_MODE_DJANGO:
+        relative_path = get_offload_path(file_path)
+        if relative_path != None and os.path.isfile(file_path):
+            return offload_response(mode, file_path, relative_path, content_type, filename, as_attachment)
+
+    return ranged_file_response(request, file_path, content_type, filename=filename, as_attachment=as_attachment, etag=etag)
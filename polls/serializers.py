@@ -1,5 +1,6 @@
 from django.contrib.auth.models import Group, User
-from rest_framework import serializers
+from rest_framework import serializers, ISO_8601
+from rest_framework.settings import api_settings
 
 from django.contrib.auth.models import User
 
@@ -14,4 +15,58 @@ class GroupSerializer(serializers.HyperlinkedModelSerializer):
         model = Group
         fields = ['url', 'name']
 
-    
\ No newline at end of file
+    
+# Fields of api.ModelSerializer and api.DatasetSerializer, in output order.
+STATS_FIELDS = ["total_size", "file_count", "extension_stats", "stats_updated"]
+MODEL_LIST_FIELDS = ["id", "name", "updated", "is_public", "original_model", "model_type", "username", "model_directory", "description", *STATS_FIELDS]
+DATASET_LIST_FIELDS = ["id", "name", "updated", "created", "is_public", "original_dataset", "username", "dataset_directory", "description", *STATS_FIELDS]
+
+USERNAME_FIELD = "username"
+USERNAME_LOOKUP = "user__username"
+
+def get_datetime_representation():
+    """
+    DateTimeField().to_representation, with the current timezone looked up once
+    instead of once per value.
+    """
+    field = serializers.DateTimeField()
+    timezone = field.default_timezone()
+    if timezone == None or str(api_settings.DATETIME_FORMAT).lower() != ISO_8601:
+        return field.to_representation
+
+    def to_representation(value):
+        if value == None or value.tzinfo == None:
+            return field.to_representation(value)
+        value = value.astimezone(timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return to_representation
+
+def values_serializer_data(queryset, fields=DATASET_LIST_FIELDS) -> list:
+    """
+    Read-only fast path for listings: the same dicts ModelSerializer(..., many=True).data
+    would give for `fields`, built from one values_list() query without creating
+    model or serializer field instances per row.
+
+    Like ReadOnlyField(source='user.username'), `username` is left out when the
+    object has no user, and datetimes use DRF's DateTimeField representation.
+    """
+    lookups = [USERNAME_LOOKUP if name == USERNAME_FIELD else name for name in fields]
+    datetime_fields = {
+        name for name in fields
+        if name != USERNAME_FIELD and queryset.model._meta.get_field(name).get_internal_type() == "DateTimeField"
+    }
+    to_representation = get_datetime_representation()
+
+    data = []
+    for row in queryset.values_list(*lookups):
+        item = {}
+        for name, value in zip(fields, row):
+            if name in datetime_fields:
+                value = to_representation(value)
+            elif name == USERNAME_FIELD and value == None:
+                continue
+            item[name] = value
+        data.append(item)
+    return data
@@ -0,0 +1,136 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import Dataset, Model, DatasetAction, ModelAction
+from .pagination import bump_count_generation
+from .archive_cache import invalidate_archive_cache
+from .readme_cache import warm_readme_cache, invalidate_readme_cache
+from .file_index import build_file_index, delete_file_index
+from .stats import refresh_stats
+from .blob_store import is_blob_store_enabled, ingest_directory, release_manifest
+from .overlay import materialize_overlay
+
+@receiver(post_save, sender=Model)
+@receiver(post_save, sender=Dataset)
+@receiver(post_delete, sender=Model)
+@receiver(post_delete, sender=Dataset)
+def invalidate_catalog_counts(sender, **kwargs):
+    """
+    Any saved or deleted row can change a visibility COUNT, so every scope is dropped.
+    queryset.update()/bulk_create() send no signals; the cache TIMEOUT bounds those.
+    Bumped once the write commits: before that, a concurrent request would recount the
+    old rows and cache them under the new generation.
+    """
+    transaction.on_commit(lambda: bump_count_generation(sender))
+
+@receiver(post_save, sender=Model)
+@receiver(post_delete, sender=Model)
+def invalidate_model_archives(sender, instance, **kwargs):
+    invalidate_archive_cache(instance.model_directory)
+
+@receiver(post_save, sender=Dataset)
+@receiver(post_delete, sender=Dataset)
+def invalidate_dataset_archives(sender, instance, **kwargs):
+    invalidate_archive_cache(instance.dataset_directory)
+
+@receiver(post_save, sender=Model)
+def warm_model_readme(sender, instance, **kwargs):
+    warm_readme_cache(instance.model_directory)
+
+@receiver(post_save, sender=Dataset)
+def warm_dataset_readme(sender, instance, **kwargs):
+    warm_readme_cache(instance.dataset_directory)
+
+@receiver(post_delete, sender=Model)
+def invalidate_model_readme(sender, instance, **kwargs):
+    invalidate_readme_cache(instance.model_directory)
+
+@receiver(post_delete, sender=Dataset)
+def invalidate_dataset_readme(sender, instance, **kwargs):
+    invalidate_readme_cache(instance.dataset_directory)
+
+@receiver(post_save, sender=Model)
+def ingest_model_blobs(sender, instance, created, **kwargs):
+    if created and is_blob_store_enabled():
+        ingest_directory(instance.model_directory)
+
+@receiver(post_save, sender=Dataset)
+def ingest_dataset_blobs(sender, instance, created, **kwargs):
+    if created and is_blob_store_enabled():
+        ingest_directory(instance.dataset_directory)
+
+@receiver(post_delete, sender=Model)
+def release_model_blobs(sender, instance, **kwargs):
+    release_manifest(instance.model_directory)
+
+@receiver(post_delete, sender=Dataset)
+def release_dataset_blobs(sender, instance, **kwargs):
+    release_manifest(instance.dataset_directory)
+
+@receiver(post_save, sender=Model)
+def index_model_files(sender, instance, created, **kwargs):
+    if created:
+        build_file_index(instance.model_directory)
+
+@receiver(post_save, sender=Dataset)
+def index_dataset_files(sender, instance, created, **kwargs):
+    if created:
+        build_file_index(instance.dataset_directory)
+
+@receiver(post_delete, sender=Model)
+def delete_model_file_index(sender, instance, **kwargs):
+    delete_file_index(instance.model_directory)
+
+@receiver(post_delete, sender=Dataset)
+def delete_dataset_file_index(sender, instance, **kwargs):
+    delete_file_index(instance.dataset_directory)
+
+@receiver(post_save, sender=Model)
+@receiver(post_save, sender=Dataset)
+def compute_created_stats(sender, instance, created, **kwargs):
+    if created:
+        refresh_stats(instance)
+
+@receiver(post_save, sender=DatasetAction)
+def refresh_dataset_action_stats(sender, instance, **kwargs):
+    refresh_stats(instance.dataset)
+
+@receiver(post_save, sender=ModelAction)
+def refresh_model_action_stats(sender, instance, **kwargs):
+    refresh_stats(instance.model)
+
+@receiver(post_save, sender=DatasetAction)
+def reindex_dataset_action_files(sender, instance, **kwargs):
+    """
+    Actions write their outputs into the directory, anywhere in it.
+    """
+    build_file_index(instance.dataset.dataset_directory)
+
+@receiver(post_save, sender=ModelAction)
+def reindex_model_action_files(sender, instance, **kwargs):
+    build_file_index(instance.model.model_directory)
+
+@receiver(post_save, sender=DatasetAction)
+def invalidate_dataset_action_readme(sender, instance, **kwargs):
+    invalidate_readme_cache(instance.dataset.dataset_directory)
+
+@receiver(post_save, sender=ModelAction)
+def invalidate_model_action_readme(sender, instance, **kwargs):
+    invalidate_readme_cache(instance.model.model_directory)
+
+@receiver(post_save, sender=DatasetAction)
+def invalidate_dataset_action_archives(sender, instance, **kwargs):
+    invalidate_archive_cache(instance.dataset.dataset_directory)
+
+@receiver(post_save, sender=ModelAction)
+def invalidate_model_action_archives(sender, instance, **kwargs):
+    invalidate_archive_cache(instance.model.model_directory)
+
+@receiver(pre_delete, sender=Dataset)
+def materialize_overlay_forks(sender, instance, **kwargs):
+    """
+    Lazy forks reading through the dataset being deleted copy those files in first.
+    """
+    for fork in Dataset.objects.filter(original_dataset=instance, is_overlay=True):
+        materialize_overlay(fork)
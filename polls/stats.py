@@ -0,0 +1,95 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Dataset, Model
+
+STATS_DEFAULT_WORKERS = 8
+DIRECTORY_FIELDS = {
+    Dataset: 'dataset_directory',
+    Model: 'model_directory',
+}
+
+def get_stats_workers() -> int:
+    return getattr(settings, 'STATS_WORKERS', STATS_DEFAULT_WORKERS)
+
+def scan_one_directory(path: str):
+    """
+    (bytes per extension, files per extension, subdirectory paths) of one directory level.
+    Symlinked directories are not followed.
+    """
+    sizes, counts, subdirectories = Counter(), Counter(), []
+    try:
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                extension = os.path.splitext(entry.name)[1].lower()
+                sizes[extension] += size
+                counts[extension] += 1
+    except OSError as e:
+        print(f'Stats scan error in {path}: {e}')
+    return sizes, counts, subdirectories
+
+def compute_directory_stats(directory: str, max_workers: int = None):
+    """
+    Recursive totals of directory: {'total_size', 'file_count', 'extension_stats':
+    {'.png': {'count', 'size'}, ...}}, or None when it is not a directory.
+
+    Each directory level is scanned as its own task on a thread pool (scandir and
+    stat release the GIL), so deep or wide trees on slow storage are walked in parallel.
+    """
+    if not os.path.isdir(directory):
+        return None
+
+    sizes, counts = Counter(), Counter()
+    with ThreadPoolExecutor(max_workers=max_workers or get_stats_workers()) as pool:
+        pending = {pool.submit(scan_one_directory, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory_sizes, directory_counts, subdirectories = future.result()
+                sizes.update(directory_sizes)
+                counts.update(directory_counts)
+                pending |= {pool.submit(scan_one_directory, subdirectory) for subdirectory in subdirectories}
+    return summarize_stats(sizes, counts)
+
+def summarize_stats(sizes: Counter, counts: Counter) -> dict:
+    return {
+        'total_size': sum(sizes.values()),
+        'file_count': sum(counts.values()),
+        'extension_stats': {extension: {'count': counts[extension], 'size': sizes[extension]} for extension in sorted(counts)},
+    }
+
+def refresh_stats(obj):
+    """
+    Recompute and store the totals of a Dataset or Model directory (of every layer it
+    reads through, for a lazy fork). Saved with queryset.update(), so no post_save
+    signal fires and `updated` is left alone.
+    """
+    # overlay imports this module
+    from .overlay import is_overlay, get_layers, compute_union_stats
+
+    Object = type(obj)
+    if is_overlay(obj):
+        stats = compute_union_stats(get_layers(obj))
+    else:
+        stats = compute_directory_stats(getattr(obj, DIRECTORY_FIELDS[Object]))
+    if stats == None:
+        return None
+
+    stats['stats_updated'] = timezone.now()
+    Object.objects.filter(pk=obj.pk).update(**stats)
+    for name, value in stats.items():
+        setattr(obj, name, value)
+    return stats
@@ -0,0 +1,217 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+import traceback
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Dataset, Model, Task
+from .views import (
+    fork_dataset,
+    fork_model,
+    handle_extract_zip_file,
+    save_dataset_to_database,
+    save_model_folder_info_to_database,
+)
+
+TASK_PROGRESS_GROUP_PREFIX = "task_progress_"
+TASK_PROGRESS_INTERVAL = 0.5 # seconds between stored progress updates
+TASK_POLL_INTERVAL = 1.0 # seconds a worker sleeps when the queue is empty
+
+EXTRACT_DATASET = "extract_dataset"
+EXTRACT_MODEL = "extract_model"
+FORK_DATASET = "fork_dataset"
+FORK_MODEL = "fork_model"
+DELETE_DIRECTORY = "delete_directory"
+
+def is_task_queue_enabled() -> bool:
+    return getattr(settings, 'TASK_QUEUE_ENABLED', False)
+
+def get_task_upload_dir() -> str:
+    return getattr(settings, 'TASK_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'task_uploads'))
+
+def get_task_trash_dir() -> str:
+    return getattr(settings, 'TASK_TRASH_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'task_trash'))
+
+def get_task_progress_group(task_id) -> str:
+    return f"{TASK_PROGRESS_GROUP_PREFIX}{int(task_id)}"
+
+def enqueue_task(kind: str, payload: dict, user=None, task_name: str = '') -> Task:
+    return Task.objects.create(
+        task_name=task_name or kind,
+        kind=kind,
+        payload=payload,
+        user=user,
+        status=Task.STATUS.QUEUED,
+    )
+
+def save_upload_for_task(file) -> str:
+    """
+    Keep an uploaded file past the request: the spooled temporary file is moved
+    (copied across filesystems), an in-memory upload is written out.
+    """
+    os.makedirs(get_task_upload_dir(), exist_ok=True)
+    path = os.path.join(get_task_upload_dir(), f"{uuid.uuid4().hex}.zip")
+    if hasattr(file, 'temporary_file_path'):
+        shutil.move(file.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in file.chunks():
+                destination.write(chunk)
+    return path
+
+def move_to_trash(directory: str):
+    """
+    Rename directory out of the way (instant on the same filesystem) so its path can
+    be reused at once, and return the new path for a DELETE_DIRECTORY task, or None.
+    """
+    if not os.path.isdir(directory):
+        return None
+    os.makedirs(get_task_trash_dir(), exist_ok=True)
+    trash_path = os.path.join(get_task_trash_dir(), uuid.uuid4().hex)
+    os.rename(directory, trash_path)
+    return trash_path
+
+def claim_next_task():
+    """
+    Mark the oldest queued task running and return it, or None. SELECT ... FOR UPDATE
+    SKIP LOCKED lets any number of workers poll the table without claiming a task twice.
+    """
+    with transaction.atomic():
+        task = (
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.STATUS.QUEUED)
+            .order_by('created', 'id')
+            .first()
+        )
+        if task == None:
+            return None
+        task.status = Task.STATUS.RUNNING
+        task.started = timezone.now()
+        task.attempts += 1
+        task.save(update_fields=['status', 'started', 'attempts'])
+    return task
+
+class TaskProgress:
+    """
+    progress(dict) callback of a running task: stored on the row (throttled) and sent
+    to the task's channel layer group, which ProgressConsumer relays to subscribed WebSockets.
+    """
+
+    def __init__(self, task: Task):
+        self.task = task
+        self.last_saved = 0
+        channel_layer = get_channel_layer()
+        self.group_send = async_to_sync(channel_layer.group_send) if channel_layer != None else None
+
+    def send(self, event: dict):
+        event = {'task_id': self.task.id, 'status': self.task.status, **event}
+        if self.group_send != None:
+            try:
+                self.group_send(get_task_progress_group(self.task.id), {'type': 'task.progress', 'progress': event})
+            except Exception as e:
+                print(f'Task progress error: {e}')
+
+    def __call__(self, event: dict):
+        now = time.monotonic()
+        if event.get('finished') or now - self.last_saved >= TASK_PROGRESS_INTERVAL:
+            self.last_saved = now
+            Task.objects.filter(pk=self.task.pk).update(progress=event)
+        self.send(event)
+
+def run_extract(task: Task, progress, Object=Dataset):
+    payload = task.payload
+    user = User.objects.get(id=payload['user_id'])
+    try:
+        handle_extract_zip_file(payload['upload_path'], payload['directory'], progress=progress)
+        if Object == Model:
+            obj = save_model_folder_info_to_database(
+                payload['name'], user, payload['model_type'], payload['directory'], payload['is_public'],
+                description=payload['description'],
+            )
+        else:
+            obj = save_dataset_to_database(
+                payload['name'], user, payload['directory'], payload['is_public'],
+                description=payload['description'],
+            )
+    finally:
+        if os.path.exists(payload['upload_path']):
+            os.remove(payload['upload_path'])
+    return {'id': obj.id}
+
+def run_fork(task: Task, progress, Object=Dataset):
+    payload = task.payload
+    user = User.objects.get(id=payload['user_id'])
+    progress({'finished': False, 'success': True})
+    if Object == Model:
+        obj = fork_model(payload['object_id'], user, payload['name'], payload['model_type'], payload['is_public'], description=payload['description'])
+    else:
+        obj = fork_dataset(payload['object_id'], user, payload['name'], payload['is_public'], description=payload['description'])
+    if obj == None:
+        raise RuntimeError('Failed to fork.')
+    return {'id': obj.id}
+
+def run_delete_directory(task: Task, progress):
+    shutil.rmtree(task.payload['directory'], ignore_errors=True)
+    return {}
+
+TASK_HANDLERS = {
+    EXTRACT_DATASET: lambda task, progress: run_extract(task, progress, Object=Dataset),
+    EXTRACT_MODEL: lambda task, progress: run_extract(task, progress, Object=Model),
+    FORK_DATASET: lambda task, progress: run_fork(task, progress, Object=Dataset),
+    FORK_MODEL: lambda task, progress: run_fork(task, progress, Object=Model),
+    DELETE_DIRECTORY: run_delete_directory,
+}
+
+def get_task_error(e: Exception) -> str:
+    """
+    Message of a failed task, as shown to its user: the exception type and message,
+    without the file names of OSErrors. The traceback only goes to the worker's log.
+    """
+    message = e.strerror if isinstance(e, OSError) and e.strerror else str(e)
+    return f"{type(e).__name__}: {message}"
+
+def run_task(task: Task):
+    """
+    Run a claimed task and store how it ended; failures are recorded, never raised.
+    """
+    progress = TaskProgress(task)
+    try:
+        result = TASK_HANDLERS[task.kind](task, progress)
+        task.status, task.result, task.error = Task.STATUS.SUCCEEDED, result, ''
+    except Exception as e:
+        print(f'Task {task.id} ({task.kind}) failed:\n{"".join(traceback.format_exception(e))}')
+        task.status, task.error = Task.STATUS.FAILED, get_task_error(e)
+    task.finished = timezone.now()
+    task.save(update_fields=['status', 'result', 'error', 'finished'])
+    progress.send({'finished': True, 'success': task.status == Task.STATUS.SUCCEEDED, 'result': task.result, 'error': task.error})
+    return task
+
+def run_task_worker(stop_event: threading.Event = None, max_tasks: int = None, poll_interval: float = TASK_POLL_INTERVAL) -> int:
+    """
+    Claim and run tasks until stop_event is set (or max_tasks ran, or, with
+    max_tasks, the queue is empty). Returns the number of tasks run.
+    """
+    ran = 0
+    while (stop_event == None or not stop_event.is_set()) and (max_tasks == None or ran < max_tasks):
+        close_old_connections()
+        task = claim_next_task()
+        if task == None:
+            if max_tasks != None:
+                break
+            if stop_event != None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        run_task(task)
+        ran += 1
+    close_old_connections()
+    return ran
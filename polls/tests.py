@@ -1,9 +1,38 @@
+import io
+import os
+import json
+import errno
+import hashlib
+import shutil
+import asyncio
+import zipfile
 import datetime
+import tempfile
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 
-from django.test import TestCase
+from django.contrib.auth.models import User
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.http import FileResponse
+from django.db import connection, close_old_connections
+from django.core.signals import request_finished
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+from minio.error import S3Error
 
-from .models import Question
+from . import api, views, zipstream, archive_cache, http_range, sendfile, readme_cache, file_index, stats, extraction, tasks, fork, blob_store, overlay
+from .models import Question, Dataset, Model, DatasetAction, DatasetActionSet, Task, Blob
+from .pagination import get_catalog_cache
+from .views import MARKDOWN_FENCED_CODE
+from ku_djangoo import minio_utils
+from .authentication import ValidatedTokenCache, validated_token_cache, add_user_claims, JWTClaimsUserAuthentication
 
 
 class QuestionModelTests(TestCase):
@@ -121,4 +150,1467 @@ class QuestionDetailViewTests(TestCase):
         past_question = create_question(question_text="Past Question.", days=-5)
         url = reverse("polls:detail", args=(past_question.id,))
         response = self.client.get(url)
-        self.assertContains(response, past_question.question_text)
\ No newline at end of file
+        self.assertContains(response, past_question.question_text)
+
+def create_dataset(user, name, is_public=True, minutes=0):
+    """
+    Create a dataset owned by `user`, created `minutes` offset to now.
+    """
+    time = timezone.now() + datetime.timedelta(minutes=minutes)
+    return Dataset.objects.create(
+        name=name,
+        user=user,
+        dataset_directory=f"asset/dataset/{user.id}/{name}",
+        is_public=is_public,
+        created=time,
+    )
+
+def get_with_jwt_cookie(path, user=None, data=None):
+    """
+    Build a GET request, carrying an access token cookie for `user` if given.
+    """
+    request = APIRequestFactory().get(path, data or {})
+    if user != None:
+        request.COOKIES['access_token'] = str(add_user_claims(RefreshToken.for_user(user), user).access_token)
+    return request
+
+class DatasetsPageRangeTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        for i in range(5):
+            create_dataset(self.ace, f"public {i}", minutes=-i)
+        create_dataset(self.bob, "bob private", is_public=False, minutes=1)
+
+    def test_anonymous_page_is_sliced_from_public_datasets(self):
+        """
+        An anonymous request only sees public datasets, newest first,
+        and only the requested page is serialized.
+        """
+        request = get_with_jwt_cookie("/api/datasets/page/", data={"page": 2, "per_page": 2})
+        data = json.loads(api.datasets_page_range(request).content)
+
+        self.assertEqual([d["name"] for d in data["list"]], ["public 2", "public 3"])
+        self.assertEqual(data["current_page"], 2)
+        self.assertEqual(data["total_list_count"], 5)
+        self.assertEqual(data["num_pages"], 3)
+        self.assertEqual(data["page_range"], [1, 2, 3])
+        self.assertIs(data["page_has_next"], True)
+        self.assertIs(data["page_has_previous"], True)
+
+    def test_owner_sees_private_dataset_in_page(self):
+        """
+        The owner of a private dataset sees it alongside public datasets.
+        """
+        request = get_with_jwt_cookie("/api/datasets/page/", user=self.bob, data={"per_page": 2})
+        data = json.loads(api.datasets_page_range(request).content)
+
+        self.assertEqual([d["name"] for d in data["list"]], ["bob private", "public 0"])
+        self.assertEqual(data["total_list_count"], 6)
+
+    def test_user_and_public_pages_keep_response_shape(self):
+        """
+        user_and_public_objects_pages paginates the queryset and keeps its keys.
+        """
+        request = get_with_jwt_cookie("/api/user/datasets/page/", data={"dataset_page": 3})
+        response = api.user_and_public_datasets_pages(request)
+
+        self.assertEqual(response.data["page_number"], 3)
+        self.assertEqual([d["name"] for d in response.data["list"]], ["public 4"])
+        self.assertEqual(response.data["total_list_count"], 5)
+        self.assertEqual(response.data["paginator_num_pages"], 3)
+        self.assertIs(response.data["page_has_next"], False)
+
+class DatasetsCursorPageTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        self.created = timezone.now()
+        for i in range(5):
+            Dataset.objects.create(
+                name=f"public {i}", user=self.ace, is_public=True,
+                dataset_directory=f"asset/dataset/{self.ace.id}/public {i}",
+                created=self.created,
+            )
+        create_dataset(self.bob, "bob private", is_public=False, minutes=1)
+
+    def get_page(self, user=None, **params):
+        request = get_with_jwt_cookie("/api/datasets/page/", user=user, data={"pagination": "cursor", **params})
+        return json.loads(api.datasets_page_range(request).content)
+
+    def test_cursor_walks_forward_and_back_through_ties(self):
+        """
+        Datasets sharing the same `created` are paged by id without gaps or repeats.
+        """
+        first = self.get_page(per_page=2)
+        second = self.get_page(per_page=2, cursor=first["next_cursor"])
+        third = self.get_page(per_page=2, cursor=second["next_cursor"])
+        back = self.get_page(per_page=2, cursor=third["prev_cursor"])
+
+        names = [d["name"] for page in (first, second, third) for d in page["list"]]
+        self.assertEqual(names, [f"public {i}" for i in reversed(range(5))])
+        self.assertIsNone(first["prev_cursor"])
+        self.assertIsNone(third["next_cursor"])
+        self.assertIs(third["page_has_previous"], True)
+        self.assertEqual(back["list"], second["list"])
+
+    def test_cursor_seeks_with_a_range_condition(self):
+        """
+        The page after a cursor bounds `created` on its own, so the index can seek to it.
+        """
+        first = self.get_page(per_page=2)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(per_page=2, cursor=first["next_cursor"])
+        page_query = [query["sql"] for query in queries if "ORDER BY" in query["sql"]][-1]
+        self.assertIn('"polls_dataset"."created" <=', page_query)
+
+    def test_cursor_respects_visibility(self):
+        """
+        The private dataset is only listed for its owner.
+        """
+        self.assertNotIn("bob private", [d["name"] for d in self.get_page()["list"]])
+        self.assertEqual(self.get_page(user=self.bob)["list"][0]["name"], "bob private")
+
+    def test_invalid_cursor_is_rejected(self):
+        """
+        A tampered cursor or an unknown ordering returns 400 instead of a page.
+        """
+        request = get_with_jwt_cookie("/api/datasets/page/", data={"cursor": "not-a-cursor"})
+        self.assertEqual(api.datasets_page_range(request).status_code, 400)
+        request = get_with_jwt_cookie("/api/datasets/page/", data={"pagination": "cursor", "order_by": "name"})
+        self.assertEqual(api.datasets_page_range(request).status_code, 400)
+
+class CatalogSearchTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        create_dataset(self.ace, "imagenet subset", minutes=-1)
+        create_dataset(self.ace, "squad v2")
+        create_dataset(self.bob, "bob imagenet", is_public=False, minutes=1)
+
+    def search(self, query, user=None):
+        request = get_with_jwt_cookie("/api/dataset/search/", user=user, data={"query": query})
+        return api.search_dataset_by_name(request).data
+
+    def test_dataset_search_matches_name(self):
+        """
+        The dataset search endpoint returns matching datasets under its own key.
+        """
+        data = self.search("imagenet")
+        self.assertEqual(data["search_dataset_query_value"], "imagenet")
+        self.assertEqual([d["name"] for d in data["list"]], ["imagenet subset"])
+
+    def test_dataset_search_respects_visibility(self):
+        """
+        Private datasets are only found by their owner.
+        """
+        self.assertCountEqual(
+            [d["name"] for d in self.search("imagenet", user=self.bob)["list"]],
+            ["bob imagenet", "imagenet subset"],
+        )
+
+    def test_no_match_falls_back_to_visible_datasets(self):
+        """
+        With no match the endpoint lists the newest visible datasets, never private ones.
+        """
+        names = [d["name"] for d in self.search("no such dataset")["list"]]
+        self.assertEqual(names, ["squad v2", "imagenet subset"])
+
+    def test_personal_repo_search_hides_private_models(self):
+        """
+        The template search view falls back to visible models too.
+        """
+        Model.objects.create(name="public model", user=self.ace, is_public=True, model_directory="public_model")
+        Model.objects.create(name="bob model", user=self.bob, is_public=False, model_directory="bob_model")
+        request = APIRequestFactory().post("/", {"search-dataset-query": "no such model"})
+        request.user = self.ace
+        self.assertEqual([m.name for m in views.search_dataset_name(request)["models"]], ["public model"])
+        request.user = self.bob
+        self.assertCountEqual([m.name for m in views.search_dataset_name(request)["models"]], ["public model", "bob model"])
+
+class CatalogQueryCountTests(TestCase):
+    """
+    Listing endpoints run a fixed number of queries, however many rows they serialize.
+    Each row has its own owner, so reading user.username lazily would add a query per row.
+    """
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        for i in range(12):
+            owner = User.objects.create_user(f"owner{i}", f"owner{i}@email.com", "apassword")
+            create_dataset(owner, f"dataset {i}", minutes=-i)
+            Model.objects.create(
+                name=f"model {i}", user=owner, is_public=True, model_type="bert",
+                model_directory=f"asset/model/{owner.id}/model {i}",
+            )
+        create_dataset(self.ace, "ace private", is_public=False, minutes=1)
+
+    def assertQueriesPerPageSize(self, num, view, path, user=None, **params):
+        for per_page in (1, 10):
+            request = get_with_jwt_cookie(path, user=user, data={**params, "per_page": per_page})
+            get_catalog_cache().clear()
+            with self.assertNumQueries(num):
+                response = view(request)
+            self.assertEqual(response.status_code, 200)
+
+    def test_page_range_endpoints(self):
+        # count + page; the user comes from the access token claims
+        self.assertQueriesPerPageSize(2, api.datasets_page_range, "/api/datasets/page/")
+        self.assertQueriesPerPageSize(2, api.models_page_range, "/api/models/page/", user=self.ace)
+        self.assertQueriesPerPageSize(1, api.datasets_page_range, "/api/datasets/page/", pagination="cursor")
+
+    def test_user_and_public_pages(self):
+        self.assertQueriesPerPageSize(2, api.user_and_public_datasets_pages, "/api/user/datasets/page/", user=self.ace)
+        self.assertQueriesPerPageSize(2, api.user_and_public_models_pages, "/api/user/models/page/")
+
+    def test_user_datasets(self):
+        self.assertQueriesPerPageSize(2, api.user_datasets_api, "/api/user/datasets/", user=self.ace)
+
+    def test_top_lists_and_search(self):
+        for user in (None, self.ace):
+            self.assertQueriesPerPageSize(1, api.model_list_user, "/api/top-models/", user=user)
+            self.assertQueriesPerPageSize(1, api.dataset_list_user, "/api/top-datasets/", user=user)
+            self.assertQueriesPerPageSize(1, api.search_model_by_name, "/api/model/search/", user=user, query="model")
+
+    def test_generic_list_views(self):
+        for view, path in ((api.ModelList.as_view(), "/models/"), (api.DatasetList.as_view(), "/datasets/")):
+            request = APIRequestFactory().get(path)
+            force_authenticate(request, user=self.ace)
+            with self.assertNumQueries(2):
+                response = view(request)
+            self.assertEqual(len(response.data["results"]), 2)
+
+class FastListSerializerTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        original = create_dataset(self.ace, "imagenet   subset")
+        Dataset.objects.create(
+            name="orphan", user=None, is_public=True, original_dataset=original,
+            dataset_directory="asset/dataset/orphan",
+        )
+        Model.objects.create(
+            name="bert", user=self.ace, is_public=True, model_type="bert",
+            model_directory=f"asset/model/{self.ace.id}/bert",
+        )
+
+    def test_values_data_matches_serializers(self):
+        """
+        The values_list() path gives the same dicts, and the same JSON, as the DRF serializers.
+        """
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        for Serializer in (api.DatasetSerializer, api.ModelSerializer):
+            queryset = Serializer.Meta.model.objects.order_by("id")
+            expected = Serializer(queryset, many=True).data
+            data = api.get_list_serializer_data(Serializer, queryset)
+
+            self.assertEqual(data, expected)
+            self.assertEqual(json.dumps(data), json.dumps(expected))
+            self.assertEqual(ORJSONRenderer().render({"list": data}), JSONRenderer().render({"list": expected}))
+
+    def test_username_is_omitted_without_user(self):
+        data = api.get_list_serializer_data(api.DatasetSerializer, Dataset.objects.filter(name="orphan"))
+        self.assertNotIn("username", data[0])
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'},
+})
+class CatalogCountCacheTests(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        for i in range(3):
+            create_dataset(self.ace, f"public {i}", minutes=-i)
+        create_dataset(self.ace, "ace private", is_public=False)
+
+    def get_page(self, user=None):
+        request = get_with_jwt_cookie("/api/datasets/page/", user=user, data={"per_page": 2})
+        return json.loads(api.datasets_page_range(request).content)
+
+    def test_count_is_cached_per_scope(self):
+        """
+        The second request takes its COUNT from the cache; users and anonymous requests do not share counts.
+        """
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_page()["total_list_count"], 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_page()["total_list_count"], 3)
+        self.assertEqual(self.get_page(user=self.ace)["total_list_count"], 4)
+
+    def test_save_and_delete_invalidate_counts_on_commit(self):
+        self.assertEqual(self.get_page()["total_list_count"], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            dataset = create_dataset(self.ace, "public 3")
+            self.assertEqual(self.get_page()["total_list_count"], 3)
+        self.assertEqual(self.get_page()["total_list_count"], 4)
+        self.assertEqual(self.get_page()["num_pages"], 2)
+
+        dataset.is_public = False
+        with self.captureOnCommitCallbacks(execute=True):
+            dataset.save()
+        self.assertEqual(self.get_page()["total_list_count"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dataset.delete()
+        self.assertEqual(self.get_page(user=self.ace)["total_list_count"], 4)
+
+class JWTUserResolutionTests(TestCase):
+    def setUp(self):
+        validated_token_cache.clear()
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+
+    def test_user_is_resolved_once_per_request(self):
+        """
+        The decorator, the DRF Request and the view share one lookup.
+        """
+        request = get_with_jwt_cookie("/api/user/", user=self.ace)
+        with mock.patch.object(api, "get_validated_token", wraps=api.get_validated_token) as validate:
+            self.assertEqual(api.identify_user_from_jwt_token_from_request_cookie(request), self.ace)
+            self.assertEqual(api.identify_user_from_jwt_token_from_request_cookie(Request(request)), self.ace)
+        self.assertEqual(validate.call_count, 1)
+
+        anonymous = get_with_jwt_cookie("/api/user/")
+        with self.assertNumQueries(0):
+            self.assertIsNone(api.identify_user_from_jwt_token_from_request_cookie(anonymous))
+            self.assertIsNone(api.identify_user_from_jwt_token_from_request_cookie(anonymous))
+
+    def test_validated_token_cache_respects_expiry(self):
+        token = RefreshToken.for_user(self.ace).access_token
+        cache = ValidatedTokenCache(maxsize=2, ttl=60)
+
+        cache.set("live", token)
+        self.assertIs(cache.get("live"), token)
+
+        token.set_exp(lifetime=-datetime.timedelta(seconds=1))
+        cache.set("expired", token)
+        self.assertIsNone(cache.get("expired"))
+
+    def test_validated_token_cache_evicts_least_recently_used(self):
+        token = RefreshToken.for_user(self.ace).access_token
+        cache = ValidatedTokenCache(maxsize=2, ttl=60)
+        cache.set("a", token)
+        cache.set("b", token)
+        cache.get("a")
+        cache.set("c", token)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIs(cache.get("a"), token)
+        self.assertEqual(len(cache), 2)
+
+    def test_tampered_token_is_not_cached(self):
+        raw_token = str(RefreshToken.for_user(self.ace).access_token)
+        self.assertEqual(api.identify_user_from_jwt_access_token(raw_token), self.ace)
+        self.assertIsNone(api.identify_user_from_jwt_access_token(raw_token[:-2] + "xx"))
+        self.assertEqual(len(validated_token_cache), 1)
+
+class JWTClaimsUserTests(TestCase):
+    def setUp(self):
+        validated_token_cache.clear()
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+
+    def test_claims_user_needs_no_query(self):
+        """
+        id and username come from the token; other fields are loaded on first access.
+        """
+        token = add_user_claims(RefreshToken.for_user(self.ace), self.ace).access_token
+        with self.assertNumQueries(0):
+            user = JWTClaimsUserAuthentication().get_user(token)
+            self.assertEqual(user, self.ace)
+            self.assertEqual(str(user), "ace")
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(Dataset(user=user).user_id, self.ace.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "ace@email.com")
+
+    def test_owner_check_does_not_load_the_owner(self):
+        dataset = create_dataset(self.ace, "ace private", is_public=False)
+        dataset = Dataset.objects.get(id=dataset.id)
+        bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        with self.assertNumQueries(0):
+            self.assertIsNone(api.check_obj_exist_and_user_has_access_permission(dataset, self.ace))
+            self.assertIsNotNone(api.check_obj_exist_and_user_has_access_permission(dataset, bob))
+            self.assertIsNotNone(api.check_obj_exist_and_user_has_access_permission(dataset, None))
+
+    def test_detail_views_do_not_load_the_owner(self):
+        dataset = create_dataset(self.ace, "ace private", is_public=False)
+        model = Model.objects.create(name="ace model", user=self.ace, model_directory="ace_model")
+        bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        for view, obj in ((api.DatasetDetail, dataset), (api.ModelDetail, model)):
+            with CaptureQueriesContext(connection) as queries:
+                response = view.as_view()(get_with_jwt_cookie("/", user=bob), id=obj.id)
+            self.assertEqual(response.status_code, api.NO_ACCESS_PERMISSION_RESPONSE.status_code)
+            self.assertFalse([query for query in queries if "auth_user" in query["sql"]])
+
+def write_files(root, files):
+    """
+    Create `files` ({relative path: bytes}) under `root`.
+    """
+    for relpath, content in files.items():
+        path = os.path.join(root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(content)
+
+def close_response(response):
+    """
+    response.close() the way django.test.Client does it: without the request_finished
+    close_old_connections(), which would close the connection of the test's transaction.
+    """
+    request_finished.disconnect(close_old_connections)
+    try:
+        response.close()
+    finally:
+        request_finished.connect(close_old_connections)
+
+def use_temporary_archive_cache(test_case, **overrides):
+    """
+    Point the archive cache at a fresh temporary directory for the duration of the test.
+    """
+    cache_dir = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, cache_dir)
+    settings_override = override_settings(ARCHIVE_CACHE_DIR=cache_dir, **overrides)
+    settings_override.enable()
+    test_case.addCleanup(settings_override.disable)
+    return cache_dir
+
+class StreamingZipTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        use_temporary_archive_cache(self)
+        self.files = {
+            "README.md": b"# dataset",
+            "images/a.bin": os.urandom(3 * 1024 * 1024 + 7),
+            "images/nested/b.txt": b"b" * 1000,
+        }
+        write_files(self.directory, self.files)
+
+    def read_zip(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+    def test_iter_zip_streams_bounded_chunks(self):
+        chunk_size = 256 * 1024
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            chunks = list(zipstream.iter_zip(
+                zipstream.iter_directory_entries(self.directory), compression=compression, chunk_size=chunk_size,
+            ))
+            self.assertGreater(len(chunks), 3)
+            self.assertLessEqual(max(len(chunk) for chunk in chunks), 2 * chunk_size)
+            self.assertEqual(self.read_zip(b"".join(chunks)), self.files)
+
+    def test_download_dataset_zip_is_streamed(self):
+        dataset = Dataset.objects.create(name="ace", user=self.ace, is_public=False, dataset_directory=self.directory)
+
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/", user=self.ace, data={"compression": "deflate"})
+        response = api.download_dataset_zip(request, id=dataset.id)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="ace.zip"')
+        self.assertEqual(self.read_zip(b"".join(response.streaming_content)), self.files)
+
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+        self.assertIs(api.download_dataset_zip(request, id=dataset.id), api.NO_ACCESS_PERMISSION_RESPONSE)
+
+    def test_empty_directory_is_rejected(self):
+        empty = tempfile.mkdtemp(dir=self.directory)
+        dataset = Dataset.objects.create(name="empty", user=self.ace, is_public=True, dataset_directory=empty)
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+        self.assertEqual(api.download_dataset_zip(request, id=dataset.id).status_code, 400)
+
+    def test_asgi_iteration_runs_in_threads(self):
+        async def collect():
+            return [chunk async for chunk in zipstream.iterate_in_thread(
+                zipstream.iter_zip(zipstream.iter_directory_entries(self.directory))
+            )]
+        self.assertEqual(self.read_zip(b"".join(asyncio.run(collect()))), self.files)
+
+class ArchiveCacheTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache_dir = use_temporary_archive_cache(self)
+
+    def create_dataset_with_files(self, name, size=1000):
+        directory = os.path.join(self.root, name)
+        write_files(directory, {"data.bin": os.urandom(size), "README.md": b"# " + name.encode()})
+        return Dataset.objects.create(name=name, user=self.ace, is_public=True, dataset_directory=directory)
+
+    def download(self, dataset):
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+        response = api.download_dataset_zip(request, id=dataset.id)
+        content = b"".join(response.streaming_content)
+        if hasattr(response, "file_to_stream"):
+            close_response(response)
+        return response, content
+
+    def cached_archives(self):
+        return sorted(os.listdir(archive_cache.get_archives_dir()))
+
+    def test_repeat_download_is_served_from_cache(self):
+        dataset = self.create_dataset_with_files("popular")
+        first, first_content = self.download(dataset)
+        second, second_content = self.download(dataset)
+
+        self.assertNotIsInstance(first, FileResponse)
+        self.assertIsInstance(second, FileResponse)
+        self.assertEqual(second["Content-Disposition"], 'attachment; filename="popular.zip"')
+        self.assertEqual(first_content, second_content)
+        self.assertEqual(len(self.cached_archives()), 1)
+
+    def test_changed_files_change_the_key(self):
+        dataset = self.create_dataset_with_files("changing")
+        key = archive_cache.get_archive_key(dataset.dataset_directory, zipfile.ZIP_STORED)
+        self.download(dataset)
+
+        with mock.patch.object(archive_cache, "get_directory_manifest_fingerprint") as fingerprint:
+            self.assertEqual(archive_cache.get_archive_key(dataset.dataset_directory, zipfile.ZIP_STORED), key)
+        fingerprint.assert_not_called()
+
+        views.handle_uploaded_file(SimpleUploadedFile("new.txt", b"new"), filename="new.txt", dir=dataset.dataset_directory)
+        self.assertNotEqual(archive_cache.get_archive_key(dataset.dataset_directory, zipfile.ZIP_STORED), key)
+        response, content = self.download(dataset)
+        self.assertNotIsInstance(response, FileResponse)
+        self.assertIn("new.txt", zipfile.ZipFile(io.BytesIO(content)).namelist())
+
+    def test_archive_over_the_budget_is_not_written(self):
+        dataset = self.create_dataset_with_files("huge", size=40_000)
+        with override_settings(ARCHIVE_CACHE_MAX_BYTES=10_000):
+            request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+            chunks = iter(api.download_dataset_zip(request, id=dataset.id).streaming_content)
+            content = next(chunks)
+            self.assertFalse(os.path.exists(archive_cache.get_archives_dir()) and os.listdir(archive_cache.get_archives_dir()))
+            content += b"".join(chunks)
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(content)).read("data.bin")), 40_000)
+        self.assertFalse(os.path.exists(archive_cache.get_archives_dir()) and self.cached_archives())
+
+    def test_least_recently_used_archive_is_evicted(self):
+        datasets = [self.create_dataset_with_files(f"dataset {i}", size=40_000) for i in range(3)]
+        with override_settings(ARCHIVE_CACHE_MAX_BYTES=100_000):
+            self.download(datasets[0])
+            self.download(datasets[1])
+            os.utime(archive_cache.get_archive_path(
+                archive_cache.get_archive_key(datasets[1].dataset_directory, zipfile.ZIP_STORED)
+            ), (1, 1))
+            self.download(datasets[2])
+
+        kept = [
+            archive_cache.get_cached_archive(archive_cache.get_archive_key(dataset.dataset_directory, zipfile.ZIP_STORED)) != None
+            for dataset in datasets
+        ]
+        self.assertEqual(kept, [True, False, True])
+
+    def test_delete_invalidates_and_cancelled_download_is_not_cached(self):
+        dataset = self.create_dataset_with_files("deleted")
+        self.download(dataset)
+        self.assertEqual(len(self.cached_archives()), 1)
+        dataset.delete()
+        self.assertEqual(self.cached_archives(), [])
+
+        dataset = self.create_dataset_with_files("cancelled", size=3 * 1024 * 1024)
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+        response = api.download_dataset_zip(request, id=dataset.id)
+        next(iter(response.streaming_content))
+        close_response(response)
+        self.assertEqual(self.cached_archives(), [])
+
+class HttpRangeTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.content = bytes(range(256)) * 40
+        self.file_path = os.path.join(self.root, "blob.bin")
+        write_files(self.root, {"blob.bin": self.content})
+
+    def get(self, **headers):
+        request = APIRequestFactory().get("/blob.bin", **headers)
+        response = http_range.ranged_file_response(request, self.file_path, "application/octet-stream")
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        close_response(response)
+        return response, content
+
+    def test_parse_range_header(self):
+        parse = http_range.parse_range_header
+        self.assertEqual(parse("bytes=0-99", 1000), [(0, 99)])
+        self.assertEqual(parse("bytes=900-", 1000), [(900, 999)])
+        self.assertEqual(parse("bytes=-100", 1000), [(900, 999)])
+        self.assertEqual(parse("bytes=0-5000", 1000), [(0, 999)])
+        self.assertEqual(parse("bytes=50-99, 0-49, 200-299", 1000), [(0, 99), (200, 299)])
+        self.assertEqual(parse("bytes=9-0", 1000), None)
+        self.assertEqual(parse("items=0-9", 1000), None)
+        self.assertEqual(parse(None, 1000), None)
+        with self.assertRaises(http_range.RangeNotSatisfiable):
+            parse("bytes=1000-", 1000)
+
+    def test_full_response_advertises_ranges_and_validators(self):
+        response, content = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.content)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+    def test_single_and_multiple_ranges(self):
+        response, content = self.get(HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.content[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "100")
+
+        response, content = self.get(HTTP_RANGE="bytes=0-9,-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges"))
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        self.assertIn(self.content[:10], content)
+        self.assertIn(self.content[-10:], content)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_conditional_requests(self):
+        response, _ = self.get()
+        etag = response["ETag"]
+
+        not_modified, content = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(content, b"")
+        self.assertEqual(not_modified["ETag"], etag)
+
+        stale, content = self.get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(content, self.content)
+
+    def test_resumed_archive_download(self):
+        use_temporary_archive_cache(self)
+        directory = os.path.join(self.root, "dataset")
+        write_files(directory, {"data.bin": os.urandom(5000)})
+        dataset = Dataset.objects.create(name="resumed", user=self.ace, is_public=True, dataset_directory=directory)
+
+        request = get_with_jwt_cookie(f"/api/dataset/download/{dataset.id}/")
+        full = api.download_dataset_zip(request, id=dataset.id)
+        full_content = b"".join(full.streaming_content)
+        archive_cache.invalidate_archive_cache(directory)
+
+        request = APIRequestFactory().get(f"/api/dataset/download/{dataset.id}/", HTTP_RANGE="bytes=1000-")
+        response = api.download_dataset_zip(request, id=dataset.id)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), full_content[1000:])
+        self.assertEqual(response["ETag"], full["ETag"])
+        close_response(response)
+
+        request = APIRequestFactory().get(f"/api/dataset/download/{dataset.id}/", HTTP_IF_NONE_MATCH=full["ETag"])
+        self.assertEqual(api.download_dataset_zip(request, id=dataset.id).status_code, 304)
+
+    def test_range_on_an_uncacheable_archive_streams_it_whole(self):
+        use_temporary_archive_cache(self, ARCHIVE_CACHE_MAX_BYTES=1000)
+        directory = os.path.join(self.root, "dataset")
+        write_files(directory, {"data.bin": os.urandom(5000)})
+        dataset = Dataset.objects.create(name="large", user=self.ace, is_public=True, dataset_directory=directory)
+
+        with mock.patch.object(api, "build_cached_archive") as build_cached_archive:
+            request = APIRequestFactory().get(f"/api/dataset/download/{dataset.id}/", HTTP_RANGE="bytes=1000-")
+            response = api.download_dataset_zip(request, id=dataset.id)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))).read("data.bin")), 5000)
+        build_cached_archive.assert_not_called()
+
+    def test_minio_object_range_fetches_only_the_range(self):
+        client = mock.Mock()
+        client.stat_object.return_value = mock.Mock(
+            size=len(self.content), etag="abc123", last_modified=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        client.get_object.side_effect = lambda bucket, name, offset=0, length=0: mock.Mock(
+            stream=lambda chunk_size: iter([self.content[offset:offset + length]]),
+        )
+
+        with mock.patch.object(api.minio_service, "minio_client", client):
+            request = APIRequestFactory().get("/", HTTP_RANGE="bytes=10-19")
+            response = api.minio_object_response(request, "dataset/blob.bin", "application/octet-stream")
+            content = b"".join(response.streaming_content)
+
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(content, self.content[10:20])
+            self.assertEqual(response["ETag"], '"abc123"')
+            self.assertEqual(client.get_object.call_args.kwargs, {"offset": 10, "length": 10})
+
+            request = APIRequestFactory().get("/", HTTP_IF_NONE_MATCH='"abc123"')
+            self.assertEqual(api.minio_object_response(request, "dataset/blob.bin", "application/octet-stream").status_code, 304)
+
+class SendfileTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        write_files(self.root, {"videos/clip one.mp4": b"\0" * 1000})
+        self.file_path = os.path.join(self.root, "videos", "clip one.mp4")
+        self.request = APIRequestFactory().get("/api/dataset/blob/1/videos/videos/clip one.mp4/")
+
+    def test_default_mode_streams_a_file_response(self):
+        response = sendfile.serve_file(self.request, self.file_path, "video/mp4")
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response["Content-Length"], "1000")
+        close_response(response)
+
+    def test_x_accel_redirect_hands_the_file_to_nginx(self):
+        with override_settings(BLOB_SERVE_MODE="x-accel-redirect", BLOB_SERVE_ROOT=self.root, BLOB_ACCEL_REDIRECT_PREFIX="/protected/"):
+            response = sendfile.serve_file(self.request, self.file_path, "video/mp4", filename="clip.mp4", as_attachment=True)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected/videos/clip%20one.mp4")
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="clip.mp4"')
+        self.assertEqual(response.content, b"")
+
+    def test_x_sendfile_and_files_outside_the_root(self):
+        with override_settings(BLOB_SERVE_MODE="x-sendfile", BLOB_SERVE_ROOT=self.root):
+            response = sendfile.serve_file(self.request, self.file_path, "video/mp4")
+        self.assertEqual(response["X-Sendfile"], os.path.realpath(self.file_path))
+
+        with override_settings(BLOB_SERVE_MODE="x-sendfile", BLOB_SERVE_ROOT=os.path.join(self.root, "other")):
+            response = sendfile.serve_file(self.request, self.file_path, "video/mp4")
+        self.assertIsInstance(response, FileResponse)
+        close_response(response)
+
+class ReadmeCacheTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        get_catalog_cache().clear()
+
+    def create_dataset_with_readme(self, name, readme=b"# Title\n\n```\ncode\n```\n"):
+        directory = os.path.join(self.root, name)
+        write_files(directory, {"README.md": readme, "images/1.png": b"\x89PNG"})
+        return Dataset.objects.create(name=name, user=self.ace, is_public=True, dataset_directory=directory)
+
+    def get_detail(self, dataset):
+        request = get_with_jwt_cookie(f"/api/dataset/{dataset.id}/")
+        return api.DatasetDetail.as_view()(request, id=dataset.id).data
+
+    def test_saved_dataset_is_rendered_once_and_served_from_cache(self):
+        dataset = self.create_dataset_with_readme("documented")
+        with mock.patch.object(readme_cache, "find_readme_text_file") as find:
+            data = self.get_detail(dataset)
+        find.assert_not_called()
+        self.assertIn("<h1>Title</h1>", data["markdown"])
+        self.assertIn("<code>code", data["markdown"])
+
+    def test_save_rerenders_changed_readme_and_delete_invalidates(self):
+        dataset = self.create_dataset_with_readme("changing")
+        readme_path = os.path.join(dataset.dataset_directory, "README.md")
+        with open(readme_path, "w") as readme:
+            readme.write("# Changed\n")
+        os.utime(readme_path, ns=(0, 1))
+        self.assertIn("<h1>Title</h1>", self.get_detail(dataset)["markdown"])
+
+        dataset.save()
+        self.assertIn("<h1>Changed</h1>", self.get_detail(dataset)["markdown"])
+
+        directory = dataset.dataset_directory
+        dataset.delete()
+        self.assertEqual(get_catalog_cache().get(readme_cache.get_readme_cache_key(directory)), None)
+
+    def test_writes_and_actions_invalidate_the_readme(self):
+        dataset = self.create_dataset_with_readme("written")
+        views.handle_uploaded_file(SimpleUploadedFile("README.md", b"# Uploaded\n"), filename="README.md", dir=dataset.dataset_directory)
+        self.assertIn("<h1>Uploaded</h1>", self.get_detail(dataset)["markdown"])
+
+        with open(os.path.join(dataset.dataset_directory, "README.md"), "w") as readme:
+            readme.write("# Action output\n")
+        self.get_detail(dataset)
+        action_set = DatasetActionSet.objects.create(action_type=DatasetActionSet.ACTION_SET.CLEANING)
+        DatasetAction.objects.create(parameters={}, action=action_set, dataset=dataset)
+        self.assertIn("<h1>Action output</h1>", self.get_detail(dataset)["markdown"])
+
+    def test_missing_readme_and_cache_miss(self):
+        directory = os.path.join(self.root, "bare")
+        write_files(directory, {"data.csv": b"a,b\n"})
+        self.assertEqual(readme_cache.get_readme_markdown(directory), readme_cache.NO_README_MARKDOWN)
+        self.assertEqual(readme_cache.get_readme_markdown(os.path.join(self.root, "missing")), readme_cache.NO_README_MARKDOWN)
+
+class ThreadLocalMarkdownTests(TestCase):
+    def test_concurrent_renders_match_single_threaded_renders(self):
+        documents = [
+            f"# README {i}\n\n" + "".join(f"## Part {j}\n\n```\ncode {i} {j}\n```\n\n" for j in range(30))
+            for i in range(40)
+        ]
+        renderer = MARKDOWN_FENCED_CODE
+        expected = [renderer.convert(text) for text in documents]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            rendered = list(pool.map(renderer.convert, documents))
+        self.assertEqual(rendered, expected)
+        self.assertIn("<code>code 0 0", expected[0])
+
+class FileIndexTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.directory = os.path.join(self.root, str(self.ace.id), "images")
+        write_files(self.directory, {
+            "README.md": b"# images",
+            "train/1.png": b"1" * 10,
+            "train/2.png": b"2" * 20,
+            "test/1.png": b"3" * 30,
+        })
+        self.dataset = Dataset.objects.create(name="images", user=self.ace, is_public=True, dataset_directory=self.directory)
+
+    def get_tree(self, path="", **params):
+        request = get_with_jwt_cookie(f"/api/dataset/tree/{self.ace.id}/images/{path}", data=params)
+        response = api.get_dataset_file_tree(request, self.ace.id, "images", path, root_dir=self.root)
+        return response.status_code, json.loads(response.content)
+
+    def test_listing_is_read_from_the_index_built_on_create(self):
+        self.assertTrue(file_index.is_indexed(self.directory))
+        with mock.patch("polls.file_index.os.scandir") as scandir, mock.patch("polls.file_index.os.stat") as stat:
+            status_code, data = self.get_tree()
+            _, train = self.get_tree("train")
+        scandir.assert_not_called()
+        stat.assert_not_called()
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual([
+            {key: entry[key] for key in ("name", "is_dir", "size", "child_count")} for entry in data["tree"]
+        ], [
+            {"name": "README.md", "is_dir": False, "size": 8, "child_count": None},
+            {"name": "test", "is_dir": True, "size": None, "child_count": 1},
+            {"name": "train", "is_dir": True, "size": None, "child_count": 2},
+        ])
+        self.assertEqual([entry["size"] for entry in train["tree"]], [10, 20])
+
+    def test_incremental_update_and_invalid_paths(self):
+        write_files(self.directory, {"train/3.png": b"4" * 40})
+        file_index.update_file_index(self.directory, "train/3.png")
+        _, data = self.get_tree()
+        self.assertEqual(data["tree"][2]["child_count"], 3)
+        _, train = self.get_tree("train")
+        self.assertEqual([entry["name"] for entry in train["tree"]], ["1.png", "2.png", "3.png"])
+
+        shutil.rmtree(os.path.join(self.directory, "train"))
+        file_index.update_file_index(self.directory, "train")
+        _, data = self.get_tree()
+        self.assertEqual([entry["name"] for entry in data["tree"]], ["README.md", "test"])
+        self.assertEqual(self.get_tree("train")[0], 400)
+        self.assertEqual(self.get_tree("../..")[0], 400)
+        self.assertEqual(self.get_tree("README.md")[0], 400)
+
+    def test_paging_sorting_and_filtering(self):
+        write_files(self.directory, {f"many/{i:03}.{'png' if i % 2 else 'JPG'}": b"x" * i for i in range(25)})
+        file_index.update_file_index(self.directory, "many")
+
+        _, first = self.get_tree("many", limit=10)
+        _, last = self.get_tree("many", limit=10, offset=20)
+        self.assertEqual([entry["name"] for entry in first["tree"]][:2], ["000.JPG", "001.png"])
+        self.assertEqual((first["total"], first["next_offset"]), (25, 10))
+        self.assertEqual((len(last["tree"]), last["next_offset"]), (5, None))
+        _, whole = self.get_tree("many")
+        self.assertEqual((len(whole["tree"]), whole["limit"], whole["next_offset"]), (25, None, None))
+
+        _, by_size = self.get_tree("many", sort="-size", limit=3)
+        self.assertEqual([entry["size"] for entry in by_size["tree"]], [24, 23, 22])
+
+        _, pngs = self.get_tree("many", glob="*.png", limit=100)
+        self.assertEqual(pngs["total"], 12)
+        _, jpgs = self.get_tree("many", ext="jpg")
+        self.assertEqual(jpgs["total"], 13)
+        _, named = self.get_tree("many", glob="01?.*")
+        self.assertEqual([entry["name"] for entry in named["tree"]], [f"01{i}.{'png' if i % 2 else 'JPG'}" for i in range(10)])
+
+        self.assertEqual(self.get_tree("many", sort="owner")[0], 400)
+        self.assertEqual(self.get_tree("many", limit="ten")[0], 400)
+
+    def test_writes_into_the_directory_update_the_index(self):
+        views.handle_uploaded_file(SimpleUploadedFile("3.png", b"3"), filename="3.png", dir=os.path.join(self.directory, "train"))
+        views.handle_uploaded_file(SimpleUploadedFile("README.md", b"# new readme"), filename="README.md", dir=self.directory)
+        _, data = self.get_tree()
+        self.assertEqual((data["tree"][0]["size"], data["tree"][2]["child_count"]), (12, 3))
+        _, train = self.get_tree("train")
+        self.assertEqual([entry["name"] for entry in train["tree"]], ["1.png", "2.png", "3.png"])
+
+        write_files(self.directory, {"cleaned/1.csv": b"a,b\n"})
+        action_set = DatasetActionSet.objects.create(action_type=DatasetActionSet.ACTION_SET.CLEANING)
+        DatasetAction.objects.create(parameters={}, action=action_set, dataset=self.dataset)
+        _, data = self.get_tree()
+        self.assertEqual([entry["name"] for entry in data["tree"]], ["README.md", "cleaned", "test", "train"])
+
+    def test_delete_drops_the_index(self):
+        self.dataset.delete()
+        self.assertFalse(file_index.is_indexed(self.directory))
+
+class DirectoryStatsTests(TestCase):
+    def setUp(self):
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.directory = os.path.join(self.root, "images")
+        write_files(self.directory, {
+            "README.md": b"#" * 5,
+            "train/a/1.PNG": b"1" * 10,
+            "train/b/2.png": b"2" * 20,
+            "test/3.jpg": b"3" * 30,
+            "LICENSE": b"4" * 40,
+        })
+
+    def test_created_dataset_gets_recursive_totals(self):
+        dataset = Dataset.objects.create(name="images", user=self.ace, is_public=True, dataset_directory=self.directory)
+        dataset.refresh_from_db()
+        self.assertEqual((dataset.total_size, dataset.file_count), (105, 5))
+        self.assertEqual(dataset.extension_stats, {
+            "": {"count": 1, "size": 40},
+            ".jpg": {"count": 1, "size": 30},
+            ".md": {"count": 1, "size": 5},
+            ".png": {"count": 2, "size": 30},
+        })
+        self.assertNotEqual(dataset.stats_updated, None)
+
+        request = get_with_jwt_cookie("/api/datasets/page/")
+        listed = json.loads(api.datasets_page_range(request).content)["list"][0]
+        self.assertEqual((listed["total_size"], listed["file_count"]), (105, 5))
+
+    def test_parallel_walk_matches_a_single_worker(self):
+        write_files(self.directory, {f"many/{i % 7}/{i}.bin": b"x" * i for i in range(200)})
+        self.assertEqual(
+            stats.compute_directory_stats(self.directory, max_workers=8),
+            stats.compute_directory_stats(self.directory, max_workers=1),
+        )
+        self.assertEqual(stats.compute_directory_stats(os.path.join(self.root, "missing")), None)
+
+    def test_action_refreshes_stats(self):
+        dataset = Dataset.objects.create(name="images", user=self.ace, is_public=True, dataset_directory=self.directory)
+        write_files(self.directory, {"cleaned/1.csv": b"a,b\n"})
+        action_set = DatasetActionSet.objects.create(action_type=DatasetActionSet.ACTION_SET.CLEANING)
+        DatasetAction.objects.create(parameters={}, action=action_set, dataset=dataset)
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.file_count, 6)
+
+def make_zip(files, compression=zipfile.ZIP_DEFLATED):
+    """
+    Bytes of a zip holding `files` ({member name: bytes}).
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    return buffer.getvalue()
+
+class ZipExtractionTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.files = {f"images/{i}.bin": os.urandom(1000 + i) for i in range(50)}
+        self.files["README.md"] = b"# uploaded"
+
+    def test_spooled_and_in_memory_uploads_extract_in_parallel(self):
+        content = make_zip(self.files)
+        spooled = TemporaryUploadedFile("upload.zip", "application/zip", len(content), None)
+        spooled.write(content)
+        spooled.seek(0)
+        self.addCleanup(spooled.close)
+        events = []
+
+        for upload, progress in ((spooled, events.append), (SimpleUploadedFile("upload.zip", content), None)):
+            extract_to = os.path.join(self.root, upload.__class__.__name__)
+            views.handle_extract_zip_file(upload, extract_to, progress=progress)
+            for name, data in self.files.items():
+                with open(os.path.join(extract_to, name), "rb") as file:
+                    self.assertEqual(file.read(), data)
+
+        self.assertEqual(events[-1], {
+            "current": 51, "total": 51, "bytes": sum(map(len, self.files.values())),
+            "total_bytes": sum(map(len, self.files.values())), "finished": True, "success": True,
+        })
+
+    def test_unsafe_archives_are_rejected_and_cleaned_up(self):
+        symlink = io.BytesIO()
+        with zipfile.ZipFile(symlink, "w") as zip_file:
+            info = zipfile.ZipInfo("link")
+            info.external_attr = 0o120777 << 16
+            zip_file.writestr(info, "/etc/passwd")
+
+        for name, content in (
+            ("slip", make_zip({"ok.txt": b"ok", "../../evil.txt": b"evil"})),
+            ("bomb", make_zip({"zeros.bin": b"\0" * (4 * 1024 * 1024)})),
+            ("symlink", symlink.getvalue()),
+        ):
+            extract_to = os.path.join(self.root, name)
+            with self.assertRaises(extraction.UnsafeZipError):
+                views.handle_extract_zip_file(SimpleUploadedFile(f"{name}.zip", content), extract_to)
+            self.assertFalse(os.path.exists(extract_to))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "..", "evil.txt")))
+
+    def test_duplicate_members_keep_the_last_one(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            zip_file.writestr("a.txt", b"first" * 1000)
+            zip_file.writestr("./a.txt", b"second")
+            zip_file.writestr("b.txt", b"b")
+        with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as zip_file:
+            members = extraction.validate_zip_members(zip_file, self.root)
+        self.assertEqual([info.filename for info, _ in members], ["./a.txt", "b.txt"])
+
+        extract_to = os.path.join(self.root, "duplicates")
+        extraction.extract_zip(io.BytesIO(buffer.getvalue()), extract_to, max_workers=4)
+        with open(os.path.join(extract_to, "a.txt"), "rb") as file:
+            self.assertEqual(file.read(), b"second")
+
+    def test_progress_is_sent_to_the_upload_channel_group(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(extraction.get_upload_progress_group("task-7"), channel)
+
+        extraction.get_upload_progress("task-7")({"current": 1, "total": 2})
+        message = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(message, {"type": "upload.progress", "progress": {"current": 1, "total": 2}})
+        self.assertEqual(extraction.get_upload_progress(None), None)
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        settings_override = override_settings(
+            TASK_QUEUE_ENABLED=True,
+            TASK_UPLOAD_DIR=os.path.join(self.root, "uploads"),
+            TASK_TRASH_DIR=os.path.join(self.root, "trash"),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The worker's close_old_connections() would close the connection of the test's transaction.
+        keep_connections = mock.patch.object(tasks, "close_old_connections")
+        keep_connections.start()
+        self.addCleanup(keep_connections.stop)
+
+    def post_dataset_zip(self, content):
+        request = APIRequestFactory().post("/api/dataset/upload/", {
+            "name": "queued", "is_public": "true", "description": "",
+            "dataset_zipfile": SimpleUploadedFile("queued.zip", content),
+        }, format="multipart")
+        request.COOKIES["access_token"] = str(add_user_claims(RefreshToken.for_user(self.ace), self.ace).access_token)
+        response = api.dataset_form_post(request)
+        self.assertEqual(response.status_code, 202)
+        task = Task.objects.get(id=response.data["task_id"])
+        self.assertEqual((task.kind, task.status, task.user), (tasks.EXTRACT_DATASET, Task.STATUS.QUEUED, self.ace))
+        task.payload["directory"] = os.path.join(self.root, "extracted")
+        task.save()
+        return task
+
+    def test_queued_upload_is_extracted_by_the_worker(self):
+        task = self.post_dataset_zip(make_zip({"README.md": b"# queued", "a/b.txt": b"b"}))
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(tasks.get_task_progress_group(task.id), channel)
+
+        self.assertEqual(tasks.run_task_worker(max_tasks=10), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS.SUCCEEDED)
+        self.assertEqual(task.attempts, 1)
+        dataset = Dataset.objects.get(id=task.result["id"])
+        self.assertEqual(dataset.dataset_directory, os.path.join(self.root, "extracted"))
+        with open(os.path.join(dataset.dataset_directory, "a", "b.txt"), "rb") as file:
+            self.assertEqual(file.read(), b"b")
+        self.assertEqual(os.listdir(os.path.join(self.root, "uploads")), [])
+
+        events = []
+        while True:
+            message = async_to_sync(channel_layer.receive)(channel)
+            events.append(message["progress"])
+            if message["progress"]["finished"] and message["progress"]["status"] != Task.STATUS.RUNNING:
+                break
+        self.assertEqual(events[-1]["success"], True)
+        self.assertEqual(events[-1]["result"], {"id": dataset.id})
+
+    def test_failed_task_records_the_error(self):
+        task = self.post_dataset_zip(make_zip({"ok.txt": b"ok", "../../evil.txt": b"evil"}))
+        tasks.run_task(tasks.claim_next_task())
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS.FAILED)
+        self.assertTrue(task.error.startswith("UnsafeZipError: "))
+        self.assertNotIn("Traceback", task.error)
+        self.assertNotIn(self.root, tasks.get_task_error(FileNotFoundError(errno.ENOENT, "No such file", os.path.join(self.root, "x"))))
+        self.assertFalse(os.path.exists(task.payload["directory"]))
+        self.assertFalse(Dataset.objects.filter(name="queued").exists())
+
+    def test_fork_of_a_missing_or_private_dataset_is_not_queued(self):
+        bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        private = Dataset.objects.create(name="private", user=bob, dataset_directory=os.path.join(self.root, "private"), is_public=False)
+        for dataset_id in (private.id + 1, "garbage", private.id):
+            request = APIRequestFactory().post("/api/dataset/fork/", {"dataset_id": dataset_id, "name": "fork"}, format="multipart")
+            request.COOKIES["access_token"] = str(add_user_claims(RefreshToken.for_user(self.ace), self.ace).access_token)
+            response = api.fork_dataset_api(request)
+            self.assertEqual(json.loads(response.content), {"success": False, "message": "Failed to fork."})
+        self.assertFalse(Task.objects.exists())
+
+    def test_a_task_is_claimed_once(self):
+        first = tasks.enqueue_task(tasks.DELETE_DIRECTORY, {"directory": os.path.join(self.root, "gone")})
+        second = tasks.enqueue_task(tasks.DELETE_DIRECTORY, {"directory": os.path.join(self.root, "gone")})
+        self.assertEqual([tasks.claim_next_task(), tasks.claim_next_task(), tasks.claim_next_task()], [first, second, None])
+
+    def test_delete_removes_the_row_now_and_the_directory_in_a_task(self):
+        directory = os.path.join(self.root, "to_delete")
+        os.makedirs(directory)
+        dataset = Dataset.objects.create(name="to delete", user=self.ace, dataset_directory=directory, is_public=True)
+        request = APIRequestFactory().delete(f"/api/dataset/{dataset.id}/")
+        request.COOKIES["access_token"] = str(add_user_claims(RefreshToken.for_user(self.ace), self.ace).access_token)
+
+        response = api.DatasetDetail.as_view()(request, id=dataset.id)
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Dataset.objects.filter(id=dataset.id).exists())
+        self.assertFalse(os.path.exists(directory))
+        trash_path = Task.objects.get(id=response.data["task_id"]).payload["directory"]
+        self.assertTrue(os.path.isdir(trash_path))
+
+        tasks.run_task_worker(max_tasks=1)
+        self.assertFalse(os.path.exists(trash_path))
+
+class ForkTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.src = os.path.join(self.root, "src")
+        os.makedirs(os.path.join(self.src, "images", "train"))
+        self.files = {"README.md": b"# original", "images/train/0.png": b"png", "images/1.png": b"png 1"}
+        for name, data in self.files.items():
+            with open(os.path.join(self.src, name), "wb") as file:
+                file.write(data)
+        os.symlink("README.md", os.path.join(self.src, "link.md"))
+
+    def assert_forked(self, dst):
+        for name, data in self.files.items():
+            with open(os.path.join(dst, name), "rb") as file:
+                self.assertEqual(file.read(), data)
+        self.assertEqual(os.readlink(os.path.join(dst, "link.md")), "README.md")
+
+    def test_each_strategy_recreates_the_tree(self):
+        for strategy in fork.FORK_STRATEGIES:
+            dst = os.path.join(self.root, strategy)
+            used = fork.fork_tree(self.src, dst, strategy=strategy)
+            self.assertEqual(sum(used.values()), 3)
+            self.assert_forked(dst)
+
+    def test_unsupported_strategies_fall_back(self):
+        with mock.patch.dict(fork.FILE_FORKERS, {fork.REFLINK: mock.Mock(side_effect=OSError(errno.EOPNOTSUPP, "no"))}):
+            used = fork.fork_tree(self.src, os.path.join(self.root, "dst"), strategy=fork.REFLINK)
+            self.assertEqual(fork.FILE_FORKERS[fork.REFLINK].call_count, 1)
+        self.assertEqual(used, {fork.COPY: 3})
+        self.assertFalse(fork.is_shared(os.path.join(self.root, "dst", "README.md")))
+        with self.assertRaises(OSError):
+            with mock.patch.dict(fork.FILE_FORKERS, {fork.REFLINK: mock.Mock(side_effect=OSError(errno.EOPNOTSUPP, "no"))}):
+                fork.fork_tree(self.src, os.path.join(self.root, "strict"), strategy=fork.REFLINK, fallback=False)
+
+    def test_writes_to_a_hardlinked_fork_leave_the_original_alone(self):
+        dst = os.path.join(self.root, "dst")
+        fork.fork_tree(self.src, dst, strategy=fork.HARDLINK)
+        self.assertTrue(fork.is_shared(os.path.join(dst, "README.md")))
+
+        fork.break_hardlink(os.path.join(dst, "README.md"))
+        with open(os.path.join(dst, "README.md"), "ab") as file:
+            file.write(b" fork")
+        views.handle_uploaded_file(SimpleUploadedFile("0.png", b"new"), filename="0.png", dir=os.path.join(dst, "images", "train"))
+
+        self.assert_forked(self.src)
+        self.assertFalse(fork.is_shared(os.path.join(self.src, "README.md")))
+        with open(os.path.join(dst, "images", "train", "0.png"), "rb") as file:
+            self.assertEqual(file.read(), b"new")
+
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(BLOB_STORE_DIR=os.path.join(self.root, "blobs"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+
+    def make_directory(self, name, files):
+        directory = os.path.join(self.root, name)
+        for relpath, data in files.items():
+            os.makedirs(os.path.dirname(os.path.join(directory, relpath)), exist_ok=True)
+            with open(os.path.join(directory, relpath), "wb") as file:
+                file.write(data)
+        return directory
+
+    def test_identical_files_are_stored_once(self):
+        image = os.urandom(4096)
+        first = self.make_directory("first", {"a.png": image, "b/c.png": image, "README.md": b"# first"})
+        second = self.make_directory("second", {"images/a.png": image})
+
+        self.assertEqual(blob_store.ingest_directory(first)["saved_bytes"], 4096)
+        self.assertEqual(blob_store.ingest_directory(second)["saved_bytes"], 4096)
+        self.assertEqual(blob_store.ingest_directory(second)["files"], 0)
+
+        digest = hashlib.sha256(image).hexdigest()
+        self.assertEqual(blob_store.get_manifest(second), {"images/a.png": digest})
+        self.assertTrue(os.path.samefile(os.path.join(second, "images", "a.png"), blob_store.get_blob_path(digest)))
+        self.assertEqual(os.stat(blob_store.get_blob_path(digest)).st_mode & 0o777, blob_store.BLOB_FILE_MODE)
+        fork.break_hardlink(os.path.join(second, "images", "a.png"))
+        self.assertTrue(os.stat(os.path.join(second, "images", "a.png")).st_mode & 0o200)
+        self.assertEqual(os.stat(blob_store.get_blob_path(digest)).st_mode & 0o777, blob_store.BLOB_FILE_MODE)
+        with open(os.path.join(first, "b", "c.png"), "rb") as file:
+            self.assertEqual(file.read(), image)
+        report = blob_store.get_dedup_report()
+        self.assertEqual((report["blobs"], report["references"]), (2, 4))
+        self.assertEqual(report["saved_bytes"], 2 * 4096)
+        self.assertEqual(report["dedup_ratio"], (3 * 4096 + 7) / (4096 + 7))
+
+    def test_blobs_are_removed_with_their_last_reference(self):
+        image = os.urandom(2048)
+        dataset = Dataset.objects.create(name="ace", user=self.ace, is_public=True,
+            dataset_directory=self.make_directory("ace", {"a.png": image, "only.txt": b"ace"}))
+        blob_store.ingest_directory(dataset.dataset_directory)
+        fork_directory = os.path.join(self.root, "bob")
+        views.copy_directory(dataset.dataset_directory, fork_directory)
+        fork = Dataset.objects.create(name="bob", user=self.bob, is_public=True, dataset_directory=fork_directory)
+        self.assertEqual(blob_store.get_manifest(fork_directory), blob_store.get_manifest(dataset.dataset_directory))
+        only_blob = blob_store.get_blob_path(hashlib.sha256(b"ace").hexdigest())
+
+        request = APIRequestFactory().delete(f"/api/dataset/{dataset.id}/")
+        request.COOKIES["access_token"] = str(add_user_claims(RefreshToken.for_user(self.ace), self.ace).access_token)
+        self.assertEqual(api.DatasetDetail.as_view()(request, id=dataset.id).data["success"], True)
+        self.assertTrue(os.path.exists(only_blob))
+        self.assertEqual(set(Blob.objects.values_list("ref_count", flat=True)), {1})
+
+        shutil.rmtree(fork_directory)
+        fork.delete()
+        self.assertFalse(os.path.exists(only_blob))
+        self.assertFalse(Blob.objects.exists())
+
+    @override_settings(BLOB_STORE_ENABLED=True, FORK_STRATEGY=fork.COPY)
+    def test_fork_is_not_hashed_again(self):
+        dataset = Dataset.objects.create(name="ace", user=self.ace, is_public=True,
+            dataset_directory=self.make_directory("ace", {"a.png": b"a", "b/c.png": b"c", "README.md": b"# ace"}))
+        fork_directory = os.path.join(self.root, "bob")
+        with mock.patch.object(blob_store, "hash_file", wraps=blob_store.hash_file) as hash_file:
+            views.copy_directory(dataset.dataset_directory, fork_directory)
+            Dataset.objects.create(name="bob", user=self.bob, is_public=True, dataset_directory=fork_directory)
+        hash_file.assert_not_called()
+        self.assertEqual(blob_store.get_manifest(fork_directory), blob_store.get_manifest(dataset.dataset_directory))
+        self.assertTrue(os.path.samefile(os.path.join(fork_directory, "b", "c.png"), os.path.join(dataset.dataset_directory, "b", "c.png")))
+
+    def test_replaced_files_are_hashed_again(self):
+        directory = self.make_directory("dataset", {"a.txt": b"old"})
+        blob_store.ingest_directory(directory)
+        views.handle_uploaded_file(SimpleUploadedFile("a.txt", b"new"), filename="a.txt", dir=directory)
+
+        self.assertEqual(blob_store.ingest_directory(directory)["files"], 1)
+        self.assertEqual(blob_store.get_manifest(directory), {"a.txt": hashlib.sha256(b"new").hexdigest()})
+        self.assertEqual(list(Blob.objects.values_list("digest", flat=True)), [hashlib.sha256(b"new").hexdigest()])
+
+    def test_blob_edited_in_place_is_discarded(self):
+        first = self.make_directory("first", {"a.txt": b"shared"})
+        second = self.make_directory("second", {"a.txt": b"shared"})
+        blob_store.ingest_directory(first)
+        blob_store.ingest_directory(second)
+        digest = hashlib.sha256(b"shared").hexdigest()
+
+        time.sleep(0.02)
+        # A writer that forces the read-only blob open.
+        os.chmod(os.path.join(first, "a.txt"), 0o644)
+        with open(os.path.join(first, "a.txt"), "r+b") as file:
+            file.write(b"SHARED")
+        self.assertEqual(blob_store.ingest_directory(first)["files"], 1)
+        self.assertEqual(blob_store.get_manifest(first), {"a.txt": hashlib.sha256(b"SHARED").hexdigest()})
+        self.assertFalse(os.path.exists(blob_store.get_blob_path(digest)))
+
+        self.make_directory("third", {"a.txt": b"shared"})
+        blob_store.ingest_directory(os.path.join(self.root, "third"))
+        with open(blob_store.get_blob_path(digest), "rb") as file:
+            self.assertEqual(file.read(), b"shared")
+        self.assertEqual(blob_store.ingest_directory(os.path.join(self.root, "third"))["files"], 0)
+
+class OverlayForkTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        use_temporary_archive_cache(self, FORK_STRATEGY=fork.OVERLAY)
+        self.ace = User.objects.create_user("ace", "ace@email.com", "apassword")
+        self.bob = User.objects.create_user("bob", "bob@email.com", "apassword")
+        self.files = {"README.md": b"# original", "images/a.png": b"a", "images/b.png": b"b"}
+        directory = os.path.join(self.root, str(self.ace.id), "original")
+        write_files(directory, self.files)
+        self.original = Dataset.objects.create(name="original", user=self.ace, is_public=True, dataset_directory=directory)
+        unique_directory = mock.patch.object(views, "get_unique_dataset_directory", lambda user_id, name: os.path.join(self.root, user_id, name))
+        unique_directory.start()
+        self.addCleanup(unique_directory.stop)
+        self.fork = views.fork_dataset(self.original.id, self.bob, "fork", "true")
+
+    def get_image(self, path):
+        request = get_with_jwt_cookie(f"/api/dataset/{self.bob.id}/fork/{path}")
+        return api.get_dataset_image(request, self.bob.id, "fork", path,
+            get_unique_directory=lambda user_id, name: os.path.join(self.root, user_id, name))
+
+    def test_fork_reads_through_until_written(self):
+        self.assertTrue(self.fork.is_overlay)
+        self.assertEqual(os.listdir(self.fork.dataset_directory), [])
+        self.assertEqual(b"".join(self.get_image("images/a.png").streaming_content), b"a")
+
+        views.handle_uploaded_file(SimpleUploadedFile("a.png", b"fork a"), filename="a.png", dir=os.path.join(self.fork.dataset_directory, "images"))
+        self.assertEqual(b"".join(self.get_image("images/a.png").streaming_content), b"fork a")
+        readme = os.path.join(self.fork.dataset_directory, "README.md")
+        overlay.prepare_write(readme)
+        with open(readme, "ab") as file:
+            file.write(b" fork")
+        views.update_written_path(readme)
+        with open(overlay.resolve_path(overlay.get_layers(self.fork), "README.md"), "rb") as file:
+            self.assertEqual(file.read(), b"# original fork")
+        with open(os.path.join(self.original.dataset_directory, "images", "a.png"), "rb") as file:
+            self.assertEqual(file.read(), b"a")
+        self.assertEqual(self.get_image("../original/images/b.png").status_code, 404)
+
+        request = get_with_jwt_cookie(f"/api/dataset/tree/{self.bob.id}/fork/images/", data={"sort": "-name"})
+        response = api.get_dataset_file_tree(request, self.bob.id, "fork", "images", root_dir=self.root)
+        tree = json.loads(response.content)
+        self.assertEqual([(entry["name"], entry["size"]) for entry in tree["tree"]], [("b.png", 1), ("a.png", 6)])
+        self.assertEqual(tree["total"], 2)
+
+        response = api.download_dataset_zip(get_with_jwt_cookie(f"/api/dataset/download/{self.fork.id}/"), id=self.fork.id)
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as zip_file:
+            self.assertEqual({name: zip_file.read(name) for name in zip_file.namelist()}, self.files | {"images/a.png": b"fork a", "README.md": b"# original fork"})
+        with open(os.path.join(self.original.dataset_directory, "README.md"), "rb") as file:
+            self.assertEqual(file.read(), b"# original")
+
+    def test_action_on_the_fork_counts_every_layer(self):
+        views.handle_uploaded_file(SimpleUploadedFile("c.png", b"fork c"), filename="c.png", dir=os.path.join(self.fork.dataset_directory, "images"))
+        action_set = DatasetActionSet.objects.create(action_type=DatasetActionSet.ACTION_SET.CLEANING)
+        DatasetAction.objects.create(parameters={}, action=action_set, dataset=self.fork)
+        self.fork.refresh_from_db()
+        self.assertEqual(self.fork.file_count, 4)
+        self.assertEqual(self.fork.total_size, len(b"# original") + 2 + len(b"fork c"))
+        self.assertEqual(self.fork.extension_stats[".png"], {"count": 3, "size": 2 + len(b"fork c")})
+
+    def test_deleting_the_original_materializes_its_forks(self):
+        self.original.delete()
+        self.fork.refresh_from_db()
+        self.assertFalse(self.fork.is_overlay)
+        self.assertEqual(overlay.get_layers(self.fork), [self.fork.dataset_directory])
+        for name, data in self.files.items():
+            with open(os.path.join(self.fork.dataset_directory, name), "rb") as file:
+                self.assertEqual(file.read(), data)
+
+class FakeMinioClient:
+    """
+    In-process stand-in for the Minio client: objects live in a dict and get the
+    ETag MinIO gives fput_object uploads (part MD5s combined for multipart).
+    fail_next maps an object name to errors its next uploads raise.
+    """
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+        self.fail_next = {}
+        self.responses = []
+
+    def fput_object(self, bucket, object_name, path, part_size=0, **kwargs):
+        self.uploads.append(object_name)
+        if self.fail_next.get(object_name):
+            raise self.fail_next[object_name].pop(0)
+        with open(path, "rb") as file:
+            data = file.read()
+        parts = [data[i:i + part_size] for i in range(0, len(data), part_size)] or [b""]
+        if len(parts) == 1:
+            etag = hashlib.md5(data).hexdigest()
+        else:
+            etag = hashlib.md5(b"".join(hashlib.md5(part).digest() for part in parts)).hexdigest() + f"-{len(parts)}"
+        self.objects[object_name] = (data, etag)
+
+    def list_objects(self, bucket, prefix=None, recursive=False):
+        return [
+            mock.Mock(object_name=name, size=len(data), etag=f'"{etag}"', is_dir=False, last_modified=None)
+            for name, (data, etag) in sorted(self.objects.items()) if name.startswith(prefix or "")
+        ]
+
+    def get_object(self, bucket, object_name):
+        if self.fail_next.get(object_name):
+            raise self.fail_next[object_name].pop(0)
+        response = io.BytesIO(self.objects[object_name][0])
+        response.release_conn = mock.Mock()
+        self.responses.append(response)
+        return response
+
+class MinioSyncTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        write_files(self.root, {"a.txt": b"a", "images/b.png": b"b" * 100, "images/train/c.png": b""})
+        self.client = FakeMinioClient()
+        self.service = minio_utils.MinioService(self.client)
+
+    def sync(self, **kwargs):
+        return self.service.sync_directory(self.root, "dataset/d1", bucket="bucket", backoff=0, **kwargs)
+
+    def test_sync_uploads_then_skips_unchanged_objects(self):
+        report = self.sync()
+        self.assertEqual((report["uploaded"], report["skipped"], report["bytes"], report["failed"]), (3, 0, 101, []))
+        self.assertEqual(self.client.objects["dataset/d1/images/b.png"][0], b"b" * 100)
+
+        write_files(self.root, {"a.txt": b"z", "images/d.png": b"d"})
+        self.client.uploads.clear()
+        report = self.sync()
+        self.assertEqual(sorted(self.client.uploads), ["dataset/d1/a.txt", "dataset/d1/images/d.png"])
+        self.assertEqual((report["uploaded"], report["skipped"]), (2, 2))
+
+        write_files(self.root, {"a.txt": b"y"})
+        self.assertEqual(self.sync(compare="size")["uploaded"], 0)
+
+    def test_etag_of_multipart_uploads(self):
+        part_size = minio_utils.MIN_PART_SIZE
+        write_files(self.root, {"big.bin": os.urandom(part_size * 2 + 10)})
+        self.sync(part_size=part_size)
+        path = os.path.join(self.root, "big.bin")
+        self.assertTrue(self.client.objects["dataset/d1/big.bin"][1].endswith("-3"))
+        self.assertEqual(minio_utils.compute_etag(path, part_size), self.client.objects["dataset/d1/big.bin"][1])
+
+        self.client.uploads.clear()
+        self.assertEqual(self.sync(part_size=part_size)["skipped"], 4)
+        self.assertEqual(self.client.uploads, [])
+
+    def test_transient_errors_are_retried(self):
+        slow_down = S3Error("SlowDown", "slow down", None, None, None, None)
+        denied = S3Error("AccessDenied", "denied", None, None, None, None)
+        self.client.fail_next = {"dataset/d1/a.txt": [slow_down, OSError("reset")], "dataset/d1/images/b.png": [denied]}
+
+        report = self.sync(max_retries=2)
+        self.assertEqual(self.client.uploads.count("dataset/d1/a.txt"), 3)
+        self.assertEqual(self.client.uploads.count("dataset/d1/images/b.png"), 1)
+        self.assertEqual(report["uploaded"], 2)
+        self.assertEqual([name for name, _ in report["failed"]], ["dataset/d1/images/b.png"])
+
+class MinioZipStreamTests(TestCase):
+    def setUp(self):
+        self.client = FakeMinioClient()
+        self.files = {"a.txt": b"a" * 3000, "images/b.png": b"b", "images/train/c.png": b""}
+        self.client.objects = {f"dataset/d1/{name}": (data, "") for name, data in self.files.items()}
+        self.client.objects["dataset/d10/other.txt"] = (b"other", "")
+        self.service = minio_utils.MinioService(self.client)
+
+    def test_objects_are_streamed_into_the_zip(self):
+        entries = self.service.iter_zip_entries("dataset/d1", bucket="bucket", prefetch=2, head_size=1024)
+        content = b"".join(zipstream.iter_zip(entries, chunk_size=1024))
+        with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+            self.assertEqual({name: zip_file.read(name) for name in zip_file.namelist()}, self.files)
+        self.assertTrue(all(response.closed for response in self.client.responses))
+
+    def test_unreadable_objects_are_skipped_and_early_close_releases_prefetches(self):
+        self.client.fail_next = {"dataset/d1/images/b.png": [OSError("reset")]}
+        entries = self.service.iter_zip_entries("dataset/d1", bucket="bucket", prefetch=0)
+        self.assertEqual([entry.arcname for entry in entries], ["a.txt", "images/train/c.png"])
+
+        self.client.responses.clear()
+        entries = self.service.iter_zip_entries("dataset/d1", bucket="bucket", prefetch=4)
+        with next(entries).open() as reader:
+            self.assertEqual(reader.read(), self.files["a.txt"])
+        entries.close()
+        self.assertEqual(len(self.client.responses), 3)
+        self.assertTrue(all(response.closed for response in self.client.responses))
+
+    def test_read_dataset_from_minio_streams_a_zip(self):
+        ace = User.objects.create_user("ace", password="pw")
+        dataset = Dataset.objects.create(name="d1", user=ace, is_public=True, dataset_directory=f"{api.ROOT_DATASET_DIR}d1")
+        with mock.patch.object(api.minio_service, "minio_client", self.client):
+            response = api.read_dataset_from_minio(get_with_jwt_cookie(f"/api/dataset/minio/{dataset.id}/", ace), id=dataset.id)
+            self.assertEqual(response["Content-Type"], "application/zip")
+            with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as zip_file:
+                self.assertEqual(sorted(zip_file.namelist()), sorted(self.files))
@@ -5,6 +5,15 @@ from django.http import HttpResponseRedirect, JsonResponse
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view
 from .models import Dataset, Model, ModelDataset, Question, Choice
+from .search import search_catalog
+from .visibility import get_visible_objects
+from .pagination import CATALOG_ORDERING
+from .extraction import extract_zip
+from .file_index import update_path_index
+from .archive_cache import invalidate_path_archive_cache
+from .overlay import prepare_write
+from .fork import fork_tree, unlink_shared, get_fork_strategy, OVERLAY
+from .blob_store import copy_manifest
 from django.urls import reverse
 from django.utils import timezone
 from django.views import generic
@@ -23,6 +32,7 @@ import os
 import ast
 import datetime
 import shutil  
+import threading
 from pathlib import Path
 import markdown
 import json
@@ -32,7 +42,30 @@ from ku_djangoo.utils import get_unique_model_directory, get_unique_dataset_dire
 def get_markdown_fenced_code(extensions=["fenced_code"]):
     return markdown.Markdown(extensions=extensions)
 
-MARKDOWN_FENCED_CODE = get_markdown_fenced_code()
+class ThreadLocalMarkdown:
+    """
+    markdown.Markdown keeps per-document state and is not thread-safe, so each
+    thread converts with its own instance, reset after every document.
+    """
+
+    def __init__(self, extensions=["fenced_code"]):
+        self.extensions = list(extensions)
+        self._local = threading.local()
+
+    def get_markdown(self) -> markdown.Markdown:
+        md = getattr(self._local, 'markdown', None)
+        if md == None:
+            md = self._local.markdown = get_markdown_fenced_code(self.extensions)
+        return md
+
+    def convert(self, text: str) -> str:
+        md = self.get_markdown()
+        try:
+            return md.convert(text)
+        finally:
+            md.reset()
+
+MARKDOWN_FENCED_CODE = ThreadLocalMarkdown()
 
 TEXT_FILE_EXTENSIONS = {".txt", ".md", ".rst", ".html", ""}
 
@@ -345,10 +378,25 @@ def user_dataset_list_path_view(request, context={}):
     context['form'] = UserDatasetListPathsForm(request.user.id, request.POST, request.FILES)
     return render(request, template_name, context)
     
+def update_written_path(path: str):
+    """
+    Call after writing path (a file or a directory) into a dataset/model directory:
+    its file index is updated and the READMEs and archives cached above it are dropped.
+    """
+    # readme_cache imports this module
+    from .readme_cache import invalidate_path_readme_cache
+    update_path_index(path)
+    invalidate_path_readme_cache(path)
+    invalidate_path_archive_cache(path)
+
 def handle_uploaded_file(f, filename='afile', dir="asset/user/dataset/", file_extension=''):
-    with open(os.path.join(dir, f"{filename}{file_extension}"), "wb+") as destination:
+    file_path = os.path.join(dir, f"{filename}{file_extension}")
+    prepare_write(file_path, copy_up=False)
+    unlink_shared(file_path)
+    with open(file_path, "wb+") as destination:
         for chunk in f.chunks():
             destination.write(chunk)
+    update_written_path(file_path)
 
 def now_Ymd_HMS(format='%Y%m%d_%H%M%S') -> str:
     return timezone.now().strftime(format)
@@ -372,8 +420,7 @@ def unzip_and_save(zipfile_path, name, user, ispublic, timestamp, remove_zip=Tru
     try:
         os.makedirs(extract_dir, exist_ok=True)
 
-        with zipfile.ZipFile(zipfile_path, 'r') as zip_file:
-            zip_file.extractall(extract_dir)
+        extract_zip(zipfile_path, extract_dir)
 
         if remove_zip:
             os.remove(zipfile_path)
@@ -384,6 +431,7 @@ def unzip_and_save(zipfile_path, name, user, ispublic, timestamp, remove_zip=Tru
                 shutil.rmtree(final_directory) 
             os.rename(extract_dir, final_directory)
             print(f"Renamed {extract_dir} to {final_directory}")
+            update_written_path(final_directory)
             return final_directory
         else:
             print(f"Extraction complete at {extract_dir}. Cleanup skipped.")
@@ -404,17 +452,22 @@ def unzip_and_save(zipfile_path, name, user, ispublic, timestamp, remove_zip=Tru
 
 import zipfile
 
-def handle_extract_zip_file(file, extract_to: str):
+def handle_extract_zip_file(file, extract_to: str, progress=None):
     """
-    Extracts a zip file uploaded as InMemoryUploadedFile to a given directory.
+    Extracts an uploaded zip file (spooled to disk or in memory) to a given directory,
+    after checking it for zip-slip and zip bomb members (UnsafeZipError).
     """
     if not zipfile.is_zipfile(file):
         raise ValueError("The file is not a valid zip file")
 
     os.makedirs(extract_to, exist_ok=False)
 
-    with zipfile.ZipFile(file) as zip_file:
-        zip_file.extractall(extract_to)
+    try:
+        extract_zip(file, extract_to, progress=progress)
+    except BaseException:
+        shutil.rmtree(extract_to, ignore_errors=True)
+        raise
+    update_written_path(extract_to)
 
     return f"Extracted to {extract_to}"
 
@@ -685,6 +738,9 @@ def fork_dataset(dataset_id, user, name, ispublic, description=""):
     
     dataset_directory = dataset_dir_unique
 
+    if get_fork_strategy() == OVERLAY:
+        return fork_dataset_overlay(chosen_dataset, user, name, dataset_directory, ispublic, description=description)
+
     result = copy_directory(chosen_dataset.dataset_directory, dataset_directory)
 
     if result == "OSError copy directory":
@@ -702,9 +758,40 @@ def fork_dataset(dataset_id, user, name, ispublic, description=""):
     return dataset
 
 
+def fork_dataset_overlay(chosen_dataset, user, name, dataset_directory, ispublic, description=""):
+    """
+    Lazy fork: an empty directory read through to chosen_dataset (polls/overlay.py),
+    so forking takes the same time whatever the dataset size.
+    """
+    try:
+        os.makedirs(dataset_directory)
+    except OSError as err:
+        print("OSError - fork_dataset_overlay() - fail to make directory: % s" % err)
+        return
+
+    dataset = Dataset(
+        name=name,
+        user=user,
+        dataset_directory=dataset_directory,
+        is_public=is_public_map_bool[ispublic],
+        original_dataset=chosen_dataset,
+        is_overlay=True,
+        description=description,
+    )
+    dataset.save()
+    # The overlay is empty, so the fork has the totals of what it reads through to.
+    Dataset.objects.filter(pk=dataset.pk).update(
+        total_size=chosen_dataset.total_size,
+        file_count=chosen_dataset.file_count,
+        extension_stats=chosen_dataset.extension_stats,
+        stats_updated=chosen_dataset.stats_updated,
+    )
+    return dataset
+
 def copy_directory(src: str, dest: str):
     try:
-        shutil.copytree(src, dest)
+        fork_tree(src, dest)
+        copy_manifest(src, dest)
     except OSError as err:
         print("OSError - copy_directory() - fail to copy directory: % s" % err)
         return "OSError copy directory"
@@ -760,7 +847,10 @@ def iterate_folder(directory):
 def is_text_file(path):
     return path.suffix.lower() in TEXT_FILE_EXTENSIONS
 
-def find_and_read_readme_text_file(directory: str):
+def find_readme_text_file(directory: str):
+    """
+    (path, content) of the first readable README text file in the top two levels of directory, or None.
+    """
     for path in iterate_folder_2levels(directory):
         if ("readme" in path.name.lower() 
             and path.is_file()
@@ -768,16 +858,22 @@ def find_and_read_readme_text_file(directory: str):
         ):
             try:
                 content = path.read_text(encoding='utf-8')
-                return content
+                return path, content
             except UnicodeDecodeError as e:
                 print(f"`path.read_text(encoding='utf-8')`. Skipping non-text file: {path}. f{e}")
             try:
                 content = path.read_text()
-                return content
+                return path, content
             except Exception as e:
                 print(f"`path.read_text()`. Skipping non-text file: {path}. f{e}")
     return None
 
+def find_and_read_readme_text_file(directory: str):
+    readme = find_readme_text_file(directory)
+    if readme == None:
+        return None
+    return readme[1]
+
 def search_and_get_readme_markdown_by_directory(directory):
     readme_text = find_and_read_readme_text_file(directory)
     if readme_text == None:
@@ -788,19 +884,15 @@ def search_and_get_readme_markdown_by_directory(directory):
 def search_dataset_name(request, context: dict = {}) -> dict:
     models = []
     q = ""
+    visible_models = get_visible_objects(request.user if request.user.is_authenticated else None, Object=Model)
 
     if request.method == "POST":
         q = request.POST.get("search-dataset-query")
         if q:
-            models = Model.objects.filter(
-                Q(name__icontains=q)
-                & (Q(is_public=False
-                     , user=request.user) 
-                    | Q(is_public=True))
-            )[:5]
+            models = list(search_catalog(visible_models, q, limit=5))
 
     if not models:
-        models = Model.objects.all()[:5]
+        models = visible_models.order_by(*CATALOG_ORDERING)[:5]
     
     context = context | {
         "search_dataset_query_value": q, 
@@ -0,0 +1,17 @@
+from django.db.models import Q
+
+from .models import Dataset
+
+def is_public_or_is_user_private(user):
+    return (
+        Q(is_public=True)
+        | Q(is_public=False, user=user)
+    )
+
+def get_visible_objects(user, Object=Dataset):
+    """
+    Public objects, plus the user's private objects when the user is known.
+    """
+    if user == None:
+        return Object.objects.filter(is_public=True)
+    return Object.objects.filter(is_public_or_is_user_private(user))
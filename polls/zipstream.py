@@ -0,0 +1,141 @@
+import os
+import time
+import zipfile
+from typing import Callable, Iterable, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024 # 1 MB
+ZIP_COMPRESSIONS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+}
+ZIP_MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+class ZipEntry(NamedTuple):
+    """
+    One archive member. `open` returns a binary file-like object with read(n);
+    `size` is the expected size, used to decide on ZIP64 up front.
+    """
+    arcname: str
+    size: int
+    mtime: float
+    open: Callable
+
+class _StreamBuffer:
+    """
+    Unseekable write target for ZipFile: everything written is held until pop().
+    ZipFile then writes each member with a data descriptor instead of seeking back.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def pop(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def get_zip_date_time(mtime: float) -> tuple:
+    return max(time.localtime(mtime)[:6], ZIP_MIN_DATE_TIME)
+
+def iter_zip(entries: Iterable[ZipEntry], compression: int = zipfile.ZIP_STORED, chunk_size: int = ZIP_STREAM_CHUNK_SIZE):
+    """
+    Yield a ZIP archive of `entries` as it is built, in chunks of about chunk_size bytes.
+
+    Each member is read and written chunk by chunk, so memory stays around one
+    chunk per download whatever the archive size, and the first bytes go out as
+    soon as the first chunk is read. ZipFile picks ZIP64 headers from entry.size.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=compression, allowZip64=True) as zip_file:
+        for entry in entries:
+            zinfo = zipfile.ZipInfo(entry.arcname, date_time=get_zip_date_time(entry.mtime))
+            zinfo.compress_type = compression
+            zinfo.file_size = entry.size
+            zinfo.external_attr = 0o644 << 16
+
+            with entry.open() as source, zip_file.open(zinfo, mode="w") as member:
+                while True:
+                    data = source.read(chunk_size)
+                    if not data:
+                        break
+                    member.write(data)
+                    if len(buffer) >= chunk_size:
+                        yield buffer.pop()
+
+            if len(buffer):
+                yield buffer.pop()
+
+    if len(buffer):
+        yield buffer.pop()
+
+def iter_directory_entries(folder_path: str):
+    """
+    ZipEntry for every file under folder_path, with paths relative to it, in a stable order.
+    """
+    for root, dirs, files in os.walk(folder_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            stat = os.stat(file_path)
+            yield ZipEntry(
+                arcname=os.path.relpath(file_path, folder_path),
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                open=lambda file_path=file_path: open(file_path, 'rb'),
+            )
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a blocking iterator, each next() run in a worker thread.
+    Under ASGI, StreamingHttpResponse would otherwise read a sync iterator to the end before sending.
+    """
+    iterator = iter(iterator)
+    done = object()
+    try:
+        while True:
+            chunk = await sync_to_async(next, thread_sensitive=False)(iterator, done)
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if close != None:
+            await sync_to_async(close, thread_sensitive=False)()
+
+def is_asgi_request(request) -> bool:
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+def streaming_zip_response(request, entries: Iterable[ZipEntry], filename: str, compression: int = zipfile.ZIP_STORED):
+    """
+    StreamingHttpResponse of iter_zip(entries), async under ASGI and sync under WSGI,
+    so neither server buffers the archive.
+    """
+    return streaming_chunks_response(request, iter_zip(entries, compression=compression), filename)
+
+def streaming_chunks_response(request, chunks: Iterable[bytes], filename: str, content_type: str = 'application/zip'):
+    if is_asgi_request(request):
+        chunks = iterate_in_thread(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def get_zip_compression(request) -> int:
+    """
+    ?compression=deflate compresses on the fly; the default stores members as they are.
+    """
+    return ZIP_COMPRESSIONS.get(request.GET.get('compression', 'stored'), zipfile.ZIP_STORED)